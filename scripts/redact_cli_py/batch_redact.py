@@ -2,20 +2,60 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
+import argparse
+from contextlib import nullcontext
+import json
+import os
 from pathlib import Path
-import sys
 import shutil
-from typing import List
+import socket
+import time
+from typing import Callable, List, Optional
 from uuid import uuid4
 
-from redact import redact_fott_label, redact_ocr_result, redact_file_bundle
-from redact.io.blob_reader import BlobReader
+from redact.batch.batch_metrics import (
+    build_report,
+    write_prometheus_textfile,
+    write_report,
+)
+from redact.batch.batch_scheduler import DEFAULT_SPLIT_SECONDS, BatchScheduler
+from redact.batch.bundle_pool import BundlePool, format_error
+from redact.batch.bundle_runner import BundleRunner
+from redact.batch.profile_keeper import ProfileKeeper
+from redact.batch.work_queue import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    LEASED,
+    QUEUED,
+    LeaseKeeper,
+    WorkQueue,
+)
+from redact.cache.match_cache import MatchCache
+from redact.cache.match_cache import DEFAULT_MAX_BYTES as MATCH_CACHE_MAX_BYTES
+from redact.cache.render_cache import RenderCache
+from redact.cache.render_cache import DEFAULT_MAX_BYTES as RENDER_CACHE_MAX_BYTES
+from redact.io.blob_reader import DEFAULT_MAX_CONCURRENCY, BlobReader
 from redact.io.blob_writer import BlobWriter
 from redact.io.local_reader import LocalReader
 from redact.io.local_writer import LocalWriter
-from redact.utils.file_name import get_redacted_file_name, valid_url
-from redact.types.file_bundle import FileType, FileBundle
-from redact.preprocess import preprocess_multi_page_bundle
+from redact.utils.file_name import (
+    get_failures_file_name,
+    get_manifest_file_name,
+    get_worker_failures_file_name,
+    valid_url,
+)
+from redact.types.batch_manifest import BatchManifest, BatchSummary
+from redact.types.batch_options import BatchOptions
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_result import BundleResult
+from redact.types.bundle_task import BundleTask
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.render_mode import RenderMode
+from redact.types.shard import Shard
+from redact.utils.metrics import recording
+from redact.preprocess.pdf_renderer import MIN_RENDER_DPI
+from redact.redaction.banded_page_redaction import DEFAULT_BAND_HEIGHT
 
 
 # Strong Assumption: assume all valid URLs are Azure Blob URL.
@@ -23,88 +63,517 @@ def is_blob_url(url: str) -> bool:
     return valid_url(url)
 
 
+def clear_folder(folder: Path):
+    for child in folder.iterdir():
+        if child.is_dir():
+            shutil.rmtree(child)
+        else:
+            child.unlink()
+
+
+def run_queue_worker(
+    queue: WorkQueue,
+    worker: str,
+    pool: BundlePool,
+    fetch: Callable[[FileBundle, Path], None],
+    write: Optional[Callable[[Path], None]],
+    poll_seconds: float,
+    profiles: Optional[ProfileKeeper] = None,
+) -> List[BundleResult]:
+    """Redact bundles leased from the queue until none is left.
+
+    Every bundle is fetched into the runner folders, redacted, and its outputs
+    written out with write, if any, before it is marked done. Returns the
+    results of the bundles done by this worker, and of its failed attempts.
+    Their profiles, if any, are added to profiles.
+    """
+    runner = pool.runner
+    results = []
+    while True:
+        item = queue.lease(worker)
+        if item is None:
+            # Counts expires leases as well, so bundles whose lease expired
+            # since the lease above are queued, and leased on the next loop.
+            counts = queue.counts()
+            if counts[QUEUED] == 0 and counts[LEASED] == 0:
+                return results
+            # Bundles leased by other workers are queued again if their
+            # worker fails or dies.
+            time.sleep(poll_seconds)
+            continue
+
+        fb = item.bundle
+        with LeaseKeeper(queue, item, worker) as keeper:
+            try:
+                folder = runner.input_folder
+                if item.mode == FileType.MULTI_PAGE:
+                    folder = runner.pre_folder
+                fetch(fb, folder)
+                result = next(pool.run([BundleTask(item.mode, fb)]))
+                if not result.failed and write is not None:
+                    write(runner.output_folder)
+            except Exception as error:  # noqa: PIE786
+                # Errors fetching or writing a bundle are retried too.
+                result = BundleResult(
+                    BundleTask(item.mode, fb), error=format_error(error)
+                )
+            finally:
+                for folder in [runner.pre_folder, runner.input_folder]:
+                    clear_folder(Path(folder))
+                if write is not None:
+                    clear_folder(Path(runner.output_folder))
+        results.append(result)
+        if profiles is not None:
+            profiles.add(result)
+        if result.failed:
+            queue.fail(item, worker, result.error)
+            continue
+        if keeper.lost or not queue.complete(item, worker):
+            print(f"Lost the lease of {fb.image_file_name}, it may be redone.")
+
+
+def write_failures(results: List[BundleResult], path: Path):
+    """Write the failures report of a batch, if any bundle failed."""
+    failures = [result.to_failure_dict() for result in results if result.failed]
+    if failures:
+        path.write_text(json.dumps(failures, indent=2), encoding="utf-8")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Redact the images, OCR results and FOTT labels of a folder."
+    )
+    parser.add_argument("input_container")
+    parser.add_argument("input_path")
+    parser.add_argument("output_container")
+    parser.add_argument("output_path")
+    parser.add_argument("api_version")
+    parser.add_argument("fields_to_redact", nargs="?", default="")
+    parser.add_argument(
+        "--encoder-profile",
+        choices=[profile.value for profile in EncoderProfile],
+        default=EncoderProfile.DEFAULT.value,
+    )
+    parser.add_argument(
+        "--render-mode",
+        choices=[mode.value for mode in RenderMode],
+        default=RenderMode.RGBA.value,
+        help="Pixel format of rendered PDF pages.",
+    )
+    parser.add_argument(
+        "--render-dpi",
+        type=int,
+        default=300,
+        help="DPI of rendered PDF pages.",
+    )
+    parser.add_argument(
+        "--max-page-pixels",
+        type=int,
+        help="Pixel budget of a rendered PDF page. "
+        "Larger pages are rendered at a lower DPI.",
+    )
+    parser.add_argument(
+        "--min-render-dpi",
+        type=int,
+        default=MIN_RENDER_DPI,
+        help="Lowest DPI the pixel budget may lower the rendering DPI to.",
+    )
+    parser.add_argument(
+        "--vector-pdf",
+        action="store_true",
+        help="Redact PDFs into PDFs that keep the vector content of their pages, "
+        "instead of rendering every page to an image.",
+    )
+    parser.add_argument(
+        "--merge-pages",
+        action="store_true",
+        help="Merge the redacted pages of a PDF or TIFF into one redacted file of "
+        "the same format, instead of writing an image and results per page.",
+    )
+    parser.add_argument(
+        "--keep-page-files",
+        action="store_true",
+        help="With --merge-pages, also keep the per page images and results.",
+    )
+    parser.add_argument(
+        "--band-page-pixels",
+        type=int,
+        help="Render and redact PDF pages of more pixels than this in bands of "
+        "rows, bounding their memory by the band size.",
+    )
+    parser.add_argument(
+        "--band-height",
+        type=int,
+        default=DEFAULT_BAND_HEIGHT,
+        help="Rows per band of banded pages.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=Shard.parse,
+        help='Only redact the bundles of shard "i/N" (1 <= i <= N), assigned by '
+        "a hash of the image file name, and write a manifest of the shard.",
+    )
+    parser.add_argument(
+        "--queue",
+        help="Path of a SQLite work queue shared by the workers of a batch, e.g. "
+        "on shared storage. Every worker adds the bundles of the input to the "
+        "queue, then redacts bundles leased from it until none is left.",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help="Lease of a queued bundle, renewed while it is redacted. Bundles "
+        "whose worker stops renewing are leased again by another worker.",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Times a queued bundle is leased before it is marked failed.",
+    )
+    parser.add_argument(
+        "--download-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Parallel range requests per large input blob.",
+    )
+    parser.add_argument(
+        "--no-copy",
+        action="store_true",
+        help="Hardlink local input files instead of copying them, and write "
+        "redacted files straight into a local output folder.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Redact this many bundles at a time, each in a process of its own.",
+    )
+    parser.add_argument(
+        "--split-seconds",
+        type=float,
+        default=DEFAULT_SPLIT_SECONDS,
+        help="With --workers, split documents estimated to take longer than "
+        "this into page tasks of about this long.",
+    )
+    parser.add_argument(
+        "--bundle-timeout",
+        type=float,
+        help="Kill the process of a bundle running longer than this many "
+        "seconds, and report the bundle as failed.",
+    )
+    parser.add_argument(
+        "--bundle-threads",
+        action="store_true",
+        help="Redact the image, label and OCR result of a bundle concurrently "
+        "on threads.",
+    )
+    parser.add_argument(
+        "--match-cache",
+        help="Path of a SQLite file caching label to OCR word matches across runs.",
+    )
+    parser.add_argument(
+        "--match-cache-size-mb",
+        type=int,
+        default=MATCH_CACHE_MAX_BYTES // (1024 * 1024),
+        help="Size cap of the match cache. Least recently used entries are evicted.",
+    )
+    parser.add_argument(
+        "--render-cache",
+        help="Folder caching rendered PDF pages across runs.",
+    )
+    parser.add_argument(
+        "--render-cache-size-mb",
+        type=int,
+        default=RENDER_CACHE_MAX_BYTES // (1024 * 1024),
+        help="Disk budget of the render cache. Least recently used pages are evicted.",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Path of a JSON report of the time spent per stage, throughput "
+        "and percentiles of the bundle times.",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        help="Path of the same metrics as a Prometheus node exporter textfile.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="With --metrics, also trace the Python allocations of every "
+        "bundle with tracemalloc, and report their peaks. Slows bundles down.",
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=int,
+        help="With --workers, only start a bundle while the estimated peak "
+        "memory of the running bundles and its own fit this budget.",
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        type=int,
+        help="Profile bundles with cProfile, and keep the profiles and stage "
+        "timelines of this many slowest ones in --profile-folder.",
+    )
+    parser.add_argument(
+        "--profile-every",
+        type=int,
+        default=1,
+        help="With --profile-slowest, profile only one in this many bundles.",
+    )
+    parser.add_argument(
+        "--profile-folder",
+        default="profiles",
+        help="Local folder the profiles of --profile-slowest are written to.",
+    )
+    args = parser.parse_args()
+    if args.queue and args.shard:
+        parser.error("--queue and --shard are exclusive.")
+    if args.queue and args.workers > 1:
+        parser.error("--queue redacts one bundle at a time, start more workers.")
+    if args.profile_slowest is not None and args.profile_slowest < 1:
+        parser.error("--profile-slowest keeps at least one profile.")
+    if args.trace_memory and not (args.metrics or args.prometheus_textfile):
+        parser.error("--trace-memory needs --metrics or --prometheus-textfile.")
+    if args.profile_every < 1:
+        parser.error("--profile-every must be at least 1.")
+    return args
+
+
 if __name__ == "__main__":
-    input_container = sys.argv[1]
-    input_path = sys.argv[2]
-    output_container = sys.argv[3]
-    output_path = sys.argv[4]
-    api_version = sys.argv[5]
-    target_pdf_render_dpi = 300
+    args = parse_args()
+    input_container = args.input_container
+    input_path = args.input_path
+    output_container = args.output_container
+    output_path = args.output_path
+    api_version = args.api_version
+    encoder_profile = EncoderProfile(args.encoder_profile)
+    match_cache = None
+    if args.match_cache:
+        match_cache = MatchCache(
+            args.match_cache, max_bytes=args.match_cache_size_mb * 1024 * 1024
+        )
+    render_cache = None
+    if args.render_cache:
+        render_cache = RenderCache(
+            args.render_cache, max_bytes=args.render_cache_size_mb * 1024 * 1024
+        )
     fields_to_redact = tuple()
 
-    if len(sys.argv) >= 7:
-        fields_to_redact = sys.argv[6].split(",")
+    if args.fields_to_redact:
+        fields_to_redact = args.fields_to_redact.split(",")
+    options = BatchOptions(
+        api_version=api_version,
+        labels_to_redact=fields_to_redact,
+        encoder_profile=encoder_profile,
+        render_dpi=args.render_dpi,
+        render_mode=RenderMode(args.render_mode),
+        max_page_pixels=args.max_page_pixels,
+        min_render_dpi=args.min_render_dpi,
+        vector_pdf=args.vector_pdf,
+        merge_pages=args.merge_pages,
+        keep_page_files=args.keep_page_files,
+        band_page_pixels=args.band_page_pixels,
+        band_height=args.band_height,
+        bundle_threads=args.bundle_threads,
+    )
 
     # Random generated UUID in the build folder name for preventing collapse.
-    build_path = Path(f"build-{uuid4()}/")
+    run_id = uuid4()
+    build_path = Path(f"build-{run_id}/")
     build_pre_folder = Path(build_path, "pre/")
     build_input_folder = Path(build_path, "in/")
     build_output_folder = Path(build_path, "out/")
+    staging_folder = Path(build_path, "staging/")
+    # Redacted files are written straight into a local output folder, instead
+    # of being copied there once all bundles are done.
+    write_in_place = args.no_copy and not is_blob_url(output_container)
+    if write_in_place:
+        build_output_folder = Path(output_path)
+        # Staged files are renamed into the output folder, not copied from
+        # another file system. Workers sharing the output stage apart.
+        staging_folder = Path(output_path, f".staging-{run_id}/")
     Path(build_pre_folder).mkdir(parents=True, exist_ok=True)
     Path(build_input_folder).mkdir(parents=True, exist_ok=True)
     Path(build_output_folder).mkdir(parents=True, exist_ok=True)
 
+    record_metrics = args.metrics is not None or args.prometheus_textfile is not None
+    runner = BundleRunner(
+        options,
+        build_pre_folder,
+        build_input_folder,
+        build_output_folder,
+        match_cache=match_cache,
+        render_cache=render_cache,
+    )
+    pool = BundlePool(
+        runner,
+        staging_folder,
+        workers=args.workers,
+        timeout=args.bundle_timeout,
+        record_metrics=record_metrics,
+        profile_every=args.profile_every if args.profile_slowest else None,
+        trace_memory=args.trace_memory,
+        memory_budget=(
+            args.memory_budget_mb * 1024 * 1024 if args.memory_budget_mb else None
+        ),
+    )
+    profiles = None
+    if args.profile_slowest:
+        profiles = ProfileKeeper(args.profile_folder, args.profile_slowest)
+    # Bundles failed, reported once all bundles are done.
+    failures = {}
+    results = []
+    # Stages of the batch itself, e.g. listing, downloads and uploads.
+    batch_metrics = BundleMetrics()
+    start = time.perf_counter()
+
     try:
-        file_bundle_list = None
-        multi_page_bundle_list = None
-        if is_blob_url(input_container):
-            reader = BlobReader(input_container, input_path)
-            multi_page_bundle_list = reader.download_bundles(
-                to=build_pre_folder, mode=FileType.MULTI_PAGE
-            )
-            file_bundle_list = reader.download_bundles(to=build_input_folder)
-        else:
-            reader = LocalReader(input_path)
-            multi_page_bundle_list = reader.copy_bundles(
-                to=build_pre_folder, mode=FileType.MULTI_PAGE
-            )
-            file_bundle_list = reader.copy_bundles(to=build_input_folder)
-
-        per_page_bundle_list: List[FileBundle] = []
-
-        # Render and process PDF/TIFF files if any.
-        if multi_page_bundle_list is not None:
-            for fb in multi_page_bundle_list:
-                bundle_list = preprocess_multi_page_bundle(
-                    fb, build_pre_folder, build_input_folder, target_pdf_render_dpi
+        with recording(batch_metrics) if record_metrics else nullcontext():
+            if is_blob_url(input_container):
+                reader = BlobReader(
+                    input_container, input_path, args.download_concurrency
                 )
-                per_page_bundle_list.extend(bundle_list)
+            else:
+                reader = LocalReader(input_path, link=args.no_copy)
 
-                # Short path: preprocess folder -> output folder.
-                # We still need to redact the full label file.
-                redact_fott_label(
-                    Path(build_pre_folder, fb.fott_file_name),
-                    Path(
-                        build_output_folder, get_redacted_file_name(fb.fott_file_name)
+            if args.queue:
+                queue = WorkQueue(
+                    args.queue,
+                    lease_seconds=args.lease_seconds,
+                    max_attempts=args.max_attempts,
+                )
+                # Adding bundles already queued is a no-op, so workers joining a
+                # running batch only list the input to resolve its file paths.
+                added = queue.enqueue(reader.iter_bundles())
+                print(f"Added {added} bundles to the queue.")
+
+                if is_blob_url(input_container):
+                    fetch = reader.download_bundle
+                else:
+                    fetch = reader.copy_bundle
+                write = None
+                if is_blob_url(output_container):
+                    write = BlobWriter(output_container, output_path).upload_files
+                elif not write_in_place:
+                    write = LocalWriter(output_path).copy_files
+                worker = f"{socket.gethostname()}-{os.getpid()}"
+                results = run_queue_worker(
+                    queue,
+                    worker,
+                    pool,
+                    fetch,
+                    write,
+                    poll_seconds=args.lease_seconds / 10,
+                    profiles=profiles,
+                )
+                image_bytes = sum(result.image_bytes for result in results)
+                print(
+                    f"Wrote {image_bytes} bytes of redacted images "
+                    f"({encoder_profile.value} encoder profile)."
+                )
+                # Only the bundles this worker failed, and which failed their
+                # last attempt, are reported, with the error of its last one.
+                failed = queue.failures()
+                failed_results = {
+                    result.bundle.image_file_name: result
+                    for result in results
+                    if result.failed and result.bundle.image_file_name in failed
+                }
+                failures = {
+                    name: result.error for name, result in failed_results.items()
+                }
+                write_failures(
+                    list(failed_results.values()),
+                    Path(build_output_folder, get_worker_failures_file_name(worker)),
+                )
+                if write is not None:
+                    write(build_output_folder)
+            else:
+                # Bundles are fetched as soon as they are paired, while the
+                # input is still being listed.
+                folders = {
+                    FileType.MULTI_PAGE: build_pre_folder,
+                    FileType.SINGLE_PAGE_IMAGE: build_input_folder,
+                }
+                if is_blob_url(input_container):
+                    bundles = reader.download_all_bundles(folders, shard=args.shard)
+                else:
+                    bundles = reader.copy_all_bundles(folders, shard=args.shard)
+                multi_page_bundle_list = bundles[FileType.MULTI_PAGE]
+                file_bundle_list = bundles[FileType.SINGLE_PAGE_IMAGE]
+                # The input bundles, before the pages of documents are added.
+                manifest = BatchManifest(
+                    shards=[] if args.shard is None else [str(args.shard)],
+                    bundles=multi_page_bundle_list + file_bundle_list,
+                    summary=BatchSummary(
+                        document_count=len(multi_page_bundle_list),
+                        image_count=len(file_bundle_list),
                     ),
-                    fields_to_redact,
                 )
 
-                # We still need to redact the full ocr file.
-                redact_ocr_result(
-                    Path(build_pre_folder, fb.ocr_file_name),
-                    Path(build_pre_folder, fb.fott_file_name),
-                    Path(build_output_folder, get_redacted_file_name(fb.ocr_file_name)),
-                    api_version,
-                    fields_to_redact,
+                # Render and process PDF/TIFF files if any, then the images.
+                scheduler = BatchScheduler(pool, split_seconds=args.split_seconds)
+                for result in scheduler.run(
+                    [(FileType.MULTI_PAGE, fb) for fb in multi_page_bundle_list]
+                    + [(FileType.SINGLE_PAGE_IMAGE, fb) for fb in file_bundle_list]
+                ):
+                    results.append(result)
+                    # Only the profiles of the slowest bundles so far are held.
+                    if profiles is not None:
+                        profiles.add(result)
+                image_bytes = sum(result.image_bytes for result in results)
+                failures = {
+                    result.bundle.image_file_name: result.error
+                    for result in results
+                    if result.failed
+                }
+                write_failures(
+                    results,
+                    Path(build_output_folder, get_failures_file_name(args.shard)),
                 )
 
-        # Process images and per page result from multi-page documents.
-        file_bundle_list.extend(per_page_bundle_list)
-        for fb in file_bundle_list:
-            redact_file_bundle(
-                fb,
-                build_input_folder,
-                build_output_folder,
-                api_version,
-                fields_to_redact,
-            )
-
-        if is_blob_url(output_container):
-            writer = BlobWriter(output_container, output_path)
-            writer.upload_files(build_output_folder)
-        else:
-            writer = LocalWriter(output_path)
-            writer.copy_files(build_output_folder)
+                print(
+                    f"Wrote {image_bytes} bytes of redacted images "
+                    f"({encoder_profile.value} encoder profile)."
+                )
+
+                if args.shard is not None:
+                    # Manifests of all shards are merged with merge_manifests.py.
+                    manifest.summary.image_bytes = image_bytes
+                    manifest.summary.failure_count = len(failures)
+                    Path(
+                        build_output_folder, get_manifest_file_name(args.shard)
+                    ).write_text(
+                        json.dumps(manifest.to_dict(), indent=2), encoding="utf-8"
+                    )
+
+                if is_blob_url(output_container):
+                    writer = BlobWriter(output_container, output_path)
+                    writer.upload_files(build_output_folder)
+                elif not write_in_place:
+                    writer = LocalWriter(output_path)
+                    writer.copy_files(build_output_folder)
     finally:
+        runner.close()
         shutil.rmtree(build_path)
+        shutil.rmtree(staging_folder, ignore_errors=True)
+
+    if profiles is not None:
+        paths = profiles.write()
+        print(f"Wrote the profiles of {len(paths)} bundles to {args.profile_folder}.")
+    if record_metrics:
+        report = build_report(results, batch_metrics, time.perf_counter() - start)
+        if args.metrics:
+            write_report(report, Path(args.metrics))
+        if args.prometheus_textfile:
+            write_prometheus_textfile(report, Path(args.prometheus_textfile))
+        print(
+            f"Redacted {report.pages} pages in {report.wall_seconds:.1f} seconds "
+            f"({report.pages_per_second:.2f} pages per second)."
+        )
+    for name, error in failures.items():
+        print(f"Failed: {name}: {error}")
+    if failures:
+        raise SystemExit(1)
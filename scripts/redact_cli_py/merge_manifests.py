@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+from redact.types.batch_manifest import BatchManifest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Merge the manifests written by the shards of a batch "
+        "redaction (batch_redact.py --shard)."
+    )
+    parser.add_argument("manifest_paths", nargs="+")
+    parser.add_argument(
+        "--output", help="Path of the merged manifest. Printed if not given."
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    manifests = [
+        BatchManifest.from_dict(
+            json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        )
+        for manifest_path in args.manifest_paths
+    ]
+    merged = BatchManifest.merge(manifests)
+    merged_json = json.dumps(merged.to_dict(), indent=2)
+    if args.output:
+        Path(args.output).write_text(merged_json, encoding="utf-8")
+    else:
+        print(merged_json)
+
+    # The summary goes to stderr, so the merged manifest printed is valid JSON.
+    summary = merged.summary
+    print(
+        f"Merged {len(manifests)} manifests: {summary.document_count} documents "
+        f"and {summary.image_count} images, {summary.image_bytes} bytes of "
+        "redacted images.",
+        file=sys.stderr,
+    )
+    if summary.failure_count:
+        print(
+            f"{summary.failure_count} bundles failed, see the failures reports.",
+            file=sys.stderr,
+        )
+    missing_shards = merged.missing_shards()
+    if missing_shards:
+        print(f"Missing shards: {', '.join(missing_shards)}.", file=sys.stderr)
@@ -2,39 +2,72 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-import sys
+import argparse
 from redact import redact_image, redact_fott_label, redact_ocr_result
+from redact.types.encoder_profile import EncoderProfile
+
+
+def split_labels(labels: str):
+    return [] if not labels else labels.split(",")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Redact an image, an OCR result or a FOTT label file."
+    )
+    subparsers = parser.add_subparsers(dest="operator", required=True)
+
+    image_parser = subparsers.add_parser("image")
+    image_parser.add_argument("image_path")
+    image_parser.add_argument("fott_label_path")
+    image_parser.add_argument("output_path")
+    image_parser.add_argument("labels_to_redact", nargs="?", default="")
+    image_parser.add_argument(
+        "--encoder-profile",
+        choices=[profile.value for profile in EncoderProfile],
+        default=EncoderProfile.DEFAULT.value,
+    )
+
+    fott_parser = subparsers.add_parser("fott")
+    fott_parser.add_argument("fott_label_path")
+    fott_parser.add_argument("output_path")
+    fott_parser.add_argument("labels_to_redact", nargs="?", default="")
+
+    ocr_parser = subparsers.add_parser("ocr")
+    ocr_parser.add_argument("ocr_result_path")
+    ocr_parser.add_argument("fott_label_path")
+    ocr_parser.add_argument("output_path")
+    ocr_parser.add_argument("api_version")
+    ocr_parser.add_argument("labels_to_redact", nargs="?", default="")
+
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    operator = sys.argv[1]
-
-    if operator == "image":
-        labels_to_redact = [] if len(sys.argv) < 6 else sys.argv[5].split(",")
-        redact_image(
-            image_path=sys.argv[2],
-            fott_label_path=sys.argv[3],
-            output_path=sys.argv[4],
-            labels_to_redact=labels_to_redact,
+    args = parse_args()
+
+    if args.operator == "image":
+        bytes_written = redact_image(
+            image_path=args.image_path,
+            fott_label_path=args.fott_label_path,
+            output_path=args.output_path,
+            labels_to_redact=split_labels(args.labels_to_redact),
+            encoder_profile=EncoderProfile(args.encoder_profile),
         )
+        print(f"Wrote {bytes_written} bytes to {args.output_path}.")
 
-    elif operator == "fott":
-        labels_to_redact = [] if len(sys.argv) < 5 else sys.argv[4].split(",")
+    elif args.operator == "fott":
         redact_fott_label(
-            fott_label_path=sys.argv[2],
-            output_path=sys.argv[3],
-            labels_to_redact=labels_to_redact,
+            fott_label_path=args.fott_label_path,
+            output_path=args.output_path,
+            labels_to_redact=split_labels(args.labels_to_redact),
         )
 
-    elif operator == "ocr":
-        labels_to_redact = [] if len(sys.argv) < 7 else sys.argv[6].split(",")
+    elif args.operator == "ocr":
         redact_ocr_result(
-            ocr_result_path=sys.argv[2],
-            fott_label_path=sys.argv[3],
-            output_path=sys.argv[4],
-            api_version=sys.argv[5],
-            labels_to_redact=labels_to_redact,
+            ocr_result_path=args.ocr_result_path,
+            fott_label_path=args.fott_label_path,
+            output_path=args.output_path,
+            api_version=args.api_version,
+            labels_to_redact=split_labels(args.labels_to_redact),
         )
-
-    else:
-        raise NameError()
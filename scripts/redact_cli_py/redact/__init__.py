@@ -2,120 +2,291 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
+import codecs
+from concurrent.futures import Executor, wait
+from functools import partial
 from pathlib import Path
 import json
-from typing import List, Collection
+import shutil
+from typing import Collection, List, Optional, Tuple
 
 from PIL import Image, ImageOps
 from dacite import from_dict
 
+from redact.cache.match_cache import MatchCache, hash_bytes
+from redact.preprocess.pdf_renderer import MIN_RENDER_DPI, PdfDocument
 from redact.redaction.image_redaction import ImageRedaction
+from redact.redaction.pdf_redaction import PdfRedaction
 from redact.redaction.ocr_result_redaction import OcrResultRedaction
 from redact.redaction.fott_label_redaction import FottLabelRedaction
+from redact.redaction.redaction_planner import RedactionPlanner
+from redact.redaction.tiff_tile_redaction import TiffTileRedaction
 from redact.types.api_version import ApiVersion
+from redact.types.encoder_profile import EncoderProfile
 from redact.types.fott_label import FottLabel
 from redact.types.file_bundle import FileBundle
+from redact.types.redaction_plan import RedactionPlan
+from redact.types.render_mode import RenderMode
 from redact.utils.file_name import get_redacted_file_name
+from redact.utils.image_encoder import can_pass_through, get_image_format, save_image
+from redact.utils.metrics import count, timed
 
+# Encoder profiles which keep the compression of a TIFF image. The others ask
+# for a compression of their own, e.g. LZW under the archival profile.
+TILE_REDACTION_PROFILES = [EncoderProfile.DEFAULT]
 
+
+@timed("match")
+def plan_redaction(
+    fott_label_path: str,
+    ocr_result_path: Optional[str] = None,
+    api_version: ApiVersion = ApiVersion.V3_0,
+    labels_to_redact: Collection[str] = tuple(),
+    match_cache: Optional[MatchCache] = None,
+) -> RedactionPlan:
+    """Compute which labels, OCR words and image regions of a document are
+    redacted. The plan can be applied to the full document and, through
+    `RedactionPlan.for_page()`, to each of its pages."""
+    fott_label_bytes = Path(fott_label_path).read_bytes()
+    fott_label = from_dict(
+        data_class=FottLabel, data=json.loads(fott_label_bytes.decode("utf-8-sig"))
+    )
+    ocr_result = None
+    content_hashes = None
+    if ocr_result_path is not None and fott_label.has_entities(labels_to_redact):
+        ocr_result_bytes = Path(ocr_result_path).read_bytes()
+        ocr_result = json.loads(ocr_result_bytes.decode("utf-8-sig"))
+        if match_cache is not None:
+            content_hashes = (
+                hash_bytes(ocr_result_bytes),
+                hash_bytes(fott_label_bytes),
+            )
+
+    planner = RedactionPlanner(
+        fott_label,
+        ocr_result,
+        api_version,
+        labels_to_redact,
+        match_cache=match_cache,
+        content_hashes=content_hashes,
+    )
+    plan = planner.plan()
+    count("words_matched", len(plan.words))
+    return plan
+
+
+@timed("image")
 def redact_image(
     image_path: str,
     fott_label_path: str,
     output_path: str,
     labels_to_redact: Collection[str] = tuple(),
-):
-    with Image.open(image_path) as image, open(
-        fott_label_path, encoding="utf-8-sig"
-    ) as fott_label_json:
+    encoder_profile: EncoderProfile = EncoderProfile.DEFAULT,
+    plan: Optional[RedactionPlan] = None,
+) -> int:
+    if plan is None:
+        plan = plan_redaction(fott_label_path, labels_to_redact=labels_to_redact)
+
+    # Short path: re-encode only the tiles or strips of a TIFF under a region.
+    # Profiles asking for another compression re-encode the whole image.
+    if (
+        get_image_format(image_path) == "TIFF"
+        and get_image_format(output_path) == "TIFF"
+        and EncoderProfile(encoder_profile) in TILE_REDACTION_PROFILES
+    ):
+        tile_redaction = TiffTileRedaction(image_path, plan)
+        # Only the first page of a multi-page image is redacted into the output.
+        if tile_redaction.page_count == 1 and tile_redaction.is_supported():
+            bytes_written = tile_redaction.redact(output_path)
+            if bytes_written is not None:
+                return bytes_written
+
+    with Image.open(image_path) as source:
+        # Short path: nothing on the image is redacted, so stream the original
+        # bytes instead of decoding and re-encoding an unchanged image.
+        if len(plan.to_annotations(1, (1.0, 1.0))) == 0 and can_pass_through(
+            source, output_path, encoder_profile
+        ):
+            return pass_through(image_path, output_path)
 
         # Transpose the image based on EXIF orientation tag.
-        image = ImageOps.exif_transpose(image)
+        image = ImageOps.exif_transpose(source)
+
+        # Annotations of the plan are already filtered by labels_to_redact.
+        annots = plan.to_annotations(1, (image.width, image.height))
+
+        redaction = ImageRedaction(image=image, annotations=annots)
+        redaction.redact()
+
+        # Returns the number of bytes written.
+        return save_image(redaction.image, output_path, encoder_profile, source=source)
 
-        fott_label_dict = json.load(fott_label_json)
-        fott_label = from_dict(data_class=FottLabel, data=fott_label_dict)
 
-        # page_size = {page: (width, height)}
-        annots = fott_label.to_annotations(page_size={1: (image.width, image.height)})
+@timed("image")
+def redact_pdf(
+    pdf_path: str,
+    fott_label_path: str,
+    output_path: str,
+    labels_to_redact: Collection[str] = tuple(),
+    plan: Optional[RedactionPlan] = None,
+    render_target_dpi: int = 300,
+    render_mode: RenderMode = RenderMode.RGBA,
+    max_page_pixels: Optional[int] = None,
+    min_render_dpi: int = MIN_RENDER_DPI,
+) -> Tuple[int, List[int]]:
+    """Redact a PDF into a PDF, keeping the vector content of its pages.
+
+    Pages that cannot be redacted faithfully at the vector level are
+    rasterized at the render DPI. See `PdfRedaction`.
+
+    Returns:
+        Tuple[int, List[int]]: The number of bytes written, and the pages
+            rasterized.
+    """
+    if plan is None:
+        plan = plan_redaction(fott_label_path, labels_to_redact=labels_to_redact)
 
-        redaction = ImageRedaction(
-            image=image, annotations=annots, labels_to_redact=labels_to_redact
+    # Short path: nothing in the PDF is redacted.
+    if len(plan.regions) == 0:
+        return pass_through(pdf_path, output_path), []
+
+    with PdfDocument(pdf_path) as document:
+        count("pages", document.get_page_count())
+        redaction = PdfRedaction(
+            document,
+            plan,
+            render_target_dpi,
+            render_mode,
+            max_page_pixels,
+            min_render_dpi,
         )
-        redaction.redact()
+        rasterized_pages = redaction.redact()
+        return document.save_pages(output_path), rasterized_pages
 
-        redaction.image.save(output_path)
+
+@timed("image")
+def redact_tiff(
+    tiff_path: str,
+    fott_label_path: str,
+    output_path: str,
+    labels_to_redact: Collection[str] = tuple(),
+    plan: Optional[RedactionPlan] = None,
+) -> Optional[int]:
+    """Redact all pages of a TIFF into a TIFF, re-encoding only the tiles or
+    strips under a region. See `TiffTileRedaction`.
+
+    Returns:
+        Optional[int]: The number of bytes written, or None if the TIFF is
+            not supported, or its layout cannot hold the redacted tiles, and
+            nothing was written.
+    """
+    if plan is None:
+        plan = plan_redaction(fott_label_path, labels_to_redact=labels_to_redact)
+
+    redaction = TiffTileRedaction(tiff_path, plan)
+    if not redaction.is_supported():
+        return None
+    bytes_written = redaction.redact(output_path)
+    if bytes_written is not None:
+        count("pages", redaction.page_count)
+    return bytes_written
 
 
+@timed("label")
 def redact_fott_label(
     fott_label_path: str,
     output_path: str,
     labels_to_redact: Collection[str] = tuple(),
+    plan: Optional[RedactionPlan] = None,
 ):
-    with open(fott_label_path, encoding="utf-8-sig") as fott_label_json:
-        fott_label_dict = json.load(fott_label_json)
-        fott_label = from_dict(data_class=FottLabel, data=fott_label_dict)
+    fott_label_dict = read_json(fott_label_path)
+    fott_label = from_dict(data_class=FottLabel, data=fott_label_dict)
+    if plan is None:
+        plan = RedactionPlanner(fott_label, labels_to_redact=labels_to_redact).plan()
 
-        redaction = FottLabelRedaction(fott_label, labels_to_redact=labels_to_redact)
-        redaction.redact()
+    # Short path: no label is redacted, keep the original file.
+    if len(plan.labels) == 0:
+        pass_through(fott_label_path, output_path)
+        return
 
-        # Custom dumper because default JSON serializer
-        # does not support FottLabel.
-        def dumper(obj):
-            try:
-                return obj.toJSON()
-            except AttributeError:
-                return obj.__dict__
+    redaction = FottLabelRedaction(fott_label, labels_to_redact=plan.label_names())
+    redaction.redact()
 
-        Path(output_path).write_text(
-            json.dumps(redaction.fott_label, default=dumper), encoding="utf-8"
-        )
+    # Write the redacted texts back into the label as read, so the fields
+    # FottLabel does not model (e.g. "$schema" and "document") are kept, the
+    # same as in labels passed through.
+    for label_dict, label in zip(fott_label_dict["labels"], fott_label.labels):
+        for entity_dict, entity in zip(label_dict["value"], label.value):
+            entity_dict["text"] = entity.text
+    write_json(output_path, fott_label_dict, fott_label_path)
 
 
+@timed("ocr")
 def redact_ocr_result(
     ocr_result_path: str,
     fott_label_path: str,
     output_path: str,
     api_version: ApiVersion,
     labels_to_redact: Collection[str] = tuple(),
+    plan: Optional[RedactionPlan] = None,
 ):
-    with open(ocr_result_path, encoding="utf-8-sig") as ocr_result_json, open(
-        fott_label_path, encoding="utf-8-sig"
-    ) as fott_label_json:
-        fott_label_dict = json.load(fott_label_json)
-        fott_label = from_dict(data_class=FottLabel, data=fott_label_dict)
-
-        ocr_result = json.load(ocr_result_json)
-
-        # page_size = {page: (width, height)}
-        page_size = {}
-        if ApiVersion(api_version) in [
-            ApiVersion.V2_0,
-            ApiVersion.V2_1,
-        ]:
-            for read_result in ocr_result["analyzeResult"]["readResults"]:
-                page_size[read_result["page"]] = (
-                    read_result["width"],
-                    read_result["height"],
-                )
-        elif ApiVersion(api_version) in [
-            ApiVersion.V3_0,
-        ]:
-            pages = ocr_result["analyzeResult"]["pages"]
-            for page in pages:
-                page_number = page["pageNumber"]
-                page_size[page_number] = (page["width"], page["height"])
-
-        annots = fott_label.to_annotations(page_size=page_size)
-
-        redaction = OcrResultRedaction(
-            ocr_result,
-            annots,
-            api_version,
-            labels_to_redact,
+    ocr_result = None
+    if plan is not None and not plan.ocr_matched:
+        # The plan was built without the OCR result, e.g. for the image or
+        # label only, so its words are unknown. Match them for its labels.
+        labels_to_redact = plan.label_names()
+        plan = None
+    if plan is None:
+        fott_label = read_fott_label(fott_label_path)
+        if fott_label.has_entities(labels_to_redact):
+            ocr_result = read_ocr_result(ocr_result_path)
+        planner = RedactionPlanner(
+            fott_label, ocr_result, api_version, labels_to_redact
         )
+        plan = planner.plan()
+
+    # Short path: no word is redacted. Skip parsing and re-serializing the
+    # OCR result.
+    if len(plan.words) == 0:
+        pass_through(ocr_result_path, output_path)
+        return
+
+    if ocr_result is None:
+        ocr_result = read_ocr_result(ocr_result_path)
+
+    redaction = OcrResultRedaction(ocr_result, [], api_version)
+    redaction.redact_mapped_words(plan.words)
+
+    write_json(output_path, redaction.ocr_result, ocr_result_path)
+
+
+def read_fott_label(fott_label_path: str) -> FottLabel:
+    return from_dict(data_class=FottLabel, data=read_json(fott_label_path))
+
+
+def read_ocr_result(ocr_result_path: str) -> dict:
+    return read_json(ocr_result_path)
 
-        redaction.redact()
 
-        Path(output_path).write_text(json.dumps(redaction.ocr_result), encoding="utf-8")
+def read_json(path: str) -> dict:
+    with open(path, encoding="utf-8-sig") as json_file:
+        return json.load(json_file)
+
+
+def write_json(output_path: str, data: dict, input_path: str):
+    """Write a redacted JSON file in the encoding of its input file, i.e.
+    with a UTF-8 BOM only if the input has one, as in files passed through."""
+    with open(input_path, "rb") as input_file:
+        has_bom = input_file.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8
+    Path(output_path).write_text(
+        json.dumps(data), encoding="utf-8-sig" if has_bom else "utf-8"
+    )
+
+
+def pass_through(input_path: str, output_path: str) -> int:
+    """Copy the input file to the output unchanged and return its size."""
+    shutil.copyfile(input_path, output_path)
+    return Path(output_path).stat().st_size
 
 
 def redact_file_bundle(
@@ -124,26 +295,79 @@ def redact_file_bundle(
     out_folder: str,
     api_version: ApiVersion,
     labels_to_redact: Collection[str] = tuple(),
-):
+    encoder_profile: EncoderProfile = EncoderProfile.DEFAULT,
+    plan: Optional[RedactionPlan] = None,
+    match_cache: Optional[MatchCache] = None,
+    image_redacted: bool = False,
+    executor: Optional[Executor] = None,
+) -> int:
+    """Redact the image, label and OCR result of a bundle into out_folder.
+
+    With image_redacted, the image has already been redacted into out_folder
+    (e.g. in bands while rendering) and only the label and OCR result are.
+
+    The three redactions only share the plan, which they do not change. With
+    an executor (e.g. a `ThreadPoolExecutor`), they run concurrently on it.
+    All of them are waited for, and the first error in the order image,
+    label, OCR result is then raised.
+
+    Returns the number of bytes of the redacted image written.
+    """
     redacted_image_name = get_redacted_file_name(fb.image_file_name)
     redacted_fott_name = get_redacted_file_name(fb.fott_file_name)
     redacted_ocr_name = get_redacted_file_name(fb.ocr_file_name)
 
-    redact_image(
-        Path(in_folder, fb.image_file_name),
-        Path(in_folder, fb.fott_file_name),
-        Path(out_folder, redacted_image_name),
-        labels_to_redact=labels_to_redact,
-    )
-    redact_fott_label(
-        Path(in_folder, fb.fott_file_name),
-        Path(out_folder, redacted_fott_name),
-        labels_to_redact,
+    # One plan for the image, label and OCR redactions of the bundle.
+    if plan is None:
+        plan = plan_redaction(
+            Path(in_folder, fb.fott_file_name),
+            Path(in_folder, fb.ocr_file_name),
+            api_version,
+            labels_to_redact,
+            match_cache=match_cache,
+        )
+
+    steps = []
+    if not image_redacted:
+        steps.append(
+            partial(
+                redact_image,
+                Path(in_folder, fb.image_file_name),
+                Path(in_folder, fb.fott_file_name),
+                Path(out_folder, redacted_image_name),
+                labels_to_redact=labels_to_redact,
+                encoder_profile=encoder_profile,
+                plan=plan,
+            )
+        )
+    steps.append(
+        partial(
+            redact_fott_label,
+            Path(in_folder, fb.fott_file_name),
+            Path(out_folder, redacted_fott_name),
+            labels_to_redact,
+            plan=plan,
+        )
     )
-    redact_ocr_result(
-        Path(in_folder, fb.ocr_file_name),
-        Path(in_folder, fb.fott_file_name),
-        Path(out_folder, redacted_ocr_name),
-        api_version,
-        labels_to_redact,
+    steps.append(
+        partial(
+            redact_ocr_result,
+            Path(in_folder, fb.ocr_file_name),
+            Path(in_folder, fb.fott_file_name),
+            Path(out_folder, redacted_ocr_name),
+            api_version,
+            labels_to_redact,
+            plan=plan,
+        )
     )
+
+    if executor is None:
+        results = [step() for step in steps]
+    else:
+        futures = [executor.submit(step) for step in steps]
+        # Let every step finish before raising, so that no step is still
+        # writing to out_folder once the error is seen.
+        wait(futures)
+        results = [future.result() for future in futures]
+
+    return 0 if image_redacted else results[0]
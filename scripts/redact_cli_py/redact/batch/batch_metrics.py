@@ -0,0 +1,193 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_result import BundleResult
+from redact.types.match_stats import MatchStats
+from redact.types.metrics_report import MetricsReport, Percentiles, StageReport
+
+# Prefix of the Prometheus metric names.
+PROMETHEUS_PREFIX = "redact_batch"
+
+
+def build_report(
+    results: Iterable[BundleResult], batch_metrics: BundleMetrics, wall_seconds: float
+) -> MetricsReport:
+    """Summarize the results of a batch, and the metrics of the batch itself,
+    into a report."""
+    results = list(results)
+    totals = BundleMetrics()
+    # Wall seconds of every bundle, keyed by stage name.
+    stage_seconds: Dict[str, List[float]] = {}
+    peak_rss, peak_traced = [], []
+    for result in results:
+        if result.metrics is None:
+            continue
+        totals.add(result.metrics)
+        if result.metrics.peak_rss:
+            peak_rss.append(result.metrics.peak_rss)
+        if result.metrics.peak_traced:
+            peak_traced.append(result.metrics.peak_traced)
+        for name, stage in result.metrics.stages.items():
+            stage_seconds.setdefault(name, []).append(stage.wall_seconds)
+
+    counters = totals.counters
+    pages = int(counters.get("pages", 0))
+    return MetricsReport(
+        bundles=len(results),
+        failed=sum(1 for result in results if result.failed),
+        wall_seconds=wall_seconds,
+        pages=pages,
+        pages_per_second=pages / wall_seconds if wall_seconds > 0 else 0.0,
+        pages_downscaled=int(counters.get("pages_downscaled", 0)),
+        bytes_in=int(counters.get("bytes_in", 0)),
+        bytes_out=int(counters.get("bytes_out", 0)),
+        words_matched=int(counters.get("words_matched", 0)),
+        matching=MatchStats.from_counters(counters),
+        bundle_seconds=get_percentiles([result.seconds for result in results]),
+        peak_rss=get_percentiles(peak_rss),
+        peak_traced=get_percentiles(peak_traced),
+        stages={
+            name: StageReport(
+                wall_seconds=stage.wall_seconds,
+                cpu_seconds=stage.cpu_seconds,
+                calls=stage.calls,
+                bundles=len(stage_seconds[name]),
+                bundle_seconds=get_percentiles(stage_seconds[name]),
+                peak_rss=stage.peak_rss,
+                peak_traced=stage.peak_traced,
+            )
+            for name, stage in sorted(totals.stages.items())
+        },
+        batch_stages=dict(sorted(batch_metrics.stages.items())),
+        counters=dict(sorted(counters.items())),
+    )
+
+
+def get_percentiles(values: List[float]) -> Percentiles:
+    """Nearest rank percentiles of values."""
+    if not values:
+        return Percentiles()
+    values = sorted(values)
+
+    def rank(percent: int) -> float:
+        return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+    return Percentiles(p50=rank(50), p95=rank(95), p99=rank(99), max=values[-1])
+
+
+def get_quantiles(percentiles: Percentiles) -> Dict[str, float]:
+    """Percentiles as the samples of a Prometheus gauge, by quantile label."""
+    return {
+        f'{{quantile="{quantile}"}}': getattr(percentiles, name)
+        for quantile, name in [
+            ("0.5", "p50"),
+            ("0.95", "p95"),
+            ("0.99", "p99"),
+            ("1", "max"),
+        ]
+    }
+
+
+def write_report(report: MetricsReport, path: Path):
+    Path(path).write_text(json.dumps(report.to_dict(), indent=2), encoding="utf-8")
+
+
+def write_prometheus_textfile(report: MetricsReport, path: Path):
+    """Write the report as a textfile of the node exporter textfile collector.
+
+    The file is replaced atomically, so the collector never reads a partial
+    one.
+    """
+    lines = []
+
+    def gauge(name: str, description: str, samples: Dict[str, float]):
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {description}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        for labels, value in samples.items():
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}{labels} {value}")
+
+    gauge("bundles", "Input bundles of the last batch.", {"": report.bundles})
+    gauge("failed_bundles", "Input bundles failed.", {"": report.failed})
+    gauge("wall_seconds", "Wall time of the last batch.", {"": report.wall_seconds})
+    gauge("pages", "Pages redacted.", {"": report.pages})
+    gauge(
+        "pages_per_second", "Pages redacted per second.", {"": report.pages_per_second}
+    )
+    gauge(
+        "pages_downscaled",
+        "PDF pages rendered below the render DPI to fit the page pixel budget.",
+        {"": report.pages_downscaled},
+    )
+    gauge("bytes_in", "Bytes of the input files.", {"": report.bytes_in})
+    gauge("bytes_out", "Bytes of the redacted files.", {"": report.bytes_out})
+    gauge("words_matched", "Words matched by a label.", {"": report.words_matched})
+    matching = report.matching
+    gauge(
+        "match_pairs",
+        "Pairs of label and OCR bounding boxes compared.",
+        {"": matching.pairs},
+    )
+    gauge(
+        "match_prefilter_rejections",
+        "Pairs of bounding boxes rejected by their envelopes.",
+        {"": matching.prefilter_rejections},
+    )
+    gauge(
+        "match_intersections",
+        "Pairs of bounding boxes whose polygons were intersected.",
+        {"": matching.intersections},
+    )
+    gauge("match_matches", "Pairs of bounding boxes matched.", {"": matching.matches})
+    gauge(
+        "match_seconds", "Time spent matching bounding boxes.", {"": matching.seconds}
+    )
+    gauge(
+        "bundle_seconds",
+        "Percentiles of the wall time of the bundles.",
+        get_quantiles(report.bundle_seconds),
+    )
+    gauge(
+        "bundle_peak_rss_bytes",
+        "Percentiles of the peak RSS of the bundles.",
+        get_quantiles(report.peak_rss),
+    )
+    gauge(
+        "bundle_peak_traced_bytes",
+        "Percentiles of the peak traced Python allocations of the bundles.",
+        get_quantiles(report.peak_traced),
+    )
+    stages = {
+        **{f'{{stage="{name}"}}': stage for name, stage in report.stages.items()},
+        **{
+            f'{{stage="{name}",scope="batch"}}': stage
+            for name, stage in report.batch_stages.items()
+        },
+    }
+    gauge(
+        "stage_seconds",
+        "Wall time spent in a stage.",
+        {labels: stage.wall_seconds for labels, stage in stages.items()},
+    )
+    gauge(
+        "stage_cpu_seconds",
+        "CPU time spent in a stage.",
+        {labels: stage.cpu_seconds for labels, stage in stages.items()},
+    )
+    gauge(
+        "stage_peak_rss_bytes",
+        "Highest peak RSS in a stage.",
+        {labels: stage.peak_rss for labels, stage in stages.items()},
+    )
+
+    path = Path(path)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(temporary_path, path)
@@ -0,0 +1,185 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from contextlib import nullcontext
+import math
+from pathlib import Path
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from redact import TILE_REDACTION_PROFILES
+from redact.batch.bundle_pool import BundlePool
+from redact.batch.cost_model import estimate_cost
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_result import BundleResult
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.split_document import SplitDocument
+from redact.utils.file_name import is_pdf, is_tiff
+from redact.utils.metrics import recording
+
+# Estimated seconds of a document above which it is split into page tasks.
+DEFAULT_SPLIT_SECONDS = 60.0
+
+
+class BatchScheduler:
+    """Run the bundles of a batch on a pool of workers, largest first.
+
+    With several workers, the batch takes as long as its slowest worker, so
+    a large document started last leaves the other workers idle while it
+    finishes. The cost of every bundle is estimated before any is started
+    (see `estimate_cost`), and the most costly bundles are started first.
+    Documents estimated to take longer than split_seconds are also split
+    into page tasks of about split_seconds each, run like any other task,
+    and finished by a last task merging their pages and redacting their full
+    label and OCR result. The estimated memory of every task is set too, for
+    pools admitting tasks by a memory budget.
+
+    With a single worker, bundles are run in the order they are given.
+    """
+
+    def __init__(
+        self, pool: BundlePool, split_seconds: Optional[float] = DEFAULT_SPLIT_SECONDS
+    ):
+        self.pool = pool
+        self.runner = pool.runner
+        self.split_seconds = split_seconds
+        # Documents split into page tasks, keyed by their image name.
+        self.documents: Dict[str, SplitDocument] = {}
+
+    def run(
+        self, bundles: Iterable[Tuple[FileType, FileBundle]]
+    ) -> Iterator[BundleResult]:
+        """Redact bundles, yielding the result of every input bundle as it
+        finishes."""
+        if self.pool.workers == 1:
+            yield from self.pool.run(BundleTask(mode, fb) for mode, fb in bundles)
+            return
+
+        tasks = []
+        for mode, fb in bundles:
+            tasks.extend(self.plan_tasks(mode, fb))
+        tasks.sort(key=lambda task: task.cost, reverse=True)
+        for result in self.pool.run(tasks):
+            if result.task.pages is None and not result.task.finish:
+                yield result
+                continue
+            document_result = self.add_document_result(result)
+            if document_result is not None:
+                yield document_result
+
+    def plan_tasks(self, mode: FileType, fb: FileBundle) -> List[BundleTask]:
+        runner = self.runner
+        folder = (
+            runner.pre_folder if mode == FileType.MULTI_PAGE else runner.input_folder
+        )
+        try:
+            cost = estimate_cost(fb, folder, runner.options)
+        except Exception as error:  # noqa: PIE786
+            # The bundle fails once it runs.
+            print(f"Failed to estimate the cost of {fb.image_file_name}: {error}")
+            return [BundleTask(mode, fb)]
+
+        if (
+            mode != FileType.MULTI_PAGE
+            or self.split_seconds is None
+            or cost.seconds <= self.split_seconds
+            or cost.page_count < 2
+            or not self.is_split_by_page(fb)
+        ):
+            return [BundleTask(mode, fb, cost=cost.seconds, memory=cost.memory_bytes)]
+
+        # Planning is part of the document, though it is done here.
+        metrics = BundleMetrics() if self.pool.record_metrics else None
+        try:
+            with recording(metrics) if metrics is not None else nullcontext():
+                plan = runner.plan_document(fb)
+        except Exception as error:  # noqa: PIE786
+            print(f"Failed to plan {fb.image_file_name}: {error}")
+            return [BundleTask(mode, fb, cost=cost.seconds, memory=cost.memory_bytes)]
+
+        page_seconds = cost.seconds / cost.page_count
+        pages_per_task = max(1, math.floor(self.split_seconds / page_seconds))
+        # Pages of the split document, staged until it is finished.
+        pages_folder = Path(self.pool.staging_folder, f"pages-{len(self.documents)}")
+        pages_folder.mkdir(parents=True)
+        self.documents[fb.image_file_name] = SplitDocument(
+            str(pages_folder),
+            tasks_left=math.ceil(cost.page_count / pages_per_task),
+            metrics=metrics,
+        )
+        tasks = []
+        for first in range(1, cost.page_count + 1, pages_per_task):
+            last = min(first + pages_per_task - 1, cost.page_count)
+            tasks.append(
+                BundleTask(
+                    mode,
+                    fb,
+                    cost=page_seconds * (last - first + 1),
+                    memory=cost.memory_bytes,
+                    pages=(first, last),
+                    plan=plan,
+                    page_count=cost.page_count,
+                    output_folder=str(pages_folder),
+                )
+            )
+        return tasks
+
+    def is_split_by_page(self, fb: FileBundle) -> bool:
+        """Whether a document is redacted page by page, and not as a whole
+        by the vector PDF or TIFF tile paths."""
+        options = self.runner.options
+        if is_pdf(fb.image_file_name):
+            return not options.vector_pdf
+        return is_tiff(fb.image_file_name) and not (
+            options.merge_pages
+            and not options.keep_page_files
+            and options.encoder_profile in TILE_REDACTION_PROFILES
+        )
+
+    def add_document_result(self, result: BundleResult) -> Optional[BundleResult]:
+        """Add the result of a task of a split document. Returns the result
+        of the document once it is done."""
+        task = result.task
+        document = self.documents[task.bundle.image_file_name]
+        document.tasks_left -= 1
+        document.image_bytes += result.image_bytes
+        document.seconds += result.seconds
+        document.timed_out = document.timed_out or result.timed_out
+        if result.failed and document.error is None:
+            document.error = result.error
+        if result.metrics is not None:
+            if document.metrics is None:
+                document.metrics = BundleMetrics()
+            document.metrics.add(result.metrics)
+
+        if task.finish or (document.tasks_left == 0 and document.error is not None):
+            del self.documents[task.bundle.image_file_name]
+            # Nothing of a failed document is left.
+            shutil.rmtree(document.pages_folder, ignore_errors=True)
+            return BundleResult(
+                BundleTask(task.mode, task.bundle),
+                image_bytes=0 if document.error else document.image_bytes,
+                seconds=document.seconds,
+                error=document.error,
+                timed_out=document.timed_out,
+                metrics=document.metrics,
+            )
+
+        if document.tasks_left == 0:
+            # All pages are done: finish the document in the folder of its
+            # pages, moved to the output once it is finished.
+            document.tasks_left = 1
+            self.pool.add(
+                BundleTask(
+                    task.mode,
+                    task.bundle,
+                    plan=task.plan,
+                    memory=task.memory,
+                    finish=True,
+                    page_count=task.page_count,
+                    staging_folder=document.pages_folder,
+                )
+            )
+        return None
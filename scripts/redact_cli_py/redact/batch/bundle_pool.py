@@ -0,0 +1,288 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from collections import deque
+from contextlib import nullcontext
+import cProfile
+import itertools
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+import shutil
+import time
+import traceback
+import tracemalloc
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from redact.batch.bundle_runner import BundleRunner
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_result import BundleResult
+from redact.types.bundle_task import BundleTask
+from redact.utils.metrics import recording
+
+
+class BundlePool:
+    """Run the tasks of a batch so that a failing task does not stop the
+    others.
+
+    A task that raises is reported as failed in its `BundleResult`, and the
+    next tasks go on. Every task writes into a staging folder, whose files
+    are moved into the output folder only if the task succeeds, so a failed
+    task leaves no partial output.
+
+    With more than one worker or with a timeout, every task runs in a child
+    process of its own, up to workers at a time. A task that crashes its
+    process, e.g. in PDFium, fails on its own, and the process of a task
+    running longer than timeout seconds is killed.
+
+    With record_metrics, the stages and counters of every task are recorded
+    into its result, see `redact.utils.metrics`. With profile_every, one in
+    that many tasks is also run under cProfile, and its profile and the calls
+    of its stages kept in its metrics. Only the thread running the task is
+    profiled. The peak RSS of every task, and with trace_memory the peak of
+    its Python allocations traced by tracemalloc, are recorded in its metrics
+    too.
+
+    With a memory budget in bytes, a task is only started while the estimated
+    memory of the running tasks and its own (`BundleTask.memory`) fit the
+    budget. The first task waiting that fits is started, so tasks larger than
+    the budget left wait for running tasks to finish, while smaller ones may
+    start before them. A task larger than the whole budget runs alone.
+    """
+
+    def __init__(
+        self,
+        runner: BundleRunner,
+        staging_folder: str,
+        workers: int = 1,
+        timeout: Optional[float] = None,
+        record_metrics: bool = False,
+        profile_every: Optional[int] = None,
+        trace_memory: bool = False,
+        memory_budget: Optional[int] = None,
+    ):
+        if workers < 1:
+            raise ValueError("A bundle pool needs at least one worker.")
+        if profile_every is not None and profile_every < 1:
+            raise ValueError("Tasks are profiled one in at least one.")
+        self.runner = runner
+        self.staging_folder = Path(staging_folder)
+        self.workers = workers
+        self.timeout = timeout
+        self.record_metrics = record_metrics
+        self.profile_every = profile_every
+        self.trace_memory = trace_memory
+        self.memory_budget = memory_budget
+        self.pending: Deque[BundleTask] = deque()
+        self._task_ids = itertools.count()
+        self._tasks_started = itertools.count()
+
+    @property
+    def isolated(self) -> bool:
+        return self.workers > 1 or self.timeout is not None
+
+    def add(self, task: BundleTask):
+        """Run a task next, e.g. from the consumer of `run()`."""
+        self.pending.appendleft(task)
+
+    def run(self, tasks: Iterable[BundleTask]) -> Iterator[BundleResult]:
+        """Run tasks in order, yielding their results as they finish."""
+        self.pending.extend(tasks)
+        if self.isolated:
+            yield from self.run_isolated()
+            return
+
+        while self.pending:
+            task = self.pending.popleft()
+            folder = self.get_staging_folder(task)
+            start = time.perf_counter()
+            image_bytes, error, metrics = run_task(
+                self.runner.with_output_folder(folder), task, **self.get_task_options()
+            )
+            if error is None:
+                yield self.succeed(task, start, image_bytes, folder, metrics)
+            else:
+                yield self.fail(task, start, error, folder, metrics)
+
+    def run_isolated(self) -> Iterator[BundleResult]:
+        context = multiprocessing.get_context()
+        # (process, task, start, staging folder), keyed by the connection the
+        # process sends its result to.
+        running: Dict[Connection, tuple] = {}
+        while True:
+            while self.pending and len(running) < self.workers:
+                task = self.admit(
+                    sum(task.memory for _, task, _, _ in running.values()),
+                    len(running),
+                )
+                if task is None:
+                    break
+                folder = self.get_staging_folder(task)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=run_task_process,
+                    args=(self.runner.with_output_folder(folder), task, sender),
+                    kwargs=self.get_task_options(),
+                    daemon=True,
+                )
+                process.start()
+                # The child holds the only sender left, so a child dying
+                # without a result closes the pipe.
+                sender.close()
+                running[receiver] = (process, task, time.perf_counter(), folder)
+            if not running:
+                return
+
+            wait_seconds = None
+            if self.timeout is not None:
+                first_start = min(start for _, _, start, _ in running.values())
+                wait_seconds = max(0, first_start + self.timeout - time.perf_counter())
+            for receiver in wait(list(running), wait_seconds):
+                process, task, start, folder = running.pop(receiver)
+                try:
+                    image_bytes, error, metrics = receiver.recv()
+                except EOFError:
+                    image_bytes, error, metrics = 0, None, None
+                process.join()
+                receiver.close()
+                if error is None and process.exitcode != 0:
+                    error = f"The process exited with code {process.exitcode}."
+                if error is None:
+                    yield self.succeed(task, start, image_bytes, folder, metrics)
+                else:
+                    yield self.fail(task, start, error, folder, metrics)
+
+            if self.timeout is None:
+                continue
+            now = time.perf_counter()
+            for receiver, (process, task, start, folder) in list(running.items()):
+                if now - start < self.timeout:
+                    continue
+                del running[receiver]
+                process.kill()
+                process.join()
+                receiver.close()
+                result = self.fail(
+                    task, start, f"Timed out after {self.timeout} seconds.", folder
+                )
+                result.timed_out = True
+                yield result
+
+    def admit(self, running_memory: int, running_count: int) -> Optional[BundleTask]:
+        """Take the next task to start, None if none fits the memory budget
+        left."""
+        if self.memory_budget is None or running_count == 0:
+            return self.pending.popleft()
+        for index, task in enumerate(self.pending):
+            if running_memory + task.memory <= self.memory_budget:
+                del self.pending[index]
+                return task
+        return None
+
+    def get_task_options(self) -> Dict[str, Any]:
+        """The options of `run_task()` for the task started next."""
+        started = next(self._tasks_started)
+        return {
+            "record_metrics": self.record_metrics,
+            "profile": self.profile_every is not None
+            and started % self.profile_every == 0,
+            "trace_memory": self.trace_memory,
+        }
+
+    def get_staging_folder(self, task: BundleTask) -> Path:
+        if task.staging_folder is not None:
+            return Path(task.staging_folder)
+        folder = Path(self.staging_folder, str(next(self._task_ids)))
+        folder.mkdir(parents=True)
+        return folder
+
+    def succeed(
+        self,
+        task: BundleTask,
+        start: float,
+        image_bytes: int,
+        folder: Path,
+        metrics: Optional[BundleMetrics] = None,
+    ) -> BundleResult:
+        output_folder = task.output_folder or self.runner.output_folder
+        Path(output_folder).mkdir(parents=True, exist_ok=True)
+        bytes_out = 0
+        for child in folder.iterdir():
+            bytes_out += child.stat().st_size
+            shutil.move(str(child), Path(output_folder, child.name))
+        folder.rmdir()
+        # Files staged for another task (e.g. pages of a split document) are
+        # counted once they reach the output folder.
+        if metrics is not None and task.output_folder is None:
+            metrics.counters["bytes_out"] = bytes_out
+        return BundleResult(
+            task,
+            image_bytes=image_bytes,
+            seconds=time.perf_counter() - start,
+            metrics=metrics,
+        )
+
+    def fail(
+        self,
+        task: BundleTask,
+        start: float,
+        error: str,
+        folder: Path,
+        metrics: Optional[BundleMetrics] = None,
+    ) -> BundleResult:
+        print(f"Failed to redact {task.bundle.image_file_name}: {error}")
+        shutil.rmtree(folder)
+        return BundleResult(
+            task, seconds=time.perf_counter() - start, error=error, metrics=metrics
+        )
+
+
+def run_task(
+    runner: BundleRunner,
+    task: BundleTask,
+    record_metrics: bool = False,
+    profile: bool = False,
+    trace_memory: bool = False,
+) -> Tuple[int, Optional[str], Optional[BundleMetrics]]:
+    """Run a task. Returns its (image bytes, error, metrics)."""
+    metrics = None
+    if record_metrics or profile or trace_memory:
+        metrics = BundleMetrics()
+    profiler = None
+    if profile:
+        metrics.events = []
+        profiler = cProfile.Profile()
+    # Only the tracing started here is stopped.
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    try:
+        with recording(metrics, memory=True) if metrics is not None else nullcontext():
+            with profiler if profiler is not None else nullcontext():
+                return runner.run_task(task), None, metrics
+    except Exception as error:  # noqa: PIE786
+        # Any error of a task fails the task only.
+        traceback.print_exc()
+        return 0, format_error(error), metrics
+    finally:
+        if start_tracing:
+            tracemalloc.stop()
+        if profiler is not None:
+            profiler.create_stats()
+            metrics.profile = profiler.stats
+
+
+def run_task_process(
+    runner: BundleRunner,
+    task: BundleTask,
+    connection: Connection,
+    **options,
+):
+    """Run a task in a child process, and send its result."""
+    connection.send(run_task(runner, task, **options))
+    connection.close()
+
+
+def format_error(error: Exception) -> str:
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
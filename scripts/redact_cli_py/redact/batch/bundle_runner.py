@@ -0,0 +1,313 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from redact import (
+    TILE_REDACTION_PROFILES,
+    plan_redaction,
+    redact_file_bundle,
+    redact_fott_label,
+    redact_ocr_result,
+    redact_pdf,
+    redact_tiff,
+)
+from redact.cache.match_cache import MatchCache
+from redact.cache.render_cache import RenderCache
+from redact.postprocess import merge_multi_page_bundle
+from redact.preprocess import get_page_bundle, preprocess_multi_page_bundle
+from redact.redaction.banded_page_redaction import BandedPageRedaction
+from redact.types.batch_options import BatchOptions
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.redaction_plan import RedactionPlan
+from redact.utils.file_name import get_redacted_file_name, is_pdf, is_tiff
+from redact.utils.metrics import count
+
+# Steps of a bundle redacted concurrently with bundle threads: image, label and
+# OCR result.
+BUNDLE_STEPS = 3
+
+
+class BundleRunner:
+    """Redact the bundles of a batch, one input bundle at a time.
+
+    Multi-page bundles are read from pre_folder and single page ones from
+    input_folder. The pages of multi-page documents are extracted into
+    input_folder. All redacted files are written to output_folder.
+
+    With the bundle_threads option, the steps of a bundle run on a thread pool
+    of the runner, made on first use and shut down by `close()`.
+    """
+
+    def __init__(
+        self,
+        options: BatchOptions,
+        pre_folder: str,
+        input_folder: str,
+        output_folder: str,
+        match_cache: Optional[MatchCache] = None,
+        render_cache: Optional[RenderCache] = None,
+    ):
+        self.options = options
+        self.pre_folder = pre_folder
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.match_cache = match_cache
+        self.render_cache = render_cache
+        self._executor: Optional[Executor] = None
+
+    def __getstate__(self):
+        # Thread pools cannot be shared with worker processes.
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        if self.options.bundle_threads and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=BUNDLE_STEPS)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def with_output_folder(self, output_folder: str) -> "BundleRunner":
+        """A runner writing into another output folder, sharing everything
+        else with this one."""
+        runner = type(self)(
+            self.options,
+            self.pre_folder,
+            self.input_folder,
+            output_folder,
+            match_cache=self.match_cache,
+            render_cache=self.render_cache,
+        )
+        runner._executor = self.executor
+        return runner
+
+    def run_task(self, task: BundleTask) -> int:
+        """Run a task of a batch. Returns the bytes of redacted images."""
+        if task.pages is None:
+            folder = self.input_folder
+            if task.mode == FileType.MULTI_PAGE:
+                folder = self.pre_folder
+            fb = task.bundle
+            count(
+                "bytes_in",
+                sum(
+                    Path(folder, name).stat().st_size
+                    for name in [
+                        fb.image_file_name,
+                        fb.fott_file_name,
+                        fb.ocr_file_name,
+                    ]
+                ),
+            )
+        if task.finish:
+            return self.finish_document(task.bundle, task.page_count, task.plan)
+        if task.pages is not None:
+            first, last = task.pages
+            pages = range(first, last + 1)
+            return self.redact_document_pages(task.bundle, task.plan, pages)[1]
+        return self.redact_bundle(task.bundle, task.mode)
+
+    def redact_bundle(self, fb: FileBundle, mode: FileType) -> int:
+        """Redact an input bundle. Returns the bytes of redacted images."""
+        if mode == FileType.MULTI_PAGE:
+            return self.redact_document(fb)
+        count("pages")
+        return self.redact_image_bundle(fb)
+
+    def redact_image_bundle(
+        self,
+        fb: FileBundle,
+        plan: Optional[RedactionPlan] = None,
+        image_redacted: bool = False,
+    ) -> int:
+        options = self.options
+        return redact_file_bundle(
+            fb,
+            self.input_folder,
+            self.output_folder,
+            options.api_version,
+            options.labels_to_redact,
+            options.encoder_profile,
+            plan=plan,
+            match_cache=self.match_cache,
+            image_redacted=image_redacted,
+            executor=self.executor,
+        )
+
+    def plan_document(self, fb: FileBundle) -> RedactionPlan:
+        # Match the labels against the full OCR result only once. The plan is
+        # then applied to the full document and to every page.
+        return plan_redaction(
+            Path(self.pre_folder, fb.fott_file_name),
+            Path(self.pre_folder, fb.ocr_file_name),
+            self.options.api_version,
+            self.options.labels_to_redact,
+            match_cache=self.match_cache,
+        )
+
+    def redact_document(self, fb: FileBundle) -> int:
+        """Redact a PDF or TIFF bundle, its full label and OCR result, and
+        its pages."""
+        plan = self.plan_document(fb)
+        image_bytes = self.redact_document_image(fb, plan)
+        self.redact_document_results(fb, plan)
+        return image_bytes
+
+    def redact_document_results(self, fb: FileBundle, plan: RedactionPlan):
+        options = self.options
+        # Short path: preprocess folder -> output folder.
+        # We still need to redact the full label file.
+        redact_fott_label(
+            Path(self.pre_folder, fb.fott_file_name),
+            Path(self.output_folder, get_redacted_file_name(fb.fott_file_name)),
+            options.labels_to_redact,
+            plan=plan,
+        )
+
+        # We still need to redact the full ocr file.
+        redact_ocr_result(
+            Path(self.pre_folder, fb.ocr_file_name),
+            Path(self.pre_folder, fb.fott_file_name),
+            Path(self.output_folder, get_redacted_file_name(fb.ocr_file_name)),
+            options.api_version,
+            options.labels_to_redact,
+            plan=plan,
+        )
+
+    def finish_document(
+        self, fb: FileBundle, page_count: int, plan: RedactionPlan
+    ) -> int:
+        """Finish a document whose pages were redacted by `redact_pages()`
+        into the output folder: redact its full label and OCR result, and
+        merge its pages. Returns the bytes of redacted images added."""
+        self.redact_document_results(fb, plan)
+        if not self.options.merge_pages:
+            return 0
+        page_bundles = [get_page_bundle(fb, page) for page in range(1, page_count + 1)]
+        return self.merge_pages(fb, page_bundles, 0)
+
+    def redact_document_image(self, fb: FileBundle, plan: RedactionPlan) -> int:
+        options = self.options
+        output_path = Path(
+            self.output_folder, get_redacted_file_name(fb.image_file_name)
+        )
+        if (
+            options.merge_pages
+            and not options.keep_page_files
+            and is_tiff(fb.image_file_name)
+            and options.encoder_profile in TILE_REDACTION_PROFILES
+        ):
+            # The merged TIFF is the source TIFF with only the tiles under a
+            # region re-encoded, if its layout and compression are supported.
+            tiff_bytes = redact_tiff(
+                Path(self.pre_folder, fb.image_file_name),
+                Path(self.pre_folder, fb.fott_file_name),
+                output_path,
+                options.labels_to_redact,
+                plan=plan,
+            )
+            if tiff_bytes is not None:
+                return tiff_bytes
+
+        if options.vector_pdf and is_pdf(fb.image_file_name):
+            # The PDF is redacted into a PDF. There are no per page images
+            # and results.
+            pdf_bytes, rasterized_pages = redact_pdf(
+                Path(self.pre_folder, fb.image_file_name),
+                Path(self.pre_folder, fb.fott_file_name),
+                output_path,
+                options.labels_to_redact,
+                plan=plan,
+                render_target_dpi=options.render_dpi,
+                render_mode=options.render_mode,
+                max_page_pixels=options.max_page_pixels,
+                min_render_dpi=options.min_render_dpi,
+            )
+            if rasterized_pages:
+                print(f"Rasterized pages {rasterized_pages} of {fb.image_file_name}.")
+            return pdf_bytes
+
+        page_bundles, image_bytes = self.redact_document_pages(fb, plan)
+        if options.merge_pages:
+            image_bytes = self.merge_pages(fb, page_bundles, image_bytes)
+        return image_bytes
+
+    def redact_document_pages(
+        self,
+        fb: FileBundle,
+        plan: RedactionPlan,
+        pages: Optional[Iterable[int]] = None,
+    ) -> Tuple[List[FileBundle], int]:
+        """Redact the pages of a document, or only the given ones. Returns
+        the page bundles and the bytes of their redacted images."""
+        options = self.options
+        banded_redaction = None
+        if options.band_page_pixels is not None:
+            banded_redaction = BandedPageRedaction(
+                plan,
+                self.output_folder,
+                options.band_page_pixels,
+                options.band_height,
+                options.encoder_profile,
+            )
+
+        page_bundles = preprocess_multi_page_bundle(
+            fb,
+            self.pre_folder,
+            self.input_folder,
+            options.render_dpi,
+            render_cache=self.render_cache,
+            render_mode=options.render_mode,
+            max_page_pixels=options.max_page_pixels,
+            min_pdf_render_dpi=options.min_render_dpi,
+            banded_redaction=banded_redaction,
+            pages=pages,
+        )
+        if pages is None:
+            pages = range(1, len(page_bundles) + 1)
+        # Bytes of the page images redacted in bands, keyed by their file name.
+        banded_images = {}
+        if banded_redaction is not None:
+            banded_images = banded_redaction.redacted_images
+
+        image_bytes = sum(banded_images.values())
+        for page, page_fb in zip(pages, page_bundles):
+            image_bytes += self.redact_image_bundle(
+                page_fb,
+                plan=plan.for_page(page),
+                image_redacted=page_fb.image_file_name in banded_images,
+            )
+        return page_bundles, image_bytes
+
+    def merge_pages(
+        self, fb: FileBundle, page_bundles: List[FileBundle], image_bytes: int
+    ) -> int:
+        """Merge the redacted pages of a document. Returns the bytes of
+        redacted images left in the output folder."""
+        if not self.options.keep_page_files:
+            image_bytes -= sum(
+                Path(
+                    self.output_folder, get_redacted_file_name(page_fb.image_file_name)
+                )
+                .stat()
+                .st_size
+                for page_fb in page_bundles
+            )
+        return image_bytes + merge_multi_page_bundle(
+            fb,
+            page_bundles,
+            self.pre_folder,
+            self.output_folder,
+            self.options.encoder_profile,
+            keep_page_files=self.options.keep_page_files,
+        )
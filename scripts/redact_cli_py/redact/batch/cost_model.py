@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+
+from PIL import Image
+
+from redact.preprocess.pdf_renderer import PdfDocument, fit_render_dpi, get_render_size
+from redact.preprocess.tiff_renderer import TiffRenderer
+from redact.types.batch_options import BatchOptions
+from redact.types.bundle_cost import BundleCost
+from redact.types.file_bundle import FileBundle
+from redact.utils.file_name import is_pdf, is_tiff
+from redact.utils.tiff_file import read_tiff_directories
+
+# Rough seconds per unit of work, measured on the sample documents. Only their
+# ratios matter to order bundles.
+# A PDF page rendered at REFERENCE_DPI, redacted and encoded as PNG.
+PDF_PAGE_SECONDS = 1.0
+REFERENCE_DPI = 300
+# A TIFF page decoded, redacted and encoded as PNG, besides its bytes.
+TIFF_PAGE_SECONDS = 0.1
+# A byte of an image or TIFF decoded and encoded.
+IMAGE_BYTE_SECONDS = 4e-7
+# A word of the OCR result parsed, matched and written.
+WORD_SECONDS = 1e-5
+
+# Rough peak memory of a bundle, measured as the peak RSS of the process
+# redacting the sample documents: the process itself, a few copies of its
+# largest page (rendered or decoded, redacted and encoded), and the parsed OCR
+# result and label, many times their JSON size.
+BASE_MEMORY_BYTES = 40 * 1024 * 1024
+PAGE_PIXEL_BYTES = 8
+OCR_BYTE_MEMORY = 12
+
+# Every word of the OCR result has a confidence, and so does the appearance of
+# a line in v2.1. Selection marks and v3 styles are counted too, which is
+# close enough.
+CONFIDENCE_KEY = b'"confidence"'
+APPEARANCE_KEY = b'"appearance"'
+
+
+def estimate_cost(fb: FileBundle, folder: str, options: BatchOptions) -> BundleCost:
+    """Estimate the cost of a bundle in folder from its file sizes, page count
+    and size, and OCR word count, without decoding any of it."""
+    image_path = Path(folder, fb.image_file_name)
+    ocr_path = Path(folder, fb.ocr_file_name)
+    cost = BundleCost(
+        page_count=get_page_count(image_path),
+        image_bytes=image_path.stat().st_size,
+        word_count=count_words(ocr_path),
+        page_pixels=get_max_page_pixels(image_path, options),
+    )
+    cost.memory_bytes = (
+        BASE_MEMORY_BYTES
+        + cost.page_pixels * PAGE_PIXEL_BYTES
+        + (ocr_path.stat().st_size + Path(folder, fb.fott_file_name).stat().st_size)
+        * OCR_BYTE_MEMORY
+    )
+    cost.seconds = cost.word_count * WORD_SECONDS
+    if is_pdf(fb.image_file_name):
+        scale = (options.render_dpi / REFERENCE_DPI) ** 2
+        cost.seconds += cost.page_count * PDF_PAGE_SECONDS * scale
+    else:
+        if is_tiff(fb.image_file_name):
+            cost.seconds += cost.page_count * TIFF_PAGE_SECONDS
+        cost.seconds += cost.image_bytes * IMAGE_BYTE_SECONDS
+    return cost
+
+
+def get_page_count(image_path: Path) -> int:
+    """The pages of a PDF or TIFF, read from its page tree or directories
+    only, or 1 for other images."""
+    if is_pdf(image_path.name):
+        with PdfDocument(image_path) as document:
+            return document.get_page_count()
+    if is_tiff(image_path.name):
+        with open(image_path, "rb") as file:
+            try:
+                return len(read_tiff_directories(file)[1])
+            except ValueError:
+                # E.g. BigTIFF.
+                pass
+        return TiffRenderer().get_page_count(image_path)
+    return 1
+
+
+def get_max_page_pixels(image_path: Path, options: BatchOptions) -> int:
+    """The pixels of the largest page of an image, PDF or TIFF, read from
+    its header, page tree or directories only. PDF pages are measured as
+    rendered with the options, or as their bands if redacted in bands."""
+    if is_pdf(image_path.name):
+        pixels = 0
+        with PdfDocument(image_path) as document:
+            for page_number in range(1, document.get_page_count() + 1):
+                width, height = document.get_page_size(page_number)
+                dpi = fit_render_dpi(
+                    width,
+                    height,
+                    options.render_dpi,
+                    options.max_page_pixels,
+                    options.min_render_dpi,
+                )
+                render_width, render_height = get_render_size(width, height, dpi)
+                page_pixels = render_width * render_height
+                if options.band_page_pixels and page_pixels > options.band_page_pixels:
+                    page_pixels = render_width * min(render_height, options.band_height)
+                pixels = max(pixels, page_pixels)
+        return pixels
+    if is_tiff(image_path.name):
+        with open(image_path, "rb") as file:
+            try:
+                directories = read_tiff_directories(file)[1]
+                return max(
+                    directory.get_value(256) * directory.get_value(257)
+                    for directory in directories
+                )
+            except ValueError:
+                # E.g. BigTIFF, measured by its first page below.
+                pass
+    with Image.open(image_path) as image:
+        return image.width * image.height
+
+
+def count_words(ocr_path: Path) -> int:
+    """The words of an OCR result, counted without parsing it."""
+    content = ocr_path.read_bytes()
+    return content.count(CONFIDENCE_KEY) - content.count(APPEARANCE_KEY)
@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import heapq
+import json
+import marshal
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_result import BundleResult
+
+
+class ProfileKeeper:
+    """Keep the profiles of the slowest bundles of a batch.
+
+    Results are added as they finish, and only the profiles of the slowest
+    bundles so far are held. `write()` writes, for each of them from the
+    slowest, a cProfile stats file (`<rank>-<image name>.prof`, for pstats,
+    snakeviz and the like) and a timeline of its stages in the Chrome trace
+    format (`<rank>-<image name>.trace.json`, for chrome://tracing and
+    Perfetto).
+    """
+
+    def __init__(self, folder: str, slowest: int):
+        if slowest < 1:
+            raise ValueError("At least one profile is kept.")
+        self.folder = Path(folder)
+        self.slowest = slowest
+        # Min-heap of (seconds, order added, image name, metrics).
+        self.kept: List[Tuple[float, int, str, BundleMetrics]] = []
+        self.added = 0
+
+    def add(self, result: BundleResult):
+        """Add a result, keeping its profile if it is among the slowest. The
+        profile and timeline are taken out of the result."""
+        metrics = result.metrics
+        if metrics is None or metrics.profile is None:
+            return
+        kept = BundleMetrics(events=metrics.events, profile=metrics.profile)
+        metrics.events, metrics.profile = None, None
+        entry = (result.seconds, self.added, result.bundle.image_file_name, kept)
+        self.added += 1
+        if len(self.kept) < self.slowest:
+            heapq.heappush(self.kept, entry)
+        else:
+            heapq.heappushpop(self.kept, entry)
+
+    def write(self) -> List[Path]:
+        """Write the profiles kept. Returns the paths of the stats files."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for rank, (seconds, _, name, kept) in enumerate(
+            sorted(self.kept, reverse=True), start=1
+        ):
+            stem = f"{rank:02d}-{name.replace('/', '_')}"
+            path = Path(self.folder, f"{stem}.prof")
+            # The format of `cProfile.Profile.dump_stats()`.
+            with open(path, "wb") as file:
+                marshal.dump(kept.profile, file)
+            Path(self.folder, f"{stem}.trace.json").write_text(
+                json.dumps(build_trace(name, seconds, kept)), encoding="utf-8"
+            )
+            paths.append(path)
+        return paths
+
+
+def build_trace(name: str, seconds: float, metrics: BundleMetrics) -> Dict:
+    """The calls of the stages of a bundle in the Chrome trace format, with
+    times in microseconds from its first stage."""
+    events = metrics.events or []
+    origin = min((event.start for event in events), default=0.0)
+    trace_events = [
+        {
+            "name": event.name,
+            "cat": "stage",
+            "ph": "X",
+            "ts": (event.start - origin) * 1e6,
+            "dur": event.seconds * 1e6,
+            "pid": event.process,
+            "tid": event.thread,
+        }
+        for event in events
+    ]
+    return {
+        "traceEvents": trace_events,
+        "displayTimeUnit": "ms",
+        "otherData": {"bundle": name, "seconds": seconds},
+    }
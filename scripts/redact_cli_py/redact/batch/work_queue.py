@@ -0,0 +1,221 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.work_item import WorkItem
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue:
+    """A queue of input bundles shared by the workers of a batch.
+
+    The queue is a SQLite database, e.g. on storage shared by the worker
+    nodes. Workers lease one bundle at a time for lease_seconds, and renew
+    the lease while they work on it. A bundle whose lease expires, because
+    its worker died or hung, is leased again by another worker. A bundle is
+    leased at most max_attempts times, after which it is marked failed.
+
+    Leases compare wall clock times across workers, so the clocks of the
+    worker nodes must be in sync to well within lease_seconds. The database
+    is kept in rollback journal mode, as WAL mode does not work on network
+    file systems.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._connections = threading.local()
+
+    def __getstate__(self):
+        # SQLite connections cannot be shared with worker processes.
+        return {
+            "path": self.path,
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["lease_seconds"], state["max_attempts"])
+
+    def enqueue(self, bundles: Iterable[Tuple[FileType, FileBundle]]) -> int:
+        """Add bundles to the queue. Bundles already in the queue, whatever
+        their status, are skipped. Returns the number of bundles added."""
+        connection = self.connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO items "
+                "(image_file_name, fott_file_name, ocr_file_name, mode, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        bundle.image_file_name,
+                        bundle.fott_file_name,
+                        bundle.ocr_file_name,
+                        mode.name,
+                        QUEUED,
+                    )
+                    for mode, bundle in bundles
+                ),
+            )
+            return connection.total_changes - before
+
+    def lease(self, worker: str) -> Optional[WorkItem]:
+        """Lease the next queued bundle, or None if none is queued."""
+        connection = self.connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self.expire_leases(connection)
+            row = connection.execute(
+                "SELECT id, image_file_name, fott_file_name, ocr_file_name, mode, "
+                "attempts FROM items WHERE status = ? ORDER BY id LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            item_id, image, fott, ocr, mode, attempts = row
+            connection.execute(
+                "UPDATE items SET status = ?, worker = ?, attempts = ?, "
+                "lease_expires = ? WHERE id = ?",
+                (LEASED, worker, attempts + 1, self.lease_deadline(), item_id),
+            )
+        return WorkItem(
+            item_id, FileType[mode], FileBundle(image, fott, ocr), attempts + 1
+        )
+
+    def renew(self, item: WorkItem, worker: str) -> bool:
+        """Extend the lease of an item. Returns False if the lease was lost."""
+        return self.update(
+            "UPDATE items SET lease_expires = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (self.lease_deadline(), item.id, worker, LEASED),
+        )
+
+    def complete(self, item: WorkItem, worker: str) -> bool:
+        """Mark a leased item done. Returns False if the lease was lost."""
+        return self.update(
+            "UPDATE items SET status = ?, error = NULL "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, item.id, worker, LEASED),
+        )
+
+    def fail(self, item: WorkItem, worker: str, error: str) -> bool:
+        """Give a leased item back after an error. It is queued again unless
+        it has been leased max_attempts times. Returns False if the lease
+        was lost."""
+        status = FAILED if item.attempts >= self.max_attempts else QUEUED
+        return self.update(
+            "UPDATE items SET status = ?, error = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (status, error, item.id, worker, LEASED),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """The number of items of each status."""
+        connection = self.connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self.expire_leases(connection)
+            rows = connection.execute(
+                "SELECT status, COUNT(*) FROM items GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in [QUEUED, LEASED, DONE, FAILED]}
+        counts.update(dict(rows))
+        return counts
+
+    def failures(self) -> Dict[str, str]:
+        """The errors of the failed items, keyed by image file name."""
+        connection = self.connect()
+        rows = connection.execute(
+            "SELECT image_file_name, error FROM items WHERE status = ? ORDER BY id",
+            (FAILED,),
+        ).fetchall()
+        return dict(rows)
+
+    def expire_leases(self, connection: sqlite3.Connection):
+        now = time.time()
+        connection.execute(
+            "UPDATE items SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "error = 'The lease expired.' WHERE status = ? AND lease_expires < ?",
+            (self.max_attempts, FAILED, QUEUED, LEASED, now),
+        )
+
+    def lease_deadline(self) -> float:
+        return time.time() + self.lease_seconds
+
+    def update(self, sql: str, parameters: tuple) -> bool:
+        connection = self.connect()
+        with connection:
+            cursor = connection.execute(sql, parameters)
+            return cursor.rowcount > 0
+
+    def connect(self) -> sqlite3.Connection:
+        # One connection per thread, e.g. for the thread renewing leases, and
+        # a new one in forked worker processes.
+        connection = getattr(self._connections, "connection", None)
+        if connection is None or self._connections.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.path), timeout=60, isolation_level=None
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id INTEGER PRIMARY KEY, "
+                "image_file_name TEXT NOT NULL UNIQUE, "
+                "fott_file_name TEXT NOT NULL, ocr_file_name TEXT NOT NULL, "
+                "mode TEXT NOT NULL, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, lease_expires REAL, error TEXT)"
+            )
+            self._connections.connection = connection
+            self._connections.pid = os.getpid()
+        return connection
+
+
+class LeaseKeeper:
+    """Renew the lease of an item on a background thread until closed."""
+
+    def __init__(self, queue: WorkQueue, item: WorkItem, worker: str):
+        self.queue = queue
+        self.item = item
+        self.worker = worker
+        self.lost = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+
+    def run(self):
+        # Renew well before the lease expires.
+        while not self._stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.item, self.worker):
+                self.lost = True
+                return
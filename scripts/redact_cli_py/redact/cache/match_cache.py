@@ -0,0 +1,125 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import asdict
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from redact.types.redaction_plan import RedactedWord
+
+# Bump when the cached value layout or the matching semantics change.
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class MatchCache:
+    """On-disk cache of annotation to OCR word matches.
+
+    Entries are keyed by the OCR result and FOTT label content hashes, the API
+    version and the overlap thresholds, and hold the matched words of every
+    bounding box of the label, so any subset of labels can reuse them. The
+    cache is a SQLite database, which serializes concurrent writers from
+    multiple worker processes. The least recently used entries are evicted
+    once the cached values exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        # SQLite connections cannot be shared with worker processes.
+        return {"path": self.path, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_bytes"])
+
+    @staticmethod
+    def build_key(
+        ocr_hash: str,
+        label_hash: str,
+        api_version: str,
+        thresholds: Sequence[float],
+    ) -> str:
+        material = json.dumps(
+            [CACHE_FORMAT_VERSION, ocr_hash, label_hash, api_version, list(thresholds)]
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[List[RedactedWord]]]:
+        connection = self.connect()
+        with connection:
+            row = connection.execute(
+                "SELECT value FROM matches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE matches SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return [
+            [RedactedWord(**word) for word in words] for words in json.loads(row[0])
+        ]
+
+    def put(self, key: str, matches: List[List[RedactedWord]]):
+        value = json.dumps(
+            [[asdict(word) for word in words] for words in matches]
+        ).encode("utf-8")
+        if len(value) > self.max_bytes:
+            return
+
+        connection = self.connect()
+        with connection:
+            # Take the write lock up front so that concurrent evictions
+            # cannot interleave.
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO matches (key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self.evict(connection)
+
+    def evict(self, connection: sqlite3.Connection):
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM matches"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute(
+            "SELECT key, size FROM matches ORDER BY last_used ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM matches WHERE key = ?", (key,))
+            total -= size
+
+    def connect(self) -> sqlite3.Connection:
+        # Reconnect in forked worker processes.
+        if self._connection is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.path), timeout=60, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,139 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from collections import deque
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+PAGE_SUFFIX = ".png"
+PAGE_COUNT_SUFFIX = ".pages"
+
+# (mtime, size, path) of a cached page.
+Entry = Tuple[float, int, str]
+
+
+class RenderCache:
+    """Local folder caching rendered PDF pages.
+
+    Pages are keyed by the PDF content hash, the page number, the render DPI
+    and the render flags, and are stored as the lossless PNG files the
+    renderer writes, so a hit is a plain file copy. Page counts are cached as
+    well, so documents whose pages are all cached never reach PDFium. Entries
+    are written atomically and the least recently used ones are evicted once
+    the folder exceeds `max_bytes`.
+
+    The size of the folder is tracked in memory, so it is only scanned on the
+    first put, and when an eviction has used up the pages of the last scan.
+    Pages put by other processes are counted from the next scan on.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.folder.mkdir(parents=True, exist_ok=True)
+        # Bytes of the cached pages as of the last scan, plus those put and
+        # minus those evicted since. None until the first scan.
+        self.total_bytes: Optional[int] = None
+        # Pages of the last scan left to evict, least recently used first.
+        self.candidates: Deque[Entry] = deque()
+
+    @staticmethod
+    def build_key(pdf_hash: str, page_number: int, dpi: int, flags: str) -> str:
+        material = f"{pdf_hash}:{page_number}:{dpi}:{flags}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, output_file: str) -> bool:
+        entry = Path(self.folder, key + PAGE_SUFFIX)
+        try:
+            shutil.copyfile(entry, output_file)
+            # Refresh the entry for the LRU eviction.
+            os.utime(entry)
+        except FileNotFoundError:
+            # Missing, or evicted by another process in the meantime.
+            return False
+        return True
+
+    def put(self, key: str, input_file: str):
+        data = Path(input_file).read_bytes()
+        # A page put again replaces its entry, whose size is no longer cached.
+        try:
+            replaced_size = Path(self.folder, key + PAGE_SUFFIX).stat().st_size
+        except FileNotFoundError:
+            replaced_size = 0
+        self.write(key + PAGE_SUFFIX, data)
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for _, size, _ in self.scan())
+        else:
+            self.total_bytes += len(data) - replaced_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def get_page_count(self, pdf_hash: str) -> Optional[int]:
+        try:
+            return int(Path(self.folder, pdf_hash + PAGE_COUNT_SUFFIX).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_page_count(self, pdf_hash: str, page_count: int):
+        self.write(pdf_hash + PAGE_COUNT_SUFFIX, str(page_count).encode("utf-8"))
+
+    def write(self, name: str, data: bytes):
+        # Write to a temporary file first so that concurrent readers never see
+        # a partially written entry.
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, Path(self.folder, name))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def evict(self):
+        """Evict the least recently used pages until the folder fits."""
+        while self.total_bytes > self.max_bytes:
+            if not self.candidates:
+                entries = self.scan()
+                self.total_bytes = sum(size for _, size, _ in entries)
+                self.candidates = deque(sorted(entries))
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+            mtime, size, path = self.candidates.popleft()
+            try:
+                used = os.stat(path).st_mtime > mtime
+            except FileNotFoundError:
+                # Evicted by another process in the meantime.
+                self.total_bytes -= size
+                continue
+            # Pages used since the scan are left to the next one.
+            if not used:
+                Path(path).unlink(missing_ok=True)
+                self.total_bytes -= size
+
+    def scan(self) -> List[Entry]:
+        entries = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.name.endswith(PAGE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
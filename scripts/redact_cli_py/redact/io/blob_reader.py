@@ -2,48 +2,122 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
 from azure.storage.blob import ContainerClient
 
 from redact.types.file_bundle import FileBundle
 from redact.types.file_bundle import FileType
+from redact.types.shard import Shard
+from redact.utils.bundle_pairer import BundlePairer
+from redact.utils.metrics import stage, timed
+
+# Blobs up to this size are downloaded in a single request. Larger ones are
+# downloaded in ranges of CHUNK_BYTES, on parallel requests.
+LARGE_BLOB_BYTES = 32 * 1024 * 1024
+CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
 
 
 class BlobReader:
-    def __init__(self, container_url: str, prefix: str):
-        self.container_client = ContainerClient.from_container_url(container_url)
+    """Read bundles from a virtual folder of a blob container.
+
+    Blobs are streamed to disk, so at most max_concurrency chunks of a large
+    blob are held in memory instead of the whole blob.
+    """
+
+    def __init__(
+        self,
+        container_url: str,
+        prefix: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.container_client = ContainerClient.from_container_url(
+            container_url,
+            max_single_get_size=LARGE_BLOB_BYTES,
+            max_chunk_get_size=CHUNK_BYTES,
+        )
         self.prefix = prefix
+        self.max_concurrency = max_concurrency
+        # Bundles of every file type, listed on first use.
+        self.bundles: Optional[Dict[FileType, List[FileBundle]]] = None
+        # Blob names and sizes of the listed files, keyed by file name.
+        self.blob_names: Dict[str, str] = {}
+        self.blob_sizes: Dict[str, int] = {}
+
+    def list_bundles(self, mode=FileType.SINGLE_PAGE_IMAGE) -> Iterator[FileBundle]:
+        """Yield the bundles of a file type as soon as they are paired."""
+        for file_type, bundle in self.iter_bundles():
+            if file_type == mode:
+                yield bundle
+
+    def iter_bundles(self) -> Iterator[Tuple[FileType, FileBundle]]:
+        """Yield the (type, bundle) of every bundle as soon as it is paired,
+        while the listing pages come in. The prefix is listed once: once
+        listed, the bundles are yielded again from memory."""
+        if self.bundles is not None:
+            for file_type, bundles in self.bundles.items():
+                for bundle in bundles:
+                    yield file_type, bundle
+            return
+
+        bundles = {file_type: [] for file_type in FileType}
+        paired = BundlePairer().pair(self.list_names())
+        while True:
+            with stage("list"):
+                file_type, bundle = next(paired, (None, None))
+            if bundle is None:
+                break
+            bundles[file_type].append(bundle)
+            yield file_type, bundle
+        self.bundles = bundles
+
+    def list_names(self) -> Iterator[str]:
+        blobs = self.container_client.list_blobs(name_starts_with=self.prefix)
+        for blob in blobs:
+            name = Path(blob.name).name
+            if name not in self.blob_names:
+                self.blob_names[name] = blob.name
+                self.blob_sizes[name] = blob.size
+            yield name
+
+    @timed("download")
+    def download_bundle(self, bundle: FileBundle, to: str):
+        for name in [
+            bundle.image_file_name,
+            bundle.fott_file_name,
+            bundle.ocr_file_name,
+        ]:
+            blob_name = self.blob_names.get(name, self.prefix + name)
+            max_concurrency = 1
+            if self.blob_sizes.get(name, 0) > LARGE_BLOB_BYTES:
+                max_concurrency = self.max_concurrency
+            with open(Path(to, name), "wb") as file:
+                self.container_client.download_blob(
+                    blob_name, max_concurrency=max_concurrency
+                ).readinto(file)
 
     def download_bundles(
-        self, to: str, mode=FileType.SINGLE_PAGE_IMAGE
+        self,
+        to: str,
+        mode=FileType.SINGLE_PAGE_IMAGE,
+        shard: Optional[Shard] = None,
     ) -> List[FileBundle]:
-        blobs = self.container_client.list_blobs(name_starts_with=self.prefix)
-        all_file_name_list = [Path(blob.name).name for blob in blobs]
-        file_bundles = FileBundle.from_names(all_file_name_list, mode)
-
-        for bundle in file_bundles:
-            image_blob_path = self.prefix + bundle.image_file_name
-            fott_blob_path = self.prefix + bundle.fott_file_name
-            ocr_blob_path = self.prefix + bundle.ocr_file_name
-
-            image_path = Path(to, bundle.image_file_name)
-            fott_path = Path(to, bundle.fott_file_name)
-            ocr_path = Path(to, bundle.ocr_file_name)
-
-            with open(image_path, "wb") as image_file, open(
-                fott_path, "wb"
-            ) as fott_file, open(ocr_path, "wb") as ocr_file:
-
-                image_file.write(
-                    self.container_client.download_blob(image_blob_path).readall()
-                )
-                fott_file.write(
-                    self.container_client.download_blob(fott_blob_path).readall()
-                )
-                ocr_file.write(
-                    self.container_client.download_blob(ocr_blob_path).readall()
-                )
+        """Download the bundles of a file type, or only those of a shard."""
+        return self.download_all_bundles({mode: to}, shard)[mode]
 
+    def download_all_bundles(
+        self, folders: Dict[FileType, str], shard: Optional[Shard] = None
+    ) -> Dict[FileType, List[FileBundle]]:
+        """Download the bundles of every file type in folders into its folder,
+        or only those of a shard, each as soon as it is paired."""
+        file_bundles = {file_type: [] for file_type in folders}
+        for file_type, bundle in self.iter_bundles():
+            if file_type not in folders or (
+                shard is not None and not shard.includes(bundle.image_file_name)
+            ):
+                continue
+            self.download_bundle(bundle, folders[file_type])
+            file_bundles[file_type].append(bundle)
         return file_bundles
@@ -6,12 +6,15 @@ from pathlib import Path
 
 from azure.storage.blob import ContainerClient
 
+from redact.utils.metrics import timed
+
 
 class BlobWriter:
     def __init__(self, container_url: str, prefix: str):
         self.container_client = ContainerClient.from_container_url(container_url)
         self.prefix = prefix
 
+    @timed("upload")
     def upload_files(self, folder: str):
         for child in Path(folder).iterdir():
             with open(child, "rb") as data:
@@ -2,35 +2,117 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 import shutil
 
 from redact.types.file_bundle import FileBundle
 from redact.types.file_bundle import FileType
+from redact.types.shard import Shard
+from redact.utils.bundle_pairer import BundlePairer
+from redact.utils.metrics import stage, timed
 
 
 class LocalReader:
-    def __init__(self, input_path: str):
+    """Read bundles from a local folder.
+
+    With link, bundle files are hardlinked instead of copied, so the files
+    are not read and written again. Files on another file system, or on one
+    without hardlinks, are still copied.
+    """
+
+    def __init__(self, input_path: str, link: bool = False):
         self.input_path = Path(input_path)
+        self.link = link
+        # Bundles of every file type, listed on first use.
+        self.bundles: Optional[Dict[FileType, List[FileBundle]]] = None
+        # Paths of the listed files, keyed by file name.
+        self.paths: Dict[str, str] = {}
 
-    def copy_bundles(
-        self, to: str, mode=FileType.SINGLE_PAGE_IMAGE
-    ) -> List[FileBundle]:
-        file_names = [path.name for path in self.input_path.glob("**/*")]
-        file_bundles = FileBundle.from_names(file_names, mode)
+    def list_bundles(self, mode=FileType.SINGLE_PAGE_IMAGE) -> Iterator[FileBundle]:
+        """Yield the bundles of a file type as soon as they are paired."""
+        for file_type, bundle in self.iter_bundles():
+            if file_type == mode:
+                yield bundle
+
+    def iter_bundles(self) -> Iterator[Tuple[FileType, FileBundle]]:
+        """Yield the (type, bundle) of every bundle as soon as it is paired.
+        The input folder is walked once: once walked, the bundles are
+        yielded again from memory."""
+        if self.bundles is not None:
+            for file_type, bundles in self.bundles.items():
+                for bundle in bundles:
+                    yield file_type, bundle
+            return
 
-        for bundle in file_bundles:
-            image_input_path = Path(self.input_path, bundle.image_file_name)
-            fott_input_path = Path(self.input_path, bundle.fott_file_name)
-            ocr_input_path = Path(self.input_path, bundle.ocr_file_name)
+        bundles = {file_type: [] for file_type in FileType}
+        paired = BundlePairer().pair(self.list_names())
+        while True:
+            with stage("list"):
+                file_type, bundle = next(paired, (None, None))
+            if bundle is None:
+                break
+            bundles[file_type].append(bundle)
+            yield file_type, bundle
+        self.bundles = bundles
 
-            image_path = Path(to, bundle.image_file_name)
-            fott_path = Path(to, bundle.fott_file_name)
-            ocr_path = Path(to, bundle.ocr_file_name)
+    def list_names(self) -> Iterator[str]:
+        """Walk the input folder and its subfolders, yielding file names.
+        Symbolic links to folders are not followed, as os.walk does, so that
+        links looping back to a parent folder do not walk forever."""
+        folders = [self.input_path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif entry.is_file():
+                        self.paths.setdefault(entry.name, entry.path)
+                        yield entry.name
 
-            shutil.copy2(image_input_path, image_path)
-            shutil.copy2(fott_input_path, fott_path)
-            shutil.copy2(ocr_input_path, ocr_path)
+    @timed("download")
+    def copy_bundle(self, bundle: FileBundle, to: str):
+        for name in [
+            bundle.image_file_name,
+            bundle.fott_file_name,
+            bundle.ocr_file_name,
+        ]:
+            input_path = self.paths.get(name, Path(self.input_path, name))
+            if self.link:
+                link_or_copy(input_path, Path(to, name))
+            else:
+                shutil.copy2(input_path, Path(to, name))
 
+    def copy_bundles(
+        self,
+        to: str,
+        mode=FileType.SINGLE_PAGE_IMAGE,
+        shard: Optional[Shard] = None,
+    ) -> List[FileBundle]:
+        """Copy the bundles of a file type, or only those of a shard."""
+        return self.copy_all_bundles({mode: to}, shard)[mode]
+
+    def copy_all_bundles(
+        self, folders: Dict[FileType, str], shard: Optional[Shard] = None
+    ) -> Dict[FileType, List[FileBundle]]:
+        """Copy the bundles of every file type in folders into its folder, or
+        only those of a shard, each as soon as it is paired."""
+        file_bundles = {file_type: [] for file_type in folders}
+        for file_type, bundle in self.iter_bundles():
+            if file_type not in folders or (
+                shard is not None and not shard.includes(bundle.image_file_name)
+            ):
+                continue
+            self.copy_bundle(bundle, folders[file_type])
+            file_bundles[file_type].append(bundle)
         return file_bundles
+
+
+def link_or_copy(input_path: str, output_path: str):
+    """Hardlink the input file to the output path, or copy it if it cannot be
+    linked. The linked file is the input file: it must not be written to."""
+    try:
+        os.link(input_path, output_path)
+    except OSError:
+        shutil.copy2(input_path, output_path)
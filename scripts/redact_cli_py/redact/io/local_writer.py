@@ -5,11 +5,14 @@
 from pathlib import Path
 import shutil
 
+from redact.utils.metrics import timed
+
 
 class LocalWriter:
     def __init__(self, output_path: str):
         self.output_path = Path(output_path)
         Path(self.output_path).mkdir(parents=True, exist_ok=True)
 
+    @timed("upload")
     def copy_files(self, folder: str):
         shutil.copytree(folder, self.output_path, dirs_exist_ok=True)
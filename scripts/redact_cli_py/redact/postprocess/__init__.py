@@ -0,0 +1,47 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+from typing import List
+
+from redact.postprocess.page_merger import merge_page_images
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.file_bundle import FileBundle
+from redact.utils.file_name import get_redacted_file_name
+from redact.utils.metrics import timed
+
+
+@timed("merge")
+def merge_multi_page_bundle(
+    fb: FileBundle,
+    page_bundles: List[FileBundle],
+    pre_folder: str,
+    out_folder: str,
+    encoder_profile: EncoderProfile = EncoderProfile.DEFAULT,
+    keep_page_files: bool = False,
+) -> int:
+    """Merge the redacted pages of a PDF or TIFF bundle in out_folder into one
+    redacted file of the same format, next to its redacted full label and OCR
+    result. The per page images and results are removed unless
+    keep_page_files. Returns the number of bytes of the merged file."""
+    page_image_paths = [
+        Path(out_folder, get_redacted_file_name(page_fb.image_file_name))
+        for page_fb in page_bundles
+    ]
+    image_bytes = merge_page_images(
+        page_image_paths,
+        Path(out_folder, get_redacted_file_name(fb.image_file_name)),
+        encoder_profile,
+        source_path=Path(pre_folder, fb.image_file_name),
+    )
+
+    if not keep_page_files:
+        for page_fb in page_bundles:
+            for name in [
+                page_fb.image_file_name,
+                page_fb.fott_file_name,
+                page_fb.ocr_file_name,
+            ]:
+                Path(out_folder, get_redacted_file_name(name)).unlink()
+    return image_bytes
@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image, TiffImagePlugin
+
+from redact.types.encoder_profile import EncoderProfile
+from redact.utils.image_encoder import encoder_params, get_image_format
+
+# TIFF compressions of a source that are carried over to the merged TIFF.
+LOSSLESS_TIFF_COMPRESSIONS = [
+    "raw",
+    "packbits",
+    "tiff_lzw",
+    "tiff_adobe_deflate",
+    "tiff_deflate",
+]
+# Fax compressions, which only apply to bilevel pages.
+BILEVEL_TIFF_COMPRESSIONS = ["group3", "group4"]
+# Lossless compression of the merged TIFF for sources compressed otherwise,
+# e.g. with JPEG, so that pages are not re-encoded lossily nor uncompressed.
+FALLBACK_TIFF_COMPRESSION = "tiff_adobe_deflate"
+# Resolution of pages without one. PDF pages are sized by it.
+DEFAULT_DPI = 72
+
+
+def merge_page_images(
+    page_image_paths: List[str],
+    output_path: str,
+    profile: EncoderProfile = EncoderProfile.DEFAULT,
+    source_path: Optional[str] = None,
+) -> int:
+    """Write page images into one multi-page TIFF or PDF, one page at a time.
+
+    Only one page is decoded at a time, so memory is bounded by the largest
+    page. The format follows the extension of the output path. TIFF pages
+    keep the lossless compression of the source TIFF under the default
+    profile, and are Deflate compressed if it is lossy. PDF pages are sized by the resolution of their image.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    image_format = get_image_format(output_path)
+    profile = EncoderProfile(profile)
+    if image_format == "TIFF":
+        merge_tiff(page_image_paths, output_path, profile, source_path)
+    elif image_format == "PDF":
+        merge_pdf(page_image_paths, output_path, profile)
+    else:
+        raise ValueError("Pages can only be merged into a TIFF or PDF.")
+    return Path(output_path).stat().st_size
+
+
+def merge_tiff(
+    page_image_paths: List[str],
+    output_path: str,
+    profile: EncoderProfile,
+    source_path: Optional[str] = None,
+):
+    source_compression = None
+    if source_path is not None and profile == EncoderProfile.DEFAULT:
+        with Image.open(source_path) as source:
+            source_compression = source.info.get("compression")
+
+    with TiffImagePlugin.AppendingTiffWriter(str(output_path), new=True) as tiff:
+        for page_image_path in page_image_paths:
+            with Image.open(page_image_path) as page:
+                params = encoder_params(page, "TIFF", profile)
+                if source_compression in LOSSLESS_TIFF_COMPRESSIONS or (
+                    source_compression in BILEVEL_TIFF_COMPRESSIONS and page.mode == "1"
+                ):
+                    params["compression"] = source_compression
+                elif source_compression is not None:
+                    params["compression"] = FALLBACK_TIFF_COMPRESSION
+                if "dpi" in page.info:
+                    params["dpi"] = page.info["dpi"]
+                page.save(tiff, format="TIFF", **params)
+            tiff.newFrame()
+
+
+def merge_pdf(page_image_paths: List[str], output_path: str, profile: EncoderProfile):
+    for index, page_image_path in enumerate(page_image_paths):
+        with Image.open(page_image_path) as page:
+            dpi = page.info.get("dpi", (DEFAULT_DPI, DEFAULT_DPI))
+            # PDF pages have no alpha channel.
+            image = page if page.mode in ["1", "L", "RGB"] else page.convert("RGB")
+            # Every page after the first one is appended to the file.
+            image.save(
+                output_path,
+                format="PDF",
+                append=index > 0,
+                resolution=round(dpi[0]),
+                **encoder_params(image, "PDF", profile),
+            )
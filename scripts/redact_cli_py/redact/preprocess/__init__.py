@@ -3,11 +3,23 @@
 # root for license information.
 
 from pathlib import Path
-from typing import List
+from typing import Iterable, List, Optional
 
+from PIL import Image
+
+from redact.cache.render_cache import RenderCache, hash_file
+from redact.redaction.banded_page_redaction import BandedPageRedaction
 from redact.types.file_bundle import FileBundle
+from redact.types.render_mode import RenderMode
 from redact.utils.file_name import get_page_file_name, is_pdf, is_tiff
-from redact.preprocess.pdf_renderer import PdfRenderer
+from redact.utils.metrics import count, timed
+from redact.preprocess.pdf_renderer import (
+    MIN_RENDER_DPI,
+    PdfDocument,
+    PdfRenderer,
+    PdfSource,
+    get_render_flags,
+)
 from redact.preprocess.tiff_renderer import TiffRenderer
 from redact.preprocess.multi_page import extract_page_label, extract_page_ocr
 
@@ -17,7 +29,20 @@ def preprocess_multi_page_bundle(
     pre_folder: str,
     in_folder: str,
     target_pdf_render_dpi: int = 300,
+    render_cache: Optional[RenderCache] = None,
+    render_mode: RenderMode = RenderMode.RGBA,
+    max_page_pixels: Optional[int] = None,
+    min_pdf_render_dpi: int = MIN_RENDER_DPI,
+    banded_redaction: Optional[BandedPageRedaction] = None,
+    pages: Optional[Iterable[int]] = None,
 ) -> List[FileBundle]:
+    """Split a PDF or TIFF bundle into per page bundles in in_folder, or only
+    the given pages of it.
+
+    With banded_redaction, PDF pages it accepts are rendered and redacted in
+    bands straight to its output folder instead of being rendered to
+    in_folder. Their per page label and OCR result are still extracted.
+    """
     if is_pdf(fb.image_file_name):
         renderer = PdfRenderer()
     elif is_tiff(fb.image_file_name):
@@ -25,62 +50,182 @@ def preprocess_multi_page_bundle(
     else:
         raise ValueError("File should be PDF or TIFF.")
 
-    ret = []
-    page_count = renderer.get_page_count(
-        Path(pre_folder, fb.image_file_name),
-    )
-    for page in range(1, page_count + 1):
-        # Render raw image per page.
-        page_image_name = get_page_file_name(
-            fb.image_file_name,
-            page,
-            ".rendered.png",
-        )
-        if is_pdf(fb.image_file_name):
-            renderer.render_pdf_and_save(
-                Path(pre_folder, fb.image_file_name),
-                Path(in_folder, page_image_name),
-                target_pdf_render_dpi,
-                page_number=page,
+    pdf_hash = None
+    page_count = None
+    if render_cache is not None and is_pdf(fb.image_file_name):
+        pdf_hash = hash_file(Path(pre_folder, fb.image_file_name))
+        page_count = render_cache.get_page_count(pdf_hash)
+
+    # A PDF is loaded once for all its pages, and only if a page is rendered.
+    source = Path(pre_folder, fb.image_file_name)
+    if is_pdf(fb.image_file_name):
+        source = PdfDocument(source)
+    try:
+        ret = []
+        if page_count is None:
+            page_count = renderer.get_page_count(source)
+            if pdf_hash is not None:
+                render_cache.put_page_count(pdf_hash, page_count)
+        if pages is None:
+            pages = range(1, page_count + 1)
+        for page in pages:
+            count("pages")
+            page_fb = get_page_bundle(fb, page)
+            # Render raw image per page.
+            page_image_name = page_fb.image_file_name
+            if is_pdf(fb.image_file_name):
+                dpi = None
+                if banded_redaction is not None:
+                    dpi = redact_pdf_page_in_bands(
+                        renderer,
+                        source,
+                        page_image_name,
+                        target_pdf_render_dpi,
+                        page,
+                        banded_redaction,
+                        render_mode,
+                        max_page_pixels,
+                        min_pdf_render_dpi,
+                    )
+                if dpi is None:
+                    dpi = render_pdf_page(
+                        renderer,
+                        source,
+                        Path(in_folder, page_image_name),
+                        target_pdf_render_dpi,
+                        page,
+                        render_mode,
+                        render_cache,
+                        pdf_hash,
+                        max_page_pixels,
+                        min_pdf_render_dpi,
+                    )
+                # The DPI of the page is kept in its image metadata.
+                if dpi != target_pdf_render_dpi:
+                    count("pages_downscaled")
+            elif is_tiff(fb.image_file_name):
+                renderer.render_tiff_and_save(
+                    source,
+                    Path(in_folder, page_image_name),
+                    page_number=page,
+                )
+            else:
+                raise ValueError("File should be PDF or TIFF.")
+
+            # Extract raw FOTT file per page.
+            extract_page_label(
+                Path(pre_folder, fb.fott_file_name),
+                Path(in_folder, page_fb.fott_file_name),
+                page,
             )
-        elif is_tiff(fb.image_file_name):
-            renderer.render_tiff_and_save(
-                Path(pre_folder, fb.image_file_name),
-                Path(in_folder, page_image_name),
-                page_number=page,
+
+            # Extract raw OCR file per page.
+            extract_page_ocr(
+                Path(pre_folder, fb.ocr_file_name),
+                Path(in_folder, page_fb.ocr_file_name),
+                page,
             )
-        else:
-            raise ValueError("File should be PDF or TIFF.")
-
-        # Extract raw FOTT file per page.
-        page_fott_file_name = get_page_file_name(
-            fb.image_file_name,
-            page,
-            ".rendered.png.labels.json",
-        )
-        extract_page_label(
-            Path(pre_folder, fb.fott_file_name),
-            Path(in_folder, page_fott_file_name),
-            page,
-        )
 
-        # Extract raw OCR file per page.
-        page_ocr_file_name = get_page_file_name(
-            fb.image_file_name,
-            page,
-            ".rendered.png.ocr.json",
-        )
-        extract_page_ocr(
-            Path(pre_folder, fb.ocr_file_name),
-            Path(in_folder, page_ocr_file_name),
-            page,
-        )
+            ret.append(page_fb)
+    finally:
+        if isinstance(source, PdfDocument):
+            source.close()
+    return ret
 
-        ret.append(
-            FileBundle(
-                image_file_name=page_image_name,
-                fott_file_name=page_fott_file_name,
-                ocr_file_name=page_ocr_file_name,
-            )
+
+def get_page_bundle(fb: FileBundle, page: int) -> FileBundle:
+    """The bundle of a page of a PDF or TIFF bundle."""
+    return FileBundle(
+        image_file_name=get_page_file_name(fb.image_file_name, page, ".rendered.png"),
+        fott_file_name=get_page_file_name(
+            fb.image_file_name, page, ".rendered.png.labels.json"
+        ),
+        ocr_file_name=get_page_file_name(
+            fb.image_file_name, page, ".rendered.png.ocr.json"
+        ),
+    )
+
+
+@timed("render")
+def render_pdf_page(
+    renderer: PdfRenderer,
+    input_file: PdfSource,
+    output_file: str,
+    target_pdf_render_dpi: int,
+    page_number: int,
+    render_mode: RenderMode = RenderMode.RGBA,
+    render_cache: Optional[RenderCache] = None,
+    pdf_hash: Optional[str] = None,
+    max_page_pixels: Optional[int] = None,
+    min_pdf_render_dpi: int = MIN_RENDER_DPI,
+) -> int:
+    """Render a PDF page to a file. Returns the DPI it was rendered at."""
+    if render_cache is None:
+        return renderer.render_pdf_and_save(
+            input_file,
+            output_file,
+            target_pdf_render_dpi,
+            page_number=page_number,
+            render_mode=render_mode,
+            max_pixels=max_page_pixels,
+            min_dpi=min_pdf_render_dpi,
         )
-    return ret
+
+    render_mode = RenderMode(render_mode)
+    flags = f"{render_mode.value}:{get_render_flags(render_mode)}"
+    if max_page_pixels:
+        # The DPI follows from the page size, so the budget identifies it.
+        flags += f":{max_page_pixels}:{min_pdf_render_dpi}"
+    key = RenderCache.build_key(pdf_hash, page_number, target_pdf_render_dpi, flags)
+    # Cache hit: copy the rendered page without touching PDFium.
+    if render_cache.get(key, output_file):
+        return get_image_dpi(output_file, target_pdf_render_dpi)
+    dpi = renderer.render_pdf_and_save(
+        input_file,
+        output_file,
+        target_pdf_render_dpi,
+        page_number=page_number,
+        render_mode=render_mode,
+        max_pixels=max_page_pixels,
+        min_dpi=min_pdf_render_dpi,
+    )
+    render_cache.put(key, output_file)
+    return dpi
+
+
+@timed("render")
+def redact_pdf_page_in_bands(
+    renderer: PdfRenderer,
+    input_file: PdfSource,
+    page_image_name: str,
+    target_pdf_render_dpi: int,
+    page_number: int,
+    banded_redaction: BandedPageRedaction,
+    render_mode: RenderMode = RenderMode.RGBA,
+    max_page_pixels: Optional[int] = None,
+    min_pdf_render_dpi: int = MIN_RENDER_DPI,
+) -> Optional[int]:
+    """Redact a PDF page in bands if it is large enough.
+
+    Returns the DPI the page was rendered at, or None if the page is left to
+    the regular rendering.
+    """
+    with renderer.open_page(
+        input_file,
+        target_pdf_render_dpi,
+        page_number,
+        render_mode,
+        max_page_pixels,
+        min_pdf_render_dpi,
+    ) as page:
+        if not banded_redaction.accepts(page):
+            return None
+        banded_redaction.redact(page, page_number, page_image_name)
+        return page.dpi
+
+
+def get_image_dpi(image_file: str, default: int) -> int:
+    with Image.open(image_file) as image:
+        dpi = image.info.get("dpi")
+    # PNG stores the resolution in pixels per meter, so round it back.
+    return round(dpi[0]) if dpi else default
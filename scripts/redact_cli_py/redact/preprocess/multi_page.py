@@ -4,8 +4,10 @@ import json
 from dacite import from_dict
 
 from redact.types.fott_label import FottLabel
+from redact.utils.metrics import timed
 
 
+@timed("split")
 def extract_page_label(fott_label_path: str, output_path: str, page_number: int):
     with open(fott_label_path, encoding="utf-8-sig") as fott_label_json:
         fott_label_dict = json.load(fott_label_json)
@@ -37,6 +39,7 @@ def extract_page_label(fott_label_path: str, output_path: str, page_number: int)
         )
 
 
+@timed("split")
 def extract_page_ocr(ocr_result_path: str, output_path: str, page_number: int):
     with open(ocr_result_path, encoding="utf-8-sig") as ocr_result_json:
         ocr_result = json.load(ocr_result_json)
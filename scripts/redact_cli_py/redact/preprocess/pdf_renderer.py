@@ -5,86 +5,396 @@
 from PIL import Image
 
 import ctypes
+import math
+import mmap
+from os import PathLike
+from typing import Iterator, Optional, Tuple, Union
 import pypdfium as pdfium
 
-WHITE = 0xFFFFFFFF
+from redact.types.render_mode import RenderMode
 
+RENDER_FLAGS = pdfium.FPDF_LCD_TEXT | pdfium.FPDF_ANNOT
+# LCD (subpixel) text rendering only applies to color bitmaps.
+GRAY_RENDER_FLAGS = pdfium.FPDF_ANNOT
+# Gray level at or above which a pixel is white in bilevel rendering.
+BILEVEL_THRESHOLD = 128
 
-class PdfRenderer:
-    def __init__(self):
-        # Initiate PDFium - This only needs to happen once
+# Lowest DPI the pixel budget may lower the rendering DPI to.
+MIN_RENDER_DPI = 72
+
+# render mode: (PDFium bitmap format, bytes per pixel, image mode, raw mode of the buffer)
+# Color bitmaps are rendered with FPDF_REVERSE_BYTE_ORDER, so their channels
+# come in RGB(A) order. RGBA and L buffers are then laid out the way Pillow
+# stores images, and are mapped by Pillow without a conversion.
+BITMAP_FORMATS = {
+    RenderMode.RGBA: (pdfium.FPDFBitmap_BGRA, 4, "RGBA", "RGBA"),
+    RenderMode.RGB: (pdfium.FPDFBitmap_BGR, 3, "RGB", "RGB"),
+    RenderMode.GRAY: (pdfium.FPDFBitmap_Gray, 1, "L", "L"),
+    RenderMode.BILEVEL: (pdfium.FPDFBitmap_Gray, 1, "L", "L"),
+}
+
+
+def get_render_flags(render_mode: RenderMode) -> int:
+    if RenderMode(render_mode) in [RenderMode.GRAY, RenderMode.BILEVEL]:
+        return GRAY_RENDER_FLAGS
+    return RENDER_FLAGS
+
+
+def get_render_size(width: float, height: float, dpi: int) -> Tuple[int, int]:
+    """The pixel size of a page of the given size in points at the given DPI."""
+    return int(width / 72 * dpi), int(height / 72 * dpi)
+
+
+def fit_render_dpi(
+    width: float,
+    height: float,
+    target_dpi: int,
+    max_pixels: Optional[int] = None,
+    min_dpi: int = MIN_RENDER_DPI,
+) -> int:
+    """Choose the DPI to render a page of the given size in points.
+
+    The page is rendered at the target DPI unless that takes more than
+    max_pixels pixels, in which case the DPI is lowered until the page fits.
+    The DPI is never lowered below min_dpi (or the target DPI, if lower), so a
+    huge page may still exceed the budget.
+    """
+    if not max_pixels or width <= 0 or height <= 0:
+        return target_dpi
+    # render_width * render_height = (width / 72 * dpi) * (height / 72 * dpi),
+    # less the truncation of the pixel sizes, which may fit a DPI more.
+    budget_dpi = math.floor(72 * math.sqrt(max_pixels / (width * height)))
+    while budget_dpi < target_dpi:
+        render_width, render_height = get_render_size(width, height, budget_dpi + 1)
+        if render_width * render_height > max_pixels:
+            break
+        budget_dpi += 1
+    return max(min(target_dpi, budget_dpi), min(target_dpi, min_dpi))
+
+
+_library_initialized = False
+
+
+def init_library():
+    """Initiate PDFium. This only needs to happen once per process."""
+    global _library_initialized
+    if not _library_initialized:
         pdfium.FPDF_InitLibraryWithConfig(pdfium.FPDF_LIBRARY_CONFIG(2, None, None, 0))
+        _library_initialized = True
 
-    def get_page_count(self, input_file: str):
-        doc = pdfium.FPDF_LoadDocument(str(input_file), None)
-        page_count = pdfium.FPDF_GetPageCount(doc)
-        pdfium.FPDF_CloseDocument(doc)
-        return page_count
 
-    def render_pdf(
-        self, input_file: str, render_target_dpi: int, page_number: int = 1
-    ) -> Image:
-        """
-        This renders a PDF page into an Image.
+class PdfDocument:
+    """A PDF document loaded by PDFium from memory.
 
-        :param input_file: a path points to the PDF.
-        :param render_target_dpi: the target DPI for rendering the image.
-        :param page_number: an **1-based** page index for the to-be-rendered page.
-        :returns: an Image of the PDF page with the target DPI.
+    The source is either the PDF content (bytes, bytearray or mmap) or the path
+    of a PDF file, which is memory-mapped so that the OS pages it in lazily.
+    PDFium reads the buffer for as long as the document is open, so the
+    document holds on to it until it is closed. The document is only loaded
+    when it is first used.
+    """
+
+    def __init__(self, source: Union[str, PathLike, bytes, bytearray, mmap.mmap]):
+        self.source = source
+        self.doc = None
+        self.buffer = None
+        self.mmap = None
+
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def load(self):
+        """The PDFium document handle. Loads the document on first use."""
+        if self.doc is not None:
+            return self.doc
+
+        init_library()
+        data = self.source
+        if not isinstance(data, (bytes, bytearray, mmap.mmap)):
+            with open(data, "rb") as f:
+                # A copy-on-write mapping is writable, which ctypes needs to
+                # point into it. PDFium never writes to it.
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            data = self.mmap
+
+        if isinstance(data, bytes):
+            # ctypes passes a pointer to the content of bytes without a copy.
+            self.buffer = data
+        else:
+            self.buffer = (ctypes.c_ubyte * len(data)).from_buffer(data)
+        self.doc = pdfium.FPDF_LoadMemDocument64(self.buffer, len(data), None)
+        if not self.doc:
+            error = pdfium.FPDF_GetLastError()
+            self.doc = None
+            self.close()
+            raise ValueError(f"PDFium failed to load the PDF (error {error}).")
+        return self.doc
+
+    def get_page_count(self) -> int:
+        return pdfium.FPDF_GetPageCount(self.load())
+
+    def get_page_size(self, page_number: int) -> Tuple[int, int]:
+        """The (width, height) of a page in points, rounded as `PdfPage`
+        does, without loading the page."""
+        width, height = ctypes.c_double(), ctypes.c_double()
+        if not pdfium.FPDF_GetPageSizeByIndex(
+            self.load(), page_number - 1, ctypes.byref(width), ctypes.byref(height)
+        ):
+            raise ValueError(f"PDFium failed to get the size of page {page_number}.")
+        return int(width.value + 0.5), int(height.value + 0.5)
+
+    def save_pages(self, output_path: str) -> int:
+        """Save the pages of the document as a new PDF.
+
+        The pages are copied into a new document first, which takes only the
+        objects the pages use. PDFium otherwise writes every object of the
+        source file, including the ones removed from the pages. Document level
+        data, like the outline, metadata and forms, is not kept.
+        Returns the number of bytes written.
         """
-        doc = pdfium.FPDF_LoadDocument(str(input_file), None)
+        doc = self.load()
+        new_doc = pdfium.FPDF_CreateNewDocument()
+        try:
+            if not pdfium.FPDF_ImportPages(new_doc, doc, None, 0):
+                raise ValueError("PDFium failed to copy the pages of the PDF.")
+            return save_document(new_doc, output_path)
+        finally:
+            pdfium.FPDF_CloseDocument(new_doc)
+
+    def close(self):
+        if self.doc is not None:
+            pdfium.FPDF_CloseDocument(self.doc)
+            self.doc = None
+        # Release the ctypes view before the mapping it points into.
+        self.buffer = None
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+
+def save_document(doc, output_path: str) -> int:
+    """Write a PDFium document to a file. Returns the number of bytes written."""
+    with open(output_path, "wb") as f:
+
+        def write_block(file_write, data, size):
+            f.write(ctypes.string_at(data, size))
+            return 1
+
+        file_write = pdfium.FPDF_FILEWRITE()
+        file_write.version = 1
+        # Keep the callback referenced until PDFium is done with it.
+        file_write.WriteBlock = type(file_write.WriteBlock)(write_block)
+        if not pdfium.FPDF_SaveAsCopy(
+            doc, ctypes.byref(file_write), pdfium.FPDF_NO_INCREMENTAL
+        ):
+            raise ValueError("PDFium failed to save the PDF.")
+        return f.tell()
+
+
+# A PDF to render: an open document, the path of a PDF file or its content.
+PdfSource = Union[PdfDocument, str, PathLike, bytes, bytearray, mmap.mmap]
+
+
+class PdfPage:
+    """A loaded PDF page to be rendered at a fixed DPI and render mode.
+
+    The page is kept open until it is closed, so it can be rendered as a whole
+    or in bands without reloading it. A page opened from a path or content
+    instead of a PdfDocument also closes the document it loaded.
+    """
 
-        page = pdfium.FPDF_LoadPage(doc, page_number - 1)
+    def __init__(
+        self,
+        input_file: PdfSource,
+        render_target_dpi: int,
+        page_number: int = 1,
+        render_mode: RenderMode = RenderMode.RGBA,
+        max_pixels: Optional[int] = None,
+        min_dpi: int = MIN_RENDER_DPI,
+    ):
+        self.render_mode = RenderMode(render_mode)
+        # The mode of the rendered images.
+        if self.render_mode == RenderMode.BILEVEL:
+            self.mode = "1"
+        else:
+            self.mode = BITMAP_FORMATS[self.render_mode][2]
+        self.owned_document = None
+        self.document = input_file
+        if not isinstance(input_file, PdfDocument):
+            self.document = self.owned_document = PdfDocument(input_file)
+        self.page = pdfium.FPDF_LoadPage(self.document.load(), page_number - 1)
 
         # Page dimensions are measured in points. One point is 1/72 inch (around 0.3528 mm).
-        width = int(pdfium.FPDF_GetPageWidthF(page) + 0.5)
-        height = int(pdfium.FPDF_GetPageHeightF(page) + 0.5)
+        width = int(pdfium.FPDF_GetPageWidthF(self.page) + 0.5)
+        height = int(pdfium.FPDF_GetPageHeightF(self.page) + 0.5)
 
-        # Converting to page
-        render_width = int(width / 72 * render_target_dpi)
-        render_height = int(height / 72 * render_target_dpi)
+        self.dpi = fit_render_dpi(width, height, render_target_dpi, max_pixels, min_dpi)
+        self.size = get_render_size(width, height, self.dpi)
 
-        # render to bitmap
-        bitmap = pdfium.FPDFBitmap_Create(render_width, render_height, 0)
-        pdfium.FPDFBitmap_FillRect(
-            bitmap, 0, 0, render_width, render_height, 0xFFFFFFFF
-        )
-        pdfium.FPDF_RenderPageBitmap(
-            bitmap,
-            page,
-            0,
-            0,
-            render_width,
-            render_height,
-            0,
-            pdfium.FPDF_LCD_TEXT | pdfium.FPDF_ANNOT,
-        )
+    def __enter__(self) -> "PdfPage":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.page is not None:
+            pdfium.FPDF_ClosePage(self.page)
+            self.page = None
+        if self.owned_document is not None:
+            self.owned_document.close()
+            self.owned_document = None
+
+    def render(self, top: int = 0, height: Optional[int] = None) -> Image:
+        """Render the rows [top, top + height) of the page into an Image.
+
+        The whole page is rendered by default. The DPI of the page is stored
+        in the "dpi" info of the Image.
+        """
+        render_width, render_height = self.size
+        if height is None:
+            height = render_height - top
+        bitmap_format, pixel_size, mode, raw_mode = BITMAP_FORMATS[self.render_mode]
 
-        # retrieve data from bitmap
-        buffer = pdfium.FPDFBitmap_GetBuffer(bitmap)
-        buffer_ = ctypes.cast(
-            buffer, ctypes.POINTER(ctypes.c_ubyte * (render_width * render_height * 4))
+        # PDFium renders into a buffer owned by Python, which the Image then
+        # takes over. Rows are padded to 4 bytes, as PDFium does for its own
+        # buffers. All bytes 0xFF is a white page in every format.
+        stride = (render_width * pixel_size + 3) // 4 * 4
+        buffer = bytearray(b"\xff") * (stride * height)
+        buffer_ = (ctypes.c_ubyte * len(buffer)).from_buffer(buffer)
+        bitmap = pdfium.FPDFBitmap_CreateEx(
+            render_width, height, bitmap_format, ctypes.addressof(buffer_), stride
         )
+        flags = get_render_flags(self.render_mode)
+        if pixel_size > 1:
+            # Gray levels are computed from the channels, so this would swap
+            # the weights of red and blue in gray bitmaps.
+            flags |= pdfium.FPDF_REVERSE_BYTE_ORDER
+        try:
+            # The page is laid out at its full size and moved up by top rows.
+            # PDFium clips it to the bitmap.
+            pdfium.FPDF_RenderPageBitmap(
+                bitmap,
+                self.page,
+                0,
+                -top,
+                render_width,
+                render_height,
+                0,
+                flags,
+            )
+        finally:
+            # Destroying a bitmap leaves an external buffer alone. Release the
+            # ctypes view afterwards, so the buffer is only held by the Image.
+            pdfium.FPDFBitmap_Destroy(bitmap)
+            del buffer_
 
+        # RGBA and L buffers are mapped without a copy. The Image keeps the
+        # buffer alive, and copies it only when it is first modified.
         img = Image.frombuffer(
-            "RGBA", (render_width, render_height), buffer_.contents, "raw", "BGRA", 0, 1
+            mode,
+            (render_width, height),
+            buffer,
+            "raw",
+            raw_mode,
+            stride,
+            1,
         )
+        if self.render_mode == RenderMode.BILEVEL:
+            img = img.point(
+                lambda level: 255 if level >= BILEVEL_THRESHOLD else 0, mode="1"
+            )
 
-        if bitmap is not None:
-            pdfium.FPDFBitmap_Destroy(bitmap)
-        pdfium.FPDF_ClosePage(page)
+        img.info["dpi"] = (self.dpi, self.dpi)
+        return img
 
-        pdfium.FPDF_CloseDocument(doc)
+    def bands(self, band_height: int) -> Iterator[Tuple[int, Image.Image]]:
+        """Render the page in horizontal bands of band_height rows.
 
-        return img
+        Yields the top row and the Image of each band. Only one band is held
+        at a time.
+        """
+        render_height = self.size[1]
+        for top in range(0, render_height, band_height):
+            yield top, self.render(top, min(band_height, render_height - top))
+
+
+class PdfRenderer:
+    def __init__(self):
+        init_library()
+
+    def get_page_count(self, input_file: PdfSource):
+        if isinstance(input_file, PdfDocument):
+            return input_file.get_page_count()
+        with PdfDocument(input_file) as document:
+            return document.get_page_count()
+
+    def open_page(
+        self,
+        input_file: PdfSource,
+        render_target_dpi: int,
+        page_number: int = 1,
+        render_mode: RenderMode = RenderMode.RGBA,
+        max_pixels: Optional[int] = None,
+        min_dpi: int = MIN_RENDER_DPI,
+    ) -> PdfPage:
+        """Load a PDF page for rendering. The page must be closed after use."""
+        return PdfPage(
+            input_file, render_target_dpi, page_number, render_mode, max_pixels, min_dpi
+        )
+
+    def render_pdf(
+        self,
+        input_file: PdfSource,
+        render_target_dpi: int,
+        page_number: int = 1,
+        render_mode: RenderMode = RenderMode.RGBA,
+        max_pixels: Optional[int] = None,
+        min_dpi: int = MIN_RENDER_DPI,
+    ) -> Image:
+        """
+        This renders a PDF page into an Image.
+
+        :param input_file: an open PdfDocument, a path points to the PDF, or
+            the content of the PDF.
+        :param render_target_dpi: the target DPI for rendering the image.
+        :param page_number: an **1-based** page index for the to-be-rendered page.
+        :param render_mode: the pixel format of the image. Gray and bilevel
+            images take a quarter of the memory of RGBA ones, and less again
+            once encoded.
+        :param max_pixels: the pixel budget of the page. Pages that take more
+            pixels at the target DPI are rendered at a lower DPI.
+        :param min_dpi: the DPI floor when lowering the DPI for the budget.
+        :returns: an Image of the PDF page. The DPI it was rendered at is
+            stored in its "dpi" info.
+        """
+        with self.open_page(
+            input_file, render_target_dpi, page_number, render_mode, max_pixels, min_dpi
+        ) as page:
+            return page.render()
 
     def render_pdf_and_save(
         self,
-        input_file: str,
+        input_file: PdfSource,
         output_file: str,
         render_target_dpi: int,
         page_number: int = 1,
-    ):
-        img = self.render_pdf(input_file, render_target_dpi, page_number)
-        img.save(output_file)
+        render_mode: RenderMode = RenderMode.RGBA,
+        max_pixels: Optional[int] = None,
+        min_dpi: int = MIN_RENDER_DPI,
+    ) -> int:
+        """Render a PDF page and save it. Returns the DPI it was rendered at."""
+        img = self.render_pdf(
+            input_file,
+            render_target_dpi,
+            page_number,
+            render_mode,
+            max_pixels=max_pixels,
+            min_dpi=min_dpi,
+        )
+        dpi = img.info["dpi"]
+        img.save(output_file, dpi=dpi)
         img.close()
+        return dpi[0]
@@ -4,6 +4,8 @@
 
 from PIL import Image
 
+from redact.utils.metrics import timed
+
 
 class TiffRenderer:
     def get_page_count(self, input_file: str):
@@ -11,6 +13,7 @@ class TiffRenderer:
         tiffstack.load()
         return tiffstack.n_frames
 
+    @timed("render")
     def render_tiff_and_save(
         self, input_file: str, output_file: str, page_number: int = 1
     ):
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+from typing import Dict, List
+
+from redact.preprocess.pdf_renderer import PdfPage
+from redact.redaction.image_redaction import ImageRedaction
+from redact.types.annotation import Annotation
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.redaction_plan import RedactionPlan
+from redact.utils.file_name import get_redacted_file_name
+from redact.utils.image_encoder import get_png_compress_level
+from redact.utils.png_writer import PngStreamWriter
+
+DEFAULT_BAND_HEIGHT = 1024
+
+
+class BandedPageRedaction:
+    """Render, redact and encode large PDF pages one band of rows at a time.
+
+    The redacted page is written straight to the output folder as a PNG, so
+    the memory taken by a page is bounded by the band size instead of the
+    page size. Pages of min_page_pixels pixels or fewer are left to the
+    regular rendering and redaction.
+    """
+
+    def __init__(
+        self,
+        plan: RedactionPlan,
+        out_folder: str,
+        min_page_pixels: int,
+        band_height: int = DEFAULT_BAND_HEIGHT,
+        encoder_profile: EncoderProfile = EncoderProfile.DEFAULT,
+    ):
+        self.plan = plan
+        self.out_folder = out_folder
+        self.min_page_pixels = min_page_pixels
+        self.band_height = band_height
+        self.encoder_profile = EncoderProfile(encoder_profile)
+        # Bytes written per redacted page, keyed by the page image file name.
+        self.redacted_images: Dict[str, int] = {}
+
+    def accepts(self, page: PdfPage) -> bool:
+        width, height = page.size
+        return width * height > self.min_page_pixels
+
+    def redact(self, page: PdfPage, page_number: int, page_image_name: str) -> int:
+        annotations = self.plan.to_annotations(page_number, page.size)
+        output_path = Path(self.out_folder, get_redacted_file_name(page_image_name))
+        with PngStreamWriter(
+            output_path,
+            page.size,
+            page.mode,
+            dpi=page.dpi,
+            compress_level=get_png_compress_level(self.encoder_profile),
+        ) as writer:
+            for top, band in page.bands(self.band_height):
+                band_annotations = get_band_annotations(annotations, top, band.height)
+                ImageRedaction(band, band_annotations).redact()
+                writer.write(band)
+        image_bytes = writer.close()
+        self.redacted_images[page_image_name] = image_bytes
+        return image_bytes
+
+
+def get_band_annotations(
+    annotations: List[Annotation], top: int, height: int
+) -> List[Annotation]:
+    """The annotations overlapping the rows [top, top + height), moved up by top rows."""
+    band_annotations = []
+    for annotation in annotations:
+        ys = annotation.bounding_box[1::2]
+        if max(ys) < top or min(ys) >= top + height:
+            continue
+        bounding_box = [
+            value - top if index % 2 else value
+            for index, value in enumerate(annotation.bounding_box)
+        ]
+        band_annotations.append(
+            Annotation(
+                bounding_box=bounding_box,
+                page=annotation.page,
+                field=annotation.field,
+                text=annotation.text,
+            )
+        )
+    return band_annotations
@@ -2,12 +2,14 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List, Collection
+from typing import Dict, List, Collection, Optional, Tuple
 
 from redact.redaction.ocr_result_redaction_v2 import OcrResultRedactionV2
 from redact.redaction.ocr_result_redaction_v3 import OcrResultRedactionV3
 from redact.types.annotation import Annotation
 from redact.types.api_version import ApiVersion
+from redact.types.match_stats import MatchStats
+from redact.types.redaction_plan import RedactedWord
 
 
 class OcrResultRedaction:
@@ -17,29 +19,64 @@ class OcrResultRedaction:
         annotations: List[Annotation],
         api_version: ApiVersion = ApiVersion.V3_0,
         labels_to_redact: Collection[str] = tuple(),
+        stats: Optional[MatchStats] = None,
     ):
         self.ocr_result = ocr_result
         self.annotations = annotations
         self.labels_to_redact = labels_to_redact
         self.api_version = api_version
+        self.stats = stats
 
     def redact(self):
+        self.build_redaction().redact()
+
+    def find_mapped_words(self, annot: Annotation) -> List[RedactedWord]:
+        return self.build_redaction().find_mapped_words(annot)
+
+    def redact_mapped_words(self, words: List[RedactedWord]):
+        self.build_redaction().redact_mapped_words(words)
+
+    def build_redaction(self):
         if ApiVersion(self.api_version) in [
             ApiVersion.V2_0,
             ApiVersion.V2_1,
         ]:
-            redaction = OcrResultRedactionV2(
+            return OcrResultRedactionV2(
                 self.ocr_result,
                 self.annotations,
                 self.labels_to_redact,
+                stats=self.stats,
             )
-            redaction.redact()
         elif ApiVersion(self.api_version) in [
             ApiVersion.V3_0,
         ]:
-            redaction = OcrResultRedactionV3(
+            return OcrResultRedactionV3(
                 self.ocr_result,
                 self.annotations,
                 self.labels_to_redact,
+                stats=self.stats,
+            )
+
+
+def get_page_size(
+    ocr_result: dict, api_version: ApiVersion
+) -> Dict[int, Tuple[float, float]]:
+    # page_size = {page: (width, height)}
+    page_size = {}
+    if ApiVersion(api_version) in [
+        ApiVersion.V2_0,
+        ApiVersion.V2_1,
+    ]:
+        for read_result in ocr_result["analyzeResult"]["readResults"]:
+            page_size[read_result["page"]] = (
+                read_result["width"],
+                read_result["height"],
             )
-            redaction.redact()
+    elif ApiVersion(api_version) in [
+        ApiVersion.V3_0,
+    ]:
+        pages = ocr_result["analyzeResult"]["pages"]
+        for page in pages:
+            page_number = page["pageNumber"]
+            page_size[page_number] = (page["width"], page["height"])
+    return page_size
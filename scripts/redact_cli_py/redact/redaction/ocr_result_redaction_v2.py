@@ -2,11 +2,14 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List, Set, Collection
+import time
+from typing import List, Optional, Tuple, Set, Collection
 
 from jsonpointer import resolve_pointer, set_pointer
 
 from redact.types.annotation import Annotation
+from redact.types.match_stats import MatchStats
+from redact.types.redaction_plan import RedactedWord
 from redact.utils.bounding_box_mapping import similar
 from redact.utils.redact_policy import first_char
 
@@ -20,25 +23,51 @@ class OcrResultRedactionV2:
         ocr_result: dict,
         annotations: List[Annotation],
         labels_to_redact: Collection[str] = tuple(),
+        stats: Optional[MatchStats] = None,
     ):
+        """
+        :param stats: optional stats the geometry work of matching words is
+            counted into.
+        """
         self.ocr_result = ocr_result
         self.annotations = annotations
         self.labels_to_redact = labels_to_redact
+        self.stats = stats
+
+    def thresholds(self) -> Tuple[float, ...]:
+        return (self.LINE_OVERLAP_THRESHOLD, self.WORD_OVERLAP_THRESHOLD)
 
     def redact(self):
-        refs = []
+        words = []
         for annot in self.annotations:
             if len(self.labels_to_redact) == 0 or annot.field in self.labels_to_redact:
-                refs.extend(self.find_mapped_refs(annot))
+                words.extend(self.find_mapped_words(annot))
+        self.redact_mapped_words(words)
+
+    def redact_mapped_words(self, words: List[RedactedWord]):
+        read_results = self.ocr_result["analyzeResult"]["readResults"]
+        read_ids = {
+            read_result["page"]: read_id
+            for read_id, read_result in enumerate(read_results)
+        }
+        refs = [
+            self.build_ref(read_ids[word.page], word.line, word.word) for word in words
+        ]
         self.redact_words(refs)
         self.redact_lines(refs)
         # Set is faster than List in this case.
         self.redact_page_results(set(refs))
 
-    def find_mapped_refs(self, annot: Annotation):
-        refs = []
+    def find_mapped_words(self, annot: Annotation) -> List[RedactedWord]:
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+        mapped_words = []
         read_results = self.ocr_result["analyzeResult"]["readResults"]
-        for read_id, read_result in enumerate(read_results):
+        for read_result in read_results:
+            if read_result["page"] != annot.page:
+                continue
+
             lines: List[dict] = read_result["lines"]
             for line_id, line in enumerate(lines):
                 # Early rejection.
@@ -46,6 +75,7 @@ class OcrResultRedactionV2:
                     annot.bounding_box,
                     line["boundingBox"],
                     self.LINE_OVERLAP_THRESHOLD,
+                    stats,
                 ):
                     continue
 
@@ -55,9 +85,16 @@ class OcrResultRedactionV2:
                         annot.bounding_box,
                         word["boundingBox"],
                         self.WORD_OVERLAP_THRESHOLD,
+                        stats,
                     ):
-                        refs.append(self.build_ref(read_id, line_id, word_id))
-        return refs
+                        mapped_words.append(
+                            RedactedWord(
+                                page=read_result["page"], line=line_id, word=word_id
+                            )
+                        )
+        if stats is not None:
+            stats.seconds += time.perf_counter() - start
+        return mapped_words
 
     def redact_words(self, refs: List[str]):
         def word_path(ref: str) -> str:
@@ -2,11 +2,14 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List, Collection
+import time
+from typing import List, Optional, Tuple, Collection
 
 from dacite import from_dict
 
 from redact.types.annotation import Annotation
+from redact.types.match_stats import MatchStats
+from redact.types.redaction_plan import RedactedWord
 from redact.types.span import Span
 from redact.utils.bounding_box_mapping import similar
 from redact.utils.redact_policy import first_char
@@ -20,13 +23,33 @@ class OcrResultRedactionV3:
         ocr_result: dict,
         annotations: List[Annotation],
         labels_to_redact: Collection[str] = tuple(),
+        stats: Optional[MatchStats] = None,
     ):
+        """
+        :param stats: optional stats the geometry work of matching words is
+            counted into.
+        """
         self.ocr_result = ocr_result
         self.annotations = annotations
         self.labels_to_redact = labels_to_redact
+        self.stats = stats
+
+    def thresholds(self) -> Tuple[float, ...]:
+        return (self.WORD_OVERLAP_THRESHOLD,)
 
     def redact(self):
-        words_to_redact = self.find_words_to_redact()
+        words = []
+        for annot in self.annotations:
+            if len(self.labels_to_redact) == 0 or annot.field in self.labels_to_redact:
+                words.extend(self.find_mapped_words(annot))
+        self.redact_mapped_words(words)
+
+    def redact_mapped_words(self, words: List[RedactedWord]):
+        pages = self.ocr_result["analyzeResult"]["pages"]
+        page_ids = {page["pageNumber"]: page_id for page_id, page in enumerate(pages)}
+        words_to_redact = [
+            pages[page_ids[word.page]]["words"][word.word] for word in words
+        ]
         self.redact_words(words_to_redact)
         spans = [
             from_dict(data_class=Span, data=word["span"]) for word in words_to_redact
@@ -35,26 +58,31 @@ class OcrResultRedactionV3:
         self.redact_content(spans)
         self.redact_table(spans)
 
-    def find_words_to_redact(self):
-        words_to_redact = []
-
+    def find_mapped_words(self, annot: Annotation) -> List[RedactedWord]:
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+        mapped_words = []
         pages = self.ocr_result["analyzeResult"]["pages"]
         for page in pages:
-            for annot in self.annotations:
-                if (
-                    len(self.labels_to_redact) == 0
-                    or annot.field in self.labels_to_redact
+            if page["pageNumber"] != annot.page:
+                continue
+
+            words = page["words"]
+            for word_id, word in enumerate(words):
+                if similar(
+                    annot.bounding_box,
+                    word["boundingBox"],
+                    self.WORD_OVERLAP_THRESHOLD,
+                    stats,
                 ):
-                    words = page["words"]
-                    for word in words:
-                        if similar(
-                            annot.bounding_box,
-                            word["boundingBox"],
-                            self.WORD_OVERLAP_THRESHOLD,
-                        ):
-                            words_to_redact.append(word)
-                            break
-        return words_to_redact
+                    mapped_words.append(
+                        RedactedWord(page=page["pageNumber"], word=word_id)
+                    )
+                    break
+        if stats is not None:
+            stats.seconds += time.perf_counter() - start
+        return mapped_words
 
     def redact_words(self, words_to_redact):
         for word in words_to_redact:
@@ -0,0 +1,276 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import ctypes
+from typing import List, Optional, Tuple
+
+from PIL import Image
+import pypdfium as pdfium
+
+from redact.preprocess.pdf_renderer import MIN_RENDER_DPI, PdfDocument, PdfPage
+from redact.redaction.image_redaction import ImageRedaction
+from redact.types.redaction_plan import RedactedRegion, RedactionPlan
+from redact.types.render_mode import RenderMode
+
+# Slack in points when checking whether an object lies within a region.
+TOLERANCE = 2.0
+
+# (left, bottom, right, top) in PDF points.
+Rect = Tuple[float, float, float, float]
+
+
+class PdfRedaction:
+    """Redact the pages of a PDF document without rasterizing them.
+
+    Text objects under a redaction region and vector paths within one are
+    removed from the page, and a white polygon is painted over every region.
+    The rest of the page keeps its vector content. Nothing removed is left in
+    the content of the page, so no redacted text or drawing can be extracted
+    from it. Only straight lines and rectangles (e.g. table borders) partly
+    under a region are kept and painted over, since they show nothing under
+    the region but where they run.
+
+    A page is rasterized and redacted as an image instead when that is not
+    faithful: when it is rotated, has annotations or a thumbnail, has an
+    image, shading or form XObject under a region, has a text object that
+    extends beyond the region it overlaps, or has any other path partly
+    under a region. Rasterized pages replace the original ones, so nothing of
+    the original page is left in the document.
+    """
+
+    def __init__(
+        self,
+        document: PdfDocument,
+        plan: RedactionPlan,
+        render_target_dpi: int = 300,
+        render_mode: RenderMode = RenderMode.RGBA,
+        max_pixels: Optional[int] = None,
+        min_dpi: int = MIN_RENDER_DPI,
+    ):
+        self.document = document
+        self.plan = plan
+        self.render_target_dpi = render_target_dpi
+        self.render_mode = RenderMode(render_mode)
+        self.max_pixels = max_pixels
+        self.min_dpi = min_dpi
+
+    def redact(self) -> List[int]:
+        """Redact the document in place. Returns the pages rasterized."""
+        rasterized_pages = []
+        for page_number in sorted({region.page for region in self.plan.regions}):
+            regions = [
+                region for region in self.plan.regions if region.page == page_number
+            ]
+            if not self.redact_page_objects(page_number, regions):
+                self.rasterize_page(page_number)
+                rasterized_pages.append(page_number)
+        return rasterized_pages
+
+    def redact_page_objects(
+        self, page_number: int, regions: List[RedactedRegion]
+    ) -> bool:
+        """Redact the objects of a page. Returns False if it is left unchanged
+        because it needs to be rasterized."""
+        page = pdfium.FPDF_LoadPage(self.document.load(), page_number - 1)
+        try:
+            if (
+                pdfium.FPDFPage_GetRotation(page) != 0
+                or pdfium.FPDFPage_GetAnnotCount(page) > 0
+                or pdfium.FPDFPage_GetRawThumbnailData(page, None, 0) > 0
+            ):
+                return False
+
+            polygons = [to_page_polygon(page, region) for region in regions]
+            rects = [get_bounds(polygon) for polygon in polygons]
+            to_remove = []
+            for index in range(pdfium.FPDFPage_CountObjects(page)):
+                page_object = pdfium.FPDFPage_GetObject(page, index)
+                bounds = get_object_bounds(page_object)
+                overlapped = [rect for rect in rects if intersects(bounds, rect)]
+                if not overlapped:
+                    continue
+
+                object_type = pdfium.FPDFPageObj_GetType(page_object)
+                if object_type == pdfium.FPDF_PAGEOBJ_TEXT:
+                    if not any(covers_text(rect, bounds) for rect in overlapped):
+                        return False
+                    to_remove.append(page_object)
+                elif object_type == pdfium.FPDF_PAGEOBJ_PATH:
+                    if any(contains(rect, bounds) for rect in overlapped):
+                        to_remove.append(page_object)
+                    # Other paths partly under a region, e.g. a signature or
+                    # outlined text, would keep what they draw under it.
+                    elif not is_rule(page_object):
+                        return False
+                else:
+                    return False
+
+            for page_object in to_remove:
+                pdfium.FPDFPage_RemoveObject(page, page_object)
+                pdfium.FPDFPageObj_Destroy(page_object)
+            for polygon in polygons:
+                pdfium.FPDFPage_InsertObject(page, create_white_polygon(polygon))
+            if not pdfium.FPDFPage_GenerateContent(page):
+                raise ValueError(f"PDFium failed to update page {page_number}.")
+            return True
+        finally:
+            pdfium.FPDF_ClosePage(page)
+
+    def rasterize_page(self, page_number: int):
+        with PdfPage(
+            self.document,
+            self.render_target_dpi,
+            page_number,
+            self.render_mode,
+            self.max_pixels,
+            self.min_dpi,
+        ) as page:
+            image = page.render()
+        ImageRedaction(
+            image, self.plan.to_annotations(page_number, image.size)
+        ).redact()
+
+        doc = self.document.load()
+        page = pdfium.FPDF_LoadPage(doc, page_number - 1)
+        # The page size as displayed, i.e. rotated.
+        width = pdfium.FPDF_GetPageWidthF(page)
+        height = pdfium.FPDF_GetPageHeightF(page)
+        pdfium.FPDF_ClosePage(page)
+
+        # Replace the page instead of emptying it, which would keep its
+        # resources, annotations and thumbnail.
+        pdfium.FPDFPage_Delete(doc, page_number - 1)
+        page = pdfium.FPDFPage_New(doc, page_number - 1, width, height)
+        try:
+            image_object = pdfium.FPDFPageObj_NewImageObj(doc)
+            set_image(image_object, image)
+            pdfium.FPDFImageObj_SetMatrix(image_object, width, 0, 0, height, 0, 0)
+            pdfium.FPDFPage_InsertObject(page, image_object)
+            if not pdfium.FPDFPage_GenerateContent(page):
+                raise ValueError(f"PDFium failed to update page {page_number}.")
+        finally:
+            pdfium.FPDF_ClosePage(page)
+
+
+def to_page_polygon(page, region: RedactedRegion) -> List[Tuple[float, float]]:
+    """The polygon of a region in PDF points. Regions are normalized to the
+    page as displayed, top left first, and PDF points count from bottom left."""
+    box = pdfium.FS_RECTF()
+    pdfium.FPDF_GetPageBoundingBox(page, ctypes.byref(box))
+    width = box.right - box.left
+    height = box.top - box.bottom
+    coordinates = region.bounding_box
+    return [
+        (box.left + x * width, box.top - y * height)
+        for x, y in zip(coordinates[0::2], coordinates[1::2])
+    ]
+
+
+def get_bounds(polygon: List[Tuple[float, float]]) -> Rect:
+    xs = [x for x, _ in polygon]
+    ys = [y for _, y in polygon]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def get_object_bounds(page_object) -> Rect:
+    left, bottom, right, top = [ctypes.c_float() for _ in range(4)]
+    pdfium.FPDFPageObj_GetBounds(
+        page_object,
+        ctypes.byref(left),
+        ctypes.byref(bottom),
+        ctypes.byref(right),
+        ctypes.byref(top),
+    )
+    return left.value, bottom.value, right.value, top.value
+
+
+def intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def contains(outer: Rect, inner: Rect) -> bool:
+    return (
+        inner[0] >= outer[0] - TOLERANCE
+        and inner[1] >= outer[1] - TOLERANCE
+        and inner[2] <= outer[2] + TOLERANCE
+        and inner[3] <= outer[3] + TOLERANCE
+    )
+
+
+def is_rule(path) -> bool:
+    """Whether a path is a single straight line or a closed rectangle, e.g. a
+    table border."""
+    segments = [
+        pdfium.FPDFPath_GetPathSegment(path, index)
+        for index in range(pdfium.FPDFPath_CountSegments(path))
+    ]
+    types = [pdfium.FPDFPathSegment_GetType(segment) for segment in segments]
+    if types[:1] != [pdfium.FPDF_SEGMENT_MOVETO] or any(
+        segment_type != pdfium.FPDF_SEGMENT_LINETO for segment_type in types[1:]
+    ):
+        return False
+    if len(segments) == 2:
+        return True
+    points = [get_point(segment) for segment in segments]
+    closed = pdfium.FPDFPathSegment_GetClose(segments[-1]) or points[-1] == points[0]
+    if len(segments) not in [4, 5] or not closed:
+        return False
+    # Every side is horizontal or vertical.
+    return all(
+        a[0] == b[0] or a[1] == b[1] for a, b in zip(points, points[1:] + points[:1])
+    )
+
+
+def get_point(segment) -> Tuple[float, float]:
+    x, y = ctypes.c_float(), ctypes.c_float()
+    pdfium.FPDFPathSegment_GetPoint(segment, ctypes.byref(x), ctypes.byref(y))
+    return x.value, y.value
+
+
+def covers_text(rect: Rect, bounds: Rect) -> bool:
+    """Whether removing a text object under the region loses no other text.
+
+    Text bounds span the ascent and descent of the font, and OCR boxes only
+    the glyphs, so only the baseline direction is held to the region.
+    """
+    middle = (bounds[1] + bounds[3]) / 2
+    return (
+        bounds[0] >= rect[0] - TOLERANCE
+        and bounds[2] <= rect[2] + TOLERANCE
+        and rect[1] <= middle <= rect[3]
+    )
+
+
+def create_white_polygon(polygon: List[Tuple[float, float]]):
+    path = pdfium.FPDFPageObj_CreateNewPath(*polygon[0])
+    for x, y in polygon[1:]:
+        pdfium.FPDFPath_LineTo(path, x, y)
+    pdfium.FPDFPath_Close(path)
+    pdfium.FPDFPageObj_SetFillColor(path, 255, 255, 255, 255)
+    pdfium.FPDFPath_SetDrawMode(path, pdfium.FPDF_FILLMODE_WINDING, 0)
+    return path
+
+
+def set_image(image_object, image: Image):
+    """Set the pixels of a PDF image object from an Image."""
+    if image.mode in ["1", "L"]:
+        bitmap_format, raw_mode, pixel_size = pdfium.FPDFBitmap_Gray, "L", 1
+        image = image.convert("L")
+    else:
+        bitmap_format, raw_mode, pixel_size = pdfium.FPDFBitmap_BGRx, "BGRX", 4
+        image = image.convert("RGB")
+
+    stride = (image.width * pixel_size + 3) // 4 * 4
+    buffer = bytearray(image.tobytes("raw", raw_mode, stride))
+    buffer_ = (ctypes.c_ubyte * len(buffer)).from_buffer(buffer)
+    bitmap = pdfium.FPDFBitmap_CreateEx(
+        image.width, image.height, bitmap_format, ctypes.addressof(buffer_), stride
+    )
+    try:
+        # PDFium encodes the pixels into the document.
+        if not pdfium.FPDFImageObj_SetBitmap(None, 0, image_object, bitmap):
+            raise ValueError("PDFium failed to set the image of the page.")
+    finally:
+        pdfium.FPDFBitmap_Destroy(bitmap)
+        del buffer_
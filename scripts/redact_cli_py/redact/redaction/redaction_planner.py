@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from typing import Collection, Dict, List, Optional, Tuple
+
+from redact.cache.match_cache import MatchCache
+from redact.redaction.ocr_result_redaction import OcrResultRedaction, get_page_size
+from redact.types.api_version import ApiVersion
+from redact.types.fott_label import FottLabel
+from redact.types.match_stats import MatchStats
+from redact.types.redaction_plan import (
+    RedactedLabel,
+    RedactedRegion,
+    RedactedWord,
+    RedactionPlan,
+)
+from redact.utils.metrics import count, is_recording
+
+
+class RedactionPlanner:
+    def __init__(
+        self,
+        fott_label: FottLabel,
+        ocr_result: Optional[dict] = None,
+        api_version: ApiVersion = ApiVersion.V3_0,
+        labels_to_redact: Collection[str] = tuple(),
+        match_cache: Optional[MatchCache] = None,
+        content_hashes: Optional[Tuple[str, str]] = None,
+    ):
+        """
+        :param match_cache: an optional cache of the word matches.
+        :param content_hashes: the (OCR result, FOTT label) content hashes
+            keying the match cache. Required when `match_cache` is given.
+        """
+        self.fott_label = fott_label
+        self.ocr_result = ocr_result
+        self.api_version = api_version
+        self.labels_to_redact = labels_to_redact
+        self.match_cache = match_cache
+        self.content_hashes = content_hashes
+
+    def plan(self) -> RedactionPlan:
+        label_pages: Dict[str, List[int]] = {}
+        regions: List[RedactedRegion] = []
+        for label in self.fott_label.labels:
+            if not (
+                len(self.labels_to_redact) == 0 or label.label in self.labels_to_redact
+            ):
+                continue
+            for entity in label.value:
+                pages = label_pages.setdefault(label.label, [])
+                if entity.page not in pages:
+                    pages.append(entity.page)
+                for bounding_box in entity.boundingBoxes:
+                    regions.append(
+                        RedactedRegion(
+                            page=entity.page,
+                            field=label.label,
+                            bounding_box=bounding_box,
+                        )
+                    )
+
+        # Without an OCR result only the image and label plans are needed.
+        words = []
+        if self.ocr_result is not None and len(regions) > 0:
+            words = self.find_words(regions)
+
+        return RedactionPlan(
+            api_version=ApiVersion(self.api_version).value,
+            labels=[
+                RedactedLabel(label=label, pages=pages)
+                for label, pages in label_pages.items()
+            ],
+            words=words,
+            regions=regions,
+            # Without regions, there is no word to match.
+            ocr_matched=self.ocr_result is not None or len(regions) == 0,
+        )
+
+    def find_words(self, regions: List[RedactedRegion]) -> List[RedactedWord]:
+        if self.match_cache is None:
+            matches = self.match_regions(regions)
+        else:
+            matches = self.match_regions_cached()
+
+        # Dict keeps the insertion order while dropping duplicated words.
+        words: Dict[RedactedWord, None] = {}
+        for region_words in matches:
+            for word in region_words:
+                words[word] = None
+        return list(words)
+
+    def match_regions(self, regions: List[RedactedRegion]) -> List[List[RedactedWord]]:
+        page_size = get_page_size(self.ocr_result, self.api_version)
+        # The geometry work is only counted into the metrics being recorded.
+        stats = MatchStats() if is_recording() else None
+        redaction = OcrResultRedaction(
+            self.ocr_result, [], self.api_version, stats=stats
+        )
+        matches = [
+            redaction.find_mapped_words(region.to_annotation(page_size[region.page]))
+            for region in regions
+        ]
+        if stats is not None:
+            for name, value in stats.to_counters().items():
+                count(name, value)
+        return matches
+
+    def match_regions_cached(self) -> List[List[RedactedWord]]:
+        # Cache the matches of every label, regardless of labels_to_redact,
+        # so that runs on another subset of labels hit the same entry.
+        all_regions = RedactionPlanner(self.fott_label).plan().regions
+        redaction = OcrResultRedaction(self.ocr_result, [], self.api_version)
+        ocr_hash, label_hash = self.content_hashes
+        key = MatchCache.build_key(
+            ocr_hash,
+            label_hash,
+            ApiVersion(self.api_version).value,
+            redaction.build_redaction().thresholds(),
+        )
+
+        all_matches = self.match_cache.get(key)
+        if all_matches is None or len(all_matches) != len(all_regions):
+            all_matches = self.match_regions(all_regions)
+            self.match_cache.put(key, all_matches)
+
+        return [
+            region_words
+            for region, region_words in zip(all_regions, all_matches)
+            if len(self.labels_to_redact) == 0 or region.field in self.labels_to_redact
+        ]
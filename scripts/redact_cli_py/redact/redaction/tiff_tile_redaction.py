@@ -0,0 +1,393 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from collections import Counter
+from io import BytesIO
+import math
+from pathlib import Path
+import shutil
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageChops
+
+from redact.redaction.image_redaction import ImageRedaction
+from redact.types.annotation import Annotation
+from redact.types.redaction_plan import RedactionPlan
+from redact.types.tiff_directory import TiffDirectory, TiffEntry
+from redact.utils.tiff_file import (
+    FIELD_TYPES,
+    LONG,
+    SHORT,
+    build_tiff,
+    read_tiff_directories,
+    write_value,
+)
+
+# TIFF compression: Pillow encoder. Only lossless compressions are supported,
+# so re-encoding a tile leaves its unredacted pixels unchanged.
+COMPRESSIONS = {
+    1: "raw",
+    4: "group4",
+    5: "tiff_lzw",
+    8: "tiff_adobe_deflate",
+    32773: "packbits",
+    32946: "tiff_deflate",
+}
+# (photometric interpretations, bits per sample, extra samples): image mode
+PIXEL_FORMATS = [
+    ((0, 1), [1], None, "1"),
+    ((1,), [8], None, "L"),
+    ((2,), [8, 8, 8], None, "RGB"),
+    ((2,), [8, 8, 8, 8], [2], "RGBA"),
+]
+# Entries of a directory describing how its tiles are encoded.
+ENCODING_TAGS = [258, 259, 262, 277, 284, 338]
+# Orientation, fill order, predictor, planar configuration and sample format
+# are supported with their default value only.
+DEFAULT_VALUES = {274: 1, 266: 1, 317: 1, 284: 1, 339: 1}
+
+# Tags describing the pixels of a page and their layout. A directory with any
+# other tag, e.g. a description, XMP, IPTC or EXIF metadata, or sub-IFDs with
+# thumbnails, is not supported, since copying the file would keep it.
+PIXEL_TAGS = {
+    254,  # NewSubfileType
+    255,  # SubfileType
+    256,  # ImageWidth
+    257,  # ImageLength
+    258,  # BitsPerSample
+    259,  # Compression
+    262,  # PhotometricInterpretation
+    266,  # FillOrder
+    273,  # StripOffsets
+    274,  # Orientation
+    277,  # SamplesPerPixel
+    278,  # RowsPerStrip
+    279,  # StripByteCounts
+    280,  # MinSampleValue
+    281,  # MaxSampleValue
+    282,  # XResolution
+    283,  # YResolution
+    284,  # PlanarConfiguration
+    292,  # T4Options
+    293,  # T6Options
+    296,  # ResolutionUnit
+    297,  # PageNumber
+    317,  # Predictor
+    322,  # TileWidth
+    323,  # TileLength
+    324,  # TileOffsets
+    325,  # TileByteCounts
+    338,  # ExtraSamples
+    339,  # SampleFormat
+}
+
+# Field type of the offsets and byte counts: largest value.
+MAX_VALUES = {SHORT: 2**16 - 1, LONG: 2**32 - 1}
+
+# (left, top, right, bottom) in pixels.
+Box = Tuple[int, int, int, int]
+
+
+class TiffTileRedaction:
+    """Redact a TIFF by re-encoding only the tiles or strips under a region.
+
+    The output is a copy of the input where the redacted tiles are replaced:
+    in place when the new data fits, and appended to the file otherwise. The
+    old data of a replaced tile is zeroed, so nothing of the redacted pixels
+    is left in the file. All other tiles keep their compressed data as is,
+    and any bytes of the input no directory refers to are zeroed.
+
+    Only uncompressed and losslessly compressed bilevel, grayscale, RGB and
+    RGBA images whose directories have no metadata and no reduced-resolution
+    images are supported, see `is_supported()`.
+    """
+
+    def __init__(self, image_path: str, plan: RedactionPlan):
+        self.image_path = image_path
+        self.plan = plan
+        with open(image_path, "rb") as file:
+            try:
+                self.byte_order, self.directories = read_tiff_directories(file)
+            except ValueError:
+                self.byte_order, self.directories = None, []
+
+    @property
+    def page_count(self) -> int:
+        return len(self.directories)
+
+    def is_supported(self) -> bool:
+        return len(self.directories) > 0 and all(
+            get_image_mode(directory) is not None for directory in self.directories
+        )
+
+    def redact(self, output_path: str) -> Optional[int]:
+        """Write the redacted TIFF.
+
+        Returns:
+            Optional[int]: The number of bytes written, or None if the
+                redacted tiles do not fit the offsets and byte counts of the
+                file and nothing was written.
+        """
+        if not self.is_supported():
+            raise ValueError(f"{self.image_path} is not supported.")
+
+        # Tiles sharing their data with another tile (e.g. blank tiles) are
+        # written anew, and their old data is left to the other tiles.
+        shared_offsets = {
+            offset
+            for offset, count in Counter(
+                offset
+                for directory in self.directories
+                for offset in get_chunk_entries(directory)[0].values
+            ).items()
+            if count > 1
+        }
+
+        # (offsets entry, byte counts entry, index, data, new offset)
+        replacements = []
+        end = Path(self.image_path).stat().st_size
+        with open(self.image_path, "rb") as source:
+            for page_number, directory in enumerate(self.directories, start=1):
+                offsets, byte_counts = get_chunk_entries(directory)
+                for index, data in self.redact_directory(
+                    source, directory, page_number
+                ):
+                    offset = offsets.values[index]
+                    if (
+                        offset in shared_offsets
+                        or len(data) > byte_counts.values[index]
+                    ):
+                        # Tile data starts on a word boundary.
+                        offset = end + end % 2
+                        end = offset + len(data)
+                    if not fits(offsets, offset) or not fits(byte_counts, len(data)):
+                        return None
+                    replacements.append((offsets, byte_counts, index, data, offset))
+
+        shutil.copyfile(self.image_path, output_path)
+        with open(output_path, "r+b") as file:
+            for start, stop in get_unused_ranges(
+                self.directories, Path(self.image_path).stat().st_size
+            ):
+                file.seek(start)
+                file.write(bytes(stop - start))
+            for offsets, byte_counts, index, data, offset in replacements:
+                old_offset = offsets.values[index]
+                old_byte_count = byte_counts.values[index]
+                if old_offset not in shared_offsets:
+                    file.seek(old_offset)
+                    file.write(bytes(old_byte_count))
+                file.seek(offset)
+                file.write(data)
+                write_value(file, self.byte_order, offsets, index, offset)
+                write_value(file, self.byte_order, byte_counts, index, len(data))
+        return Path(output_path).stat().st_size
+
+    def redact_directory(self, source, directory: TiffDirectory, page_number: int):
+        """Yield (index, data) of the redacted tiles of a page."""
+        width, height = directory.get_value(256), directory.get_value(257)
+        annotations = self.plan.to_annotations(page_number, (width, height))
+        if len(annotations) == 0:
+            return
+
+        # Regions are drawn whole, since Pillow fills a polygon clipped by a
+        # tile slightly differently than the same polygon on the full image.
+        masks = [get_region_mask(annotation) for annotation in annotations]
+        offsets, byte_counts = get_chunk_entries(directory)
+        for index, box in enumerate(get_chunk_boxes(directory)):
+            overlapping = [
+                (mask_box, mask)
+                for mask_box, mask in masks
+                if intersects(box, mask_box)
+            ]
+            if not overlapping:
+                continue
+
+            source.seek(offsets.values[index])
+            data = source.read(byte_counts.values[index])
+            tile = decode_chunk(self.byte_order, directory, box, data)
+            for mask_box, mask in overlapping:
+                tile.paste(
+                    ImageRedaction.COLOR,
+                    (mask_box[0] - box[0], mask_box[1] - box[1]),
+                    mask,
+                )
+            yield index, encode_chunk(directory, tile)
+
+
+def get_image_mode(directory: TiffDirectory) -> Optional[str]:
+    """The image mode of a supported directory, None if not supported."""
+    if not set(directory.entries) <= PIXEL_TAGS:
+        return None
+    # Reduced-resolution images, e.g. thumbnails.
+    if directory.get_value(254, 0) & 1 or directory.get_value(255) == 2:
+        return None
+    compression = directory.get_value(259, 1)
+    if compression not in COMPRESSIONS:
+        return None
+    if any(
+        directory.get_value(tag, value) != value
+        for tag, value in DEFAULT_VALUES.items()
+    ):
+        return None
+    offsets, byte_counts = get_chunk_entries(directory)
+    if (
+        offsets is None
+        or byte_counts is None
+        or offsets.type not in MAX_VALUES
+        or byte_counts.type not in MAX_VALUES
+        or len(offsets.values) != len(get_chunk_boxes(directory))
+        or len(byte_counts.values) != len(offsets.values)
+        or 0 in byte_counts.values
+    ):
+        return None
+
+    photometric = directory.get_value(262)
+    bits = directory.get_values(258, [1])
+    extra_samples = directory.get_values(338)
+    for photometrics, format_bits, format_extra_samples, mode in PIXEL_FORMATS:
+        if (
+            photometric in photometrics
+            and bits == format_bits
+            and extra_samples == format_extra_samples
+        ):
+            # CCITT compressions are for bilevel images only.
+            if compression == 4 and mode != "1":
+                return None
+            return mode
+    return None
+
+
+def fits(entry: TiffEntry, value: int) -> bool:
+    return value <= MAX_VALUES[entry.type]
+
+
+def get_chunk_entries(directory: TiffDirectory) -> Tuple[TiffEntry, TiffEntry]:
+    """The (offsets, byte counts) entries of the tiles or strips."""
+    if 322 in directory.entries:
+        return directory.entries.get(324), directory.entries.get(325)
+    return directory.entries.get(273), directory.entries.get(279)
+
+
+def get_unused_ranges(
+    directories: List[TiffDirectory], size: int
+) -> List[Tuple[int, int]]:
+    """The (start, stop) ranges of a TIFF file of size bytes that neither its
+    header, nor its directories, their values or their tiles use."""
+    used = [(0, 8)]
+    for directory in directories:
+        used.append(
+            (directory.offset, directory.offset + 2 + len(directory.entries) * 12 + 4)
+        )
+        for entry in directory.entries.values():
+            _, value_size = FIELD_TYPES.get(entry.type, ("", 1))
+            if value_size * entry.count > 4:
+                used.append(
+                    (entry.value_offset, entry.value_offset + value_size * entry.count)
+                )
+        offsets, byte_counts = get_chunk_entries(directory)
+        used.extend(
+            (offset, offset + byte_count)
+            for offset, byte_count in zip(offsets.values, byte_counts.values)
+        )
+
+    unused, end = [], 0
+    for start, stop in sorted(used):
+        if start > end:
+            unused.append((end, min(start, size)))
+        end = max(end, stop)
+    if end < size:
+        unused.append((end, size))
+    return [(start, stop) for start, stop in unused if start < stop]
+
+
+def get_chunk_boxes(directory: TiffDirectory) -> List[Box]:
+    """The boxes of the tiles or strips in the image, in data order. Tiles on
+    the right and bottom edges extend beyond the image."""
+    width, height = directory.get_value(256), directory.get_value(257)
+    if 322 in directory.entries:
+        tile_width, tile_height = directory.get_value(322), directory.get_value(323)
+        across = math.ceil(width / tile_width)
+        down = math.ceil(height / tile_height)
+        return [
+            (
+                column * tile_width,
+                row * tile_height,
+                (column + 1) * tile_width,
+                (row + 1) * tile_height,
+            )
+            for row in range(down)
+            for column in range(across)
+        ]
+
+    rows_per_strip = min(directory.get_value(278, height), height)
+    return [
+        (0, top, width, min(top + rows_per_strip, height))
+        for top in range(0, height, rows_per_strip)
+    ]
+
+
+def decode_chunk(
+    byte_order: str, directory: TiffDirectory, box: Box, data: bytes
+) -> Image:
+    """Decode one tile or strip as a single strip image of its own."""
+    entries = {
+        tag: (directory.entries[tag].type, directory.entries[tag].values)
+        for tag in ENCODING_TAGS
+        if tag in directory.entries
+    }
+    width, height = box[2] - box[0], box[3] - box[1]
+    entries[256] = (LONG, [width])
+    entries[257] = (LONG, [height])
+    entries[278] = (LONG, [height])
+    with Image.open(BytesIO(build_tiff(byte_order, entries, data))) as image:
+        image.load()
+        if image.mode != get_image_mode(directory):
+            raise ValueError(f'Unexpected image mode "{image.mode}" of a tile.')
+        return image.copy()
+
+
+def encode_chunk(directory: TiffDirectory, tile: Image) -> bytes:
+    """Encode one tile or strip as the directory encodes its tiles."""
+    # Pillow writes bilevel images as min-is-black.
+    if tile.mode == "1" and directory.get_value(262) == 0:
+        tile = ImageChops.invert(tile)
+
+    buffer = BytesIO()
+    tile.save(
+        buffer,
+        format="TIFF",
+        compression=COMPRESSIONS[directory.get_value(259, 1)],
+        # One strip for the whole tile.
+        strip_size=len(tile.tobytes()) + 1,
+    )
+    byte_order, encoded = read_tiff_directories(buffer)
+    offsets, byte_counts = get_chunk_entries(encoded[0])
+    if len(offsets.values) != 1:
+        raise ValueError("A tile was not encoded as a single strip.")
+    buffer.seek(offsets.values[0])
+    return buffer.read(byte_counts.values[0])
+
+
+def get_region_mask(annotation: Annotation) -> Tuple[Box, Image]:
+    """The (box, mask) of the pixels redacted by an annotation."""
+    xs = annotation.bounding_box[0::2]
+    ys = annotation.bounding_box[1::2]
+    # Polygons are drawn with their outline, which can touch the pixels
+    # around them.
+    left, top = math.floor(min(xs)) - 1, math.floor(min(ys)) - 1
+    right, bottom = math.ceil(max(xs)) + 2, math.ceil(max(ys)) + 2
+    mask = Image.new("L", (right - left, bottom - top))
+    bounding_box = [
+        value - left if i % 2 == 0 else value - top
+        for i, value in enumerate(annotation.bounding_box)
+    ]
+    ImageRedaction(
+        mask, [Annotation(bounding_box, annotation.page, annotation.field, "")]
+    ).redact()
+    return (left, top, right, bottom), mask
+
+
+def intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
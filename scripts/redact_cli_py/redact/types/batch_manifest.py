@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+import dacite
+
+from redact.types.file_bundle import FileBundle
+from redact.types.shard import Shard
+
+
+@dataclass
+class BatchSummary:
+    # Input bundles: multi-page documents, and single page images.
+    document_count: int = 0
+    image_count: int = 0
+    # Bytes of redacted images written.
+    image_bytes: int = 0
+    # Input bundles failed, see the failures report.
+    failure_count: int = 0
+
+    def add(self, other: BatchSummary):
+        self.document_count += other.document_count
+        self.image_count += other.image_count
+        self.image_bytes += other.image_bytes
+        self.failure_count += other.failure_count
+
+
+@dataclass
+class BatchManifest:
+    """The bundles redacted by a batch run, or by some shards of one."""
+
+    # The shards covered, as "i/N". Empty for a run over all bundles.
+    shards: List[str] = field(default_factory=list)
+    bundles: List[FileBundle] = field(default_factory=list)
+    summary: BatchSummary = field(default_factory=BatchSummary)
+
+    def missing_shards(self) -> List[str]:
+        """The shards of the run not covered by the manifest."""
+        if not self.shards:
+            return []
+        count = Shard.parse(self.shards[0]).count
+        return [
+            str(Shard(index, count))
+            for index in range(1, count + 1)
+            if str(Shard(index, count)) not in self.shards
+        ]
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict) -> BatchManifest:
+        return dacite.from_dict(data_class=BatchManifest, data=data)
+
+    @staticmethod
+    def merge(manifests: List[BatchManifest]) -> BatchManifest:
+        """Merge the manifests of distinct shards of the same run."""
+        merged = BatchManifest()
+        for manifest in manifests:
+            for shard in manifest.shards:
+                if shard in merged.shards:
+                    raise ValueError(f"Shard {shard} is in more than one manifest.")
+                if (
+                    Shard.parse(shard).count
+                    != Shard.parse((merged.shards or [shard])[0]).count
+                ):
+                    raise ValueError("The manifests are of different shard counts.")
+                merged.shards.append(shard)
+            merged.bundles.extend(manifest.bundles)
+            merged.summary.add(manifest.summary)
+
+        merged.shards.sort(key=lambda shard: Shard.parse(shard).index)
+        merged.bundles.sort(key=lambda bundle: bundle.image_file_name)
+        return merged
@@ -0,0 +1,32 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass, field
+from typing import Collection, Optional
+
+from redact.preprocess.pdf_renderer import MIN_RENDER_DPI
+from redact.redaction.banded_page_redaction import DEFAULT_BAND_HEIGHT
+from redact.types.api_version import ApiVersion
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.render_mode import RenderMode
+
+
+@dataclass
+class BatchOptions:
+    """How the bundles of a batch are redacted. See `batch_redact.py`."""
+
+    api_version: ApiVersion
+    labels_to_redact: Collection[str] = field(default_factory=tuple)
+    encoder_profile: EncoderProfile = EncoderProfile.DEFAULT
+    render_dpi: int = 300
+    render_mode: RenderMode = RenderMode.RGBA
+    max_page_pixels: Optional[int] = None
+    min_render_dpi: int = MIN_RENDER_DPI
+    vector_pdf: bool = False
+    merge_pages: bool = False
+    keep_page_files: bool = False
+    band_page_pixels: Optional[int] = None
+    band_height: int = DEFAULT_BAND_HEIGHT
+    # Redact the image, label and OCR result of a bundle concurrently.
+    bundle_threads: bool = False
@@ -0,0 +1,22 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass
+
+
+@dataclass
+class BundleCost:
+    """What an input bundle costs to redact, estimated before it is."""
+
+    page_count: int = 1
+    # Bytes of the image file.
+    image_bytes: int = 0
+    # Words of the OCR result.
+    word_count: int = 0
+    # Pixels of its largest page, as rendered or decoded.
+    page_pixels: int = 0
+    # Estimated seconds to redact the bundle.
+    seconds: float = 0.0
+    # Estimated peak memory of the process redacting it, in bytes.
+    memory_bytes: int = 0
@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import pstats
+from typing import Dict, List, Optional
+
+
+@dataclass
+class StageMetrics:
+    """Time spent in a stage, e.g. rendering, over one or more calls."""
+
+    wall_seconds: float = 0.0
+    # CPU time of the thread running the stage.
+    cpu_seconds: float = 0.0
+    calls: int = 0
+    # Highest peaks of the process RSS and of the traced Python allocations in
+    # a call, in bytes, if recorded.
+    peak_rss: int = 0
+    peak_traced: int = 0
+
+    def add(self, other: StageMetrics):
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.calls += other.calls
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+        self.peak_traced = max(self.peak_traced, other.peak_traced)
+
+
+@dataclass
+class StageEvent:
+    """A call of a stage on the timeline of a bundle."""
+
+    name: str
+    # time.perf_counter() at its start, the same clock in all processes.
+    start: float
+    seconds: float
+    process: int
+    thread: int
+
+
+@dataclass
+class BundleMetrics:
+    """What redacting a bundle, or a whole batch, took, see
+    `redact.utils.metrics`."""
+
+    # Stage name: time spent.
+    stages: Dict[str, StageMetrics] = field(default_factory=dict)
+    # Counter name (e.g. pages, bytes_in): value.
+    counters: Dict[str, float] = field(default_factory=dict)
+    # Peaks of the process RSS and of the traced Python allocations, in
+    # bytes, if recorded.
+    peak_rss: int = 0
+    peak_traced: int = 0
+    # Calls of the stages, if traced.
+    events: Optional[List[StageEvent]] = None
+    # cProfile stats of the bundle, as in `cProfile.Profile.stats`, if
+    # profiled.
+    profile: Optional[Dict] = None
+
+    def add(self, other: BundleMetrics):
+        for name, stage in other.stages.items():
+            self.stages.setdefault(name, StageMetrics()).add(stage)
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+        self.peak_traced = max(self.peak_traced, other.peak_traced)
+        if other.events is not None:
+            self.events = (self.events or []) + other.events
+        if other.profile is not None:
+            profile = dict(self.profile or {})
+            for function, stats in other.profile.items():
+                profile[function] = pstats.add_func_stats(
+                    profile.get(function, (0, 0, 0, 0, {})), stats
+                )
+            self.profile = profile
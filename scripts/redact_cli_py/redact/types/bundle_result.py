@@ -0,0 +1,42 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle
+
+
+@dataclass
+class BundleResult:
+    """The outcome of a task of a batch."""
+
+    task: BundleTask
+    # Bytes of redacted images written.
+    image_bytes: int = 0
+    seconds: float = 0.0
+    # Why the bundle failed, None if it succeeded.
+    error: Optional[str] = None
+    # Whether the bundle was killed at its timeout.
+    timed_out: bool = False
+    # Stages and counters, if recorded.
+    metrics: Optional[BundleMetrics] = None
+
+    @property
+    def bundle(self) -> FileBundle:
+        return self.task.bundle
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def to_failure_dict(self) -> Dict:
+        return {
+            "image_file_name": self.bundle.image_file_name,
+            "error": self.error,
+            "timed_out": self.timed_out,
+            "seconds": round(self.seconds, 3),
+        }
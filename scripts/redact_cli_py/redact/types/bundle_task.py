@@ -0,0 +1,34 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.redaction_plan import RedactionPlan
+
+
+@dataclass
+class BundleTask:
+    """A unit of work of a batch: an input bundle, or a part of a document
+    split into page tasks."""
+
+    mode: FileType
+    bundle: FileBundle
+    # Estimated cost in seconds, see `redact.batch.cost_model`.
+    cost: float = 0.0
+    # Estimated peak memory in bytes, see `redact.batch.cost_model`.
+    memory: int = 0
+    # The pages (first, last) of a page task, and the plan shared by the
+    # tasks of a split document.
+    pages: Optional[Tuple[int, int]] = None
+    plan: Optional[RedactionPlan] = None
+    # Whether the task finishes a split document once its pages are done.
+    finish: bool = False
+    page_count: Optional[int] = None
+    # Folder the task writes into, a new staging folder by default, and
+    # folder its files are moved to if it succeeds, the output folder by
+    # default.
+    staging_folder: Optional[str] = None
+    output_folder: Optional[str] = None
@@ -0,0 +1,16 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from enum import Enum
+
+
+class EncoderProfile(Enum):
+    # Pillow defaults, i.e. the behavior before encoder profiles existed.
+    DEFAULT = "default"
+    # Cheapest encode: low zlib level, JPEG subsampling kept from the source.
+    FAST = "fast"
+    # Lossless containers at full effort, JPEG quantization kept from the source.
+    ARCHIVAL = "archival"
+    # Smallest output: optimized PNG/JPEG, Group4 TIFF for bilevel images.
+    SMALL = "small"
@@ -26,13 +26,15 @@ class FileBundle:
 
         img_pattern = re.compile(mode.value)
         img_files = [n for n in names if img_pattern.match(n)]
+        # Membership tests against a set keep pairing linear in the names.
+        name_set = set(names)
 
         ret = list()
         for img_file in img_files:
             label_file = img_file + label_suffix
             ocr_file = img_file + ocr_suffix
 
-            if label_file in names and ocr_file in names:
+            if label_file in name_set and ocr_file in name_set:
                 ret.append(
                     FileBundle(
                         image_file_name=img_file,
@@ -3,7 +3,7 @@
 # root for license information.
 
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from typing import Collection, List, Dict, Tuple
 from types import MappingProxyType
 
 from redact.types.annotation import Annotation
@@ -27,6 +27,18 @@ class Label:
 class FottLabel:
     labels: List[Label]
 
+    def has_entities(self, labels: Collection[str] = tuple()) -> bool:
+        """Whether any entity is tagged with one of the labels.
+
+        An empty collection stands for all labels, the same as
+        `labels_to_redact` in the redactions.
+        """
+        for label in self.labels:
+            if len(labels) == 0 or label.label in labels:
+                if len(label.value) > 0:
+                    return True
+        return False
+
     def to_annotations(
         self,
         page_size: Dict[int, Tuple[float, float]] = MappingProxyType({1: (1.0, 1.0)}),
@@ -0,0 +1,51 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Dict
+
+# Prefix of the match stats among the counters of a bundle.
+COUNTER_PREFIX = "match_"
+
+
+@dataclass
+class MatchStats:
+    """The geometry work of matching label regions to OCR words, see
+    `redact.utils.bounding_box_mapping.similar`."""
+
+    # Pairs of bounding boxes compared.
+    pairs: int = 0
+    # Pairs rejected by their envelopes, without building polygons.
+    prefilter_rejections: int = 0
+    # Pairs whose polygons were intersected.
+    intersections: int = 0
+    # Pairs found similar.
+    matches: int = 0
+    # Time spent finding the words of regions.
+    seconds: float = 0.0
+
+    def add(self, other: MatchStats):
+        self.pairs += other.pairs
+        self.prefilter_rejections += other.prefilter_rejections
+        self.intersections += other.intersections
+        self.matches += other.matches
+        self.seconds += other.seconds
+
+    def to_counters(self) -> Dict[str, float]:
+        return {COUNTER_PREFIX + name: value for name, value in asdict(self).items()}
+
+    @staticmethod
+    def from_counters(counters: Dict[str, float]) -> MatchStats:
+        def get(name: str) -> float:
+            return counters.get(COUNTER_PREFIX + name, 0)
+
+        return MatchStats(
+            pairs=int(get("pairs")),
+            prefilter_rejections=int(get("prefilter_rejections")),
+            intersections=int(get("intersections")),
+            matches=int(get("matches")),
+            seconds=get("seconds"),
+        )
@@ -0,0 +1,71 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict
+
+from redact.types.bundle_metrics import StageMetrics
+from redact.types.match_stats import MatchStats
+
+
+@dataclass
+class Percentiles:
+    """Percentiles of a value over the bundles of a batch, e.g. seconds."""
+
+    p50: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+
+
+@dataclass
+class StageReport:
+    """Time spent in a stage over all bundles of a batch."""
+
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    calls: int = 0
+    # Bundles going through the stage, and the time they spent in it.
+    bundles: int = 0
+    bundle_seconds: Percentiles = field(default_factory=Percentiles)
+    # Highest peaks of the process RSS and of the traced Python allocations
+    # in the stage, in bytes, if recorded.
+    peak_rss: int = 0
+    peak_traced: int = 0
+
+
+@dataclass
+class MetricsReport:
+    """The metrics of a batch run, see `redact.batch.batch_metrics`."""
+
+    # Input bundles redacted, and failed.
+    bundles: int = 0
+    failed: int = 0
+    # Wall time of the whole run.
+    wall_seconds: float = 0.0
+    pages: int = 0
+    pages_per_second: float = 0.0
+    # PDF pages rendered below the render DPI to fit the page pixel budget.
+    pages_downscaled: int = 0
+    # Bytes of the input files read, and of the redacted files written.
+    bytes_in: int = 0
+    bytes_out: int = 0
+    # Words of the OCR results matched by a redacted label.
+    words_matched: int = 0
+    # Geometry work of matching label regions to OCR words.
+    matching: MatchStats = field(default_factory=MatchStats)
+    bundle_seconds: Percentiles = field(default_factory=Percentiles)
+    # Peaks of the process RSS and of the traced Python allocations of the
+    # bundles, in bytes, if recorded.
+    peak_rss: Percentiles = field(default_factory=Percentiles)
+    peak_traced: Percentiles = field(default_factory=Percentiles)
+    # Stages of the bundles, keyed by name.
+    stages: Dict[str, StageReport] = field(default_factory=dict)
+    # Stages of the batch itself, e.g. listing, downloads and uploads.
+    batch_stages: Dict[str, StageMetrics] = field(default_factory=dict)
+    # All counters of the bundles, summed.
+    counters: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
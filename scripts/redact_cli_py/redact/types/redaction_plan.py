@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import dacite
+
+from redact.types.annotation import Annotation
+
+
+@dataclass
+class RedactedLabel:
+    label: str
+    # 1-based page numbers having at least one entity of the label.
+    pages: List[int]
+
+
+@dataclass(frozen=True)
+class RedactedWord:
+    page: int
+    # Index of the word in its line (v2.x) or in its page (v3.x).
+    word: int
+    # Index of the line in its page. Only the v2.x schema nests words in lines.
+    line: Optional[int] = None
+
+
+@dataclass
+class RedactedRegion:
+    page: int
+    field: str
+    # Normalized to the page size, the same as the FOTT label bounding boxes.
+    bounding_box: List[float]
+
+    def to_annotation(self, page_size: Tuple[float, float]) -> Annotation:
+        width, height = page_size
+        bounding_box = [
+            elem * width if i % 2 == 0 else elem * height
+            for i, elem in enumerate(self.bounding_box)
+        ]
+        return Annotation(
+            bounding_box=bounding_box, page=self.page, field=self.field, text=""
+        )
+
+
+@dataclass
+class RedactionPlan:
+    """What to redact in one document, computed once and applied to the
+    image, the FOTT label and the OCR result of the full document or of any
+    of its pages."""
+
+    api_version: str
+    labels: List[RedactedLabel] = field(default_factory=list)
+    words: List[RedactedWord] = field(default_factory=list)
+    regions: List[RedactedRegion] = field(default_factory=list)
+    # Whether the regions were matched against the OCR result, so words holds
+    # all the words to redact. A plan built without the OCR result has no
+    # words, which does not mean that no word is redacted.
+    ocr_matched: bool = False
+
+    def label_names(self) -> List[str]:
+        return [label.label for label in self.labels]
+
+    def for_page(self, page_number: int) -> RedactionPlan:
+        """The plan of a single page, renumbered as page 1 as in the files
+        extracted by `redact.preprocess.multi_page`."""
+        return RedactionPlan(
+            api_version=self.api_version,
+            labels=[
+                RedactedLabel(label=label.label, pages=[1])
+                for label in self.labels
+                if page_number in label.pages
+            ],
+            words=[
+                RedactedWord(page=1, word=word.word, line=word.line)
+                for word in self.words
+                if word.page == page_number
+            ],
+            regions=[
+                RedactedRegion(
+                    page=1, field=region.field, bounding_box=region.bounding_box
+                )
+                for region in self.regions
+                if region.page == page_number
+            ],
+            ocr_matched=self.ocr_matched,
+        )
+
+    def to_annotations(
+        self, page_number: int, page_size: Tuple[float, float]
+    ) -> List[Annotation]:
+        return [
+            region.to_annotation(page_size)
+            for region in self.regions
+            if region.page == page_number
+        ]
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict) -> RedactionPlan:
+        return dacite.from_dict(data_class=RedactionPlan, data=data)
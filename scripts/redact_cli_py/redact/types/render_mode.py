@@ -0,0 +1,16 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from enum import Enum
+
+
+class RenderMode(Enum):
+    # 32-bit color with alpha, the default.
+    RGBA = "rgba"
+    # 24-bit color.
+    RGB = "rgb"
+    # 8-bit grayscale.
+    GRAY = "gray"
+    # 1-bit black and white, thresholded from grayscale.
+    BILEVEL = "bilevel"
@@ -0,0 +1,42 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One of count disjoint slices of the bundles of a batch.
+
+    Bundles are assigned to shards by a hash of their image file name, which
+    is the same on every node and every run, so nodes running the shards
+    1/N to N/N together process every bundle exactly once.
+    """
+
+    # 1-based, up to count.
+    index: int
+    count: int
+
+    def __post_init__(self):
+        if self.count < 1 or not 1 <= self.index <= self.count:
+            raise ValueError(f"Invalid shard {self.index}/{self.count}.")
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def includes(self, name: str) -> bool:
+        digest = hashlib.sha256(name.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index - 1
+
+    @staticmethod
+    def parse(value: str) -> Shard:
+        """Parse a shard written as "i/N", e.g. "2/8"."""
+        try:
+            index, count = value.split("/")
+            return Shard(int(index), int(count))
+        except ValueError:
+            raise ValueError(f'Invalid shard "{value}", expected "i/N".')
@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass
+from typing import Optional
+
+from redact.types.bundle_metrics import BundleMetrics
+
+
+@dataclass
+class SplitDocument:
+    """The progress of a document split into page tasks."""
+
+    # Folder its pages are staged in until it is finished.
+    pages_folder: str
+    # Tasks not done yet.
+    tasks_left: int
+    # Totals of its tasks done.
+    image_bytes: int = 0
+    seconds: float = 0.0
+    # The first error of its tasks, if any failed.
+    error: Optional[str] = None
+    timed_out: bool = False
+    # Metrics of its tasks, if recorded.
+    metrics: Optional[BundleMetrics] = None
@@ -0,0 +1,38 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class TiffEntry:
+    tag: int
+    type: int
+    count: int
+    # File offset of the values. Values of 4 bytes or fewer are stored in the
+    # entry itself.
+    value_offset: int
+    # Only the values of integer (BYTE, SHORT, LONG) entries are read.
+    values: Optional[List[int]] = None
+
+
+@dataclass
+class TiffDirectory:
+    """An image file directory (IFD), i.e. one page, of a TIFF file."""
+
+    offset: int
+    entries: Dict[int, TiffEntry] = field(default_factory=dict)
+
+    def get_values(self, tag: int, default: Optional[List[int]] = None) -> List[int]:
+        entry = self.entries.get(tag)
+        if entry is None or entry.values is None:
+            return default
+        return entry.values
+
+    def get_value(self, tag: int, default: Optional[int] = None) -> int:
+        values = self.get_values(tag)
+        if not values:
+            return default
+        return values[0]
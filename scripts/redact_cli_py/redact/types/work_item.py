@@ -0,0 +1,18 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from dataclasses import dataclass
+
+from redact.types.file_bundle import FileBundle, FileType
+
+
+@dataclass
+class WorkItem:
+    """An input bundle leased from a `WorkQueue`."""
+
+    id: int
+    mode: FileType
+    bundle: FileBundle
+    # Leases of the item so far, this one included.
+    attempts: int
@@ -2,10 +2,12 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from shapely.geometry import Polygon
 
+from redact.types.match_stats import MatchStats
+
 OVERLAP_THRESHOLD = 0.5
 
 
@@ -13,12 +15,41 @@ def similar(
     bounding_box_a: List[float],
     bounding_box_b: List[float],
     threshold=OVERLAP_THRESHOLD,
+    stats: Optional[MatchStats] = None,
 ) -> bool:
+    """Whether the intersection of two bounding boxes covers more than
+    threshold of the smaller one. The work done is counted into stats, if
+    given."""
+    if stats is not None:
+        stats.pairs += 1
+    # Boxes whose envelopes do not overlap do not intersect, which is most
+    # pairs of a page.
+    if not envelopes_overlap(bounding_box_a, bounding_box_b):
+        if stats is not None:
+            stats.prefilter_rejections += 1
+        return False
+
+    if stats is not None:
+        stats.intersections += 1
     a = Polygon(pairwise(bounding_box_a))
     b = Polygon(pairwise(bounding_box_b))
     base_area = min(a.area, b.area)
     intersect_area = a.intersection(b).area
-    return intersect_area / base_area > threshold
+    matched = intersect_area / base_area > threshold
+    if matched and stats is not None:
+        stats.matches += 1
+    return matched
+
+
+def envelopes_overlap(bounding_box_a: List[float], bounding_box_b: List[float]) -> bool:
+    xs_a, ys_a = bounding_box_a[0::2], bounding_box_a[1::2]
+    xs_b, ys_b = bounding_box_b[0::2], bounding_box_b[1::2]
+    return (
+        min(xs_a) < max(xs_b)
+        and min(xs_b) < max(xs_a)
+        and min(ys_a) < max(ys_b)
+        and min(ys_b) < max(ys_a)
+    )
 
 
 def pairwise(elements: List[float]) -> List[Tuple[float, float]]:
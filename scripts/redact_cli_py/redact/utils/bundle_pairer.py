@@ -0,0 +1,72 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import re
+from typing import Collection, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from redact.types.file_bundle import FileBundle, FileType
+
+LABEL_SUFFIX = ".labels.json"
+OCR_SUFFIX = ".ocr.json"
+
+# Bit of each file of a bundle in the parts seen.
+IMAGE = 1
+LABEL = 2
+OCR = 4
+ALL_PARTS = IMAGE | LABEL | OCR
+
+
+class BundlePairer:
+    """Pair a stream of file names into bundles of an image, its FOTT label
+    and its OCR result.
+
+    A bundle is emitted as soon as its third file is seen, whatever the order
+    of the names. Only the bundles still missing a file are held, keyed by
+    their image name, so pairing takes constant time per name.
+    """
+
+    def __init__(self, modes: Collection[FileType] = tuple(FileType)):
+        self.patterns = {mode: re.compile(mode.value) for mode in modes}
+        # Parts seen of the incomplete bundles, keyed by image name.
+        self.pending: Dict[str, int] = {}
+        # Image names of the bundles already emitted.
+        self.paired: Set[str] = set()
+
+    def pair(self, names: Iterable[str]) -> Iterator[Tuple[FileType, FileBundle]]:
+        for name in names:
+            paired = self.add(name)
+            if paired is not None:
+                yield paired
+
+    def add(self, name: str) -> Optional[Tuple[FileType, FileBundle]]:
+        """Add a file name. Returns the (type, bundle) it completes, if any."""
+        if name.endswith(LABEL_SUFFIX):
+            image_name, part = name[: -len(LABEL_SUFFIX)], LABEL
+        elif name.endswith(OCR_SUFFIX):
+            image_name, part = name[: -len(OCR_SUFFIX)], OCR
+        else:
+            image_name, part = name, IMAGE
+
+        mode = self.get_mode(image_name)
+        if mode is None or image_name in self.paired:
+            return None
+
+        parts = self.pending.get(image_name, 0) | part
+        if parts != ALL_PARTS:
+            self.pending[image_name] = parts
+            return None
+
+        del self.pending[image_name]
+        self.paired.add(image_name)
+        return mode, FileBundle(
+            image_file_name=image_name,
+            fott_file_name=image_name + LABEL_SUFFIX,
+            ocr_file_name=image_name + OCR_SUFFIX,
+        )
+
+    def get_mode(self, image_name: str) -> Optional[FileType]:
+        for mode, pattern in self.patterns.items():
+            if pattern.match(image_name):
+                return mode
+        return None
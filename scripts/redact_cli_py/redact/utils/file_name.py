@@ -3,6 +3,9 @@
 # root for license information.
 
 import re
+from typing import Optional
+
+from redact.types.shard import Shard
 
 
 def valid_url(url: str) -> bool:
@@ -42,3 +45,19 @@ def is_pdf(name: str) -> bool:
 def is_tiff(name: str) -> bool:
     regex = re.compile(".+(\\.tiff?)$")
     return re.match(regex, name)
+
+
+def get_manifest_file_name(shard: Optional[Shard] = None) -> str:
+    if shard is None:
+        return "manifest.json"
+    return f"manifest.{str(shard.index).zfill(3)}-of-{str(shard.count).zfill(3)}.json"
+
+
+def get_failures_file_name(shard: Optional[Shard] = None) -> str:
+    if shard is None:
+        return "failures.json"
+    return f"failures.{str(shard.index).zfill(3)}-of-{str(shard.count).zfill(3)}.json"
+
+
+def get_worker_failures_file_name(worker: str) -> str:
+    return f"failures.{worker}.json"
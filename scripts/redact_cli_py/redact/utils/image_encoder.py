@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, JpegImagePlugin
+
+from redact.types.encoder_profile import EncoderProfile
+
+# Formats whose encoders take the resolution of the image.
+DPI_FORMATS = ["PNG", "JPEG", "TIFF"]
+
+
+def save_image(
+    image: Image.Image,
+    output_path: str,
+    profile: EncoderProfile = EncoderProfile.DEFAULT,
+    source: Optional[Image.Image] = None,
+) -> int:
+    """Save the image with the encoder settings of the given profile.
+
+    Args:
+        image (Image): The image to be saved.
+        output_path (str): The output path. The format follows the extension.
+        profile (EncoderProfile): The encoder profile.
+        source (Image, optional): The image as decoded from the input file.
+            Used to carry the resolution, and JPEG subsampling and
+            quantization, over to the output.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    image_format = get_image_format(output_path)
+    params = encoder_params(image, image_format, EncoderProfile(profile), source)
+    if source is not None and "dpi" in source.info and image_format in DPI_FORMATS:
+        params["dpi"] = source.info["dpi"]
+    image.save(output_path, format=image_format, **params)
+    return Path(output_path).stat().st_size
+
+
+def can_pass_through(
+    source: Image.Image,
+    output_path: str,
+    profile: EncoderProfile = EncoderProfile.DEFAULT,
+) -> bool:
+    """Whether the source file can be written as-is in place of a redacted one.
+
+    Redacted images are physically transposed by their EXIF orientation and
+    saved without EXIF metadata. Only sources without EXIF metadata look the
+    same either way, and only if the output keeps the source format. Profiles
+    other than the default re-encode the image with their own settings.
+    """
+    return (
+        EncoderProfile(profile) == EncoderProfile.DEFAULT
+        and source.format == get_image_format(output_path)
+        and not source.getexif()
+    )
+
+
+def get_image_format(path: str) -> Optional[str]:
+    extension = Path(path).suffix.lower()
+    return Image.registered_extensions().get(extension)
+
+
+def get_png_compress_level(profile: EncoderProfile) -> int:
+    """The zlib level for PNG images streamed outside of Pillow."""
+    params = encoder_params(None, "PNG", EncoderProfile(profile))
+    if params.get("optimize"):
+        return 9
+    # Pillow compresses PNG images at level 6 by default.
+    return params.get("compress_level", 6)
+
+
+def encoder_params(
+    image: Image.Image,
+    image_format: str,
+    profile: EncoderProfile,
+    source: Optional[Image.Image] = None,
+) -> dict:
+    if profile == EncoderProfile.DEFAULT:
+        return {}
+
+    if image_format == "PNG":
+        if profile == EncoderProfile.FAST:
+            return {"compress_level": 1}
+        elif profile == EncoderProfile.ARCHIVAL:
+            return {"compress_level": 9}
+        elif profile == EncoderProfile.SMALL:
+            return {"optimize": True}
+
+    elif image_format == "JPEG":
+        params = {}
+        source_is_jpeg = isinstance(source, JpegImagePlugin.JpegImageFile)
+        if source_is_jpeg:
+            subsampling = JpegImagePlugin.get_sampling(source)
+            if subsampling != -1:
+                params["subsampling"] = subsampling
+
+        if profile == EncoderProfile.ARCHIVAL:
+            # Reusing the source quantization tables avoids another
+            # generation of compression loss on the untouched areas.
+            if source_is_jpeg and source.quantization:
+                params["qtables"] = source.quantization
+            else:
+                params["quality"] = 95
+                params["subsampling"] = 0
+        elif profile == EncoderProfile.SMALL:
+            params["optimize"] = True
+        return params
+
+    elif image_format == "TIFF":
+        if profile == EncoderProfile.FAST:
+            return {"compression": "packbits"}
+        elif profile == EncoderProfile.ARCHIVAL:
+            return {"compression": "tiff_lzw"}
+        elif profile == EncoderProfile.SMALL:
+            if image.mode == "1":
+                return {"compression": "group4"}
+            return {"compression": "tiff_adobe_deflate"}
+
+    elif image_format == "PDF":
+        # Pillow embeds grayscale and color pages as JPEG.
+        if profile == EncoderProfile.ARCHIVAL:
+            return {"quality": 95, "subsampling": 0}
+        elif profile == EncoderProfile.SMALL:
+            return {"optimize": True}
+        return {}
+
+    # Other formats (e.g. BMP) have no tunable encoder settings.
+    return {}
@@ -0,0 +1,45 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import re
+import tracemalloc
+from typing import Optional
+
+# Peaks of the memory of the process: the resident set size (RSS) high-water
+# mark kept by Linux, which a process can reset through clear_refs, and the
+# peak of the Python allocations traced by tracemalloc, if it is tracing.
+STATUS_PATH = "/proc/self/status"
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+PEAK_RSS_PATTERN = re.compile(rb"VmHWM:\s+(\d+) kB")
+
+
+def get_peak_rss() -> Optional[int]:
+    """The RSS high-water mark of the process in bytes, None if unknown."""
+    try:
+        with open(STATUS_PATH, "rb") as file:
+            match = PEAK_RSS_PATTERN.search(file.read())
+    except OSError:
+        return None
+    return int(match.group(1)) * 1024 if match else None
+
+
+def reset_peak_rss():
+    """Reset the RSS high-water mark to the current RSS, if supported."""
+    try:
+        with open(CLEAR_REFS_PATH, "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def get_peak_traced() -> Optional[int]:
+    """The peak bytes of traced allocations, None if not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[1]
+
+
+def reset_peak_traced():
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
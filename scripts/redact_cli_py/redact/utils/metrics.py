@@ -0,0 +1,155 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import os
+import threading
+import time
+from typing import Callable, ContextManager, Iterator, Optional
+
+from redact.types.bundle_metrics import BundleMetrics, StageEvent, StageMetrics
+from redact.utils.memory import (
+    get_peak_rss,
+    get_peak_traced,
+    reset_peak_rss,
+    reset_peak_traced,
+)
+
+# Opt-in timing of the stages of a redaction, and counters. Stages and counters
+# are recorded into the metrics of the innermost `recording()` block of the
+# process, from any thread. Outside of one, `stage()` and `count()` only check
+# that no recording is active. Calls of the stages are also traced into metrics
+# with events.
+#
+# With memory, the peaks of the process memory are recorded too, see
+# `redact.utils.memory`. The peaks are reset when a stage starts, so each
+# stage folds the peak it saw into the stage around it, kept per thread.
+# Stages running at the same time on other threads share the same peaks.
+_lock = threading.Lock()
+_metrics: Optional[BundleMetrics] = None
+_no_stage = nullcontext()
+_memory: Optional["_MemoryFrame"] = None
+_frames = threading.local()
+
+
+@contextmanager
+def recording(metrics: BundleMetrics, memory: bool = False) -> Iterator[BundleMetrics]:
+    """Record the stages and counters of the block into metrics, and with
+    memory, the peaks of the process memory."""
+    global _metrics, _memory
+    previous, previous_memory = _metrics, _memory
+    _metrics = metrics
+    _memory = _MemoryFrame() if memory else None
+    if _memory is not None:
+        _memory.start()
+    try:
+        yield metrics
+    finally:
+        if _memory is not None:
+            _memory.observe()
+            metrics.peak_rss = max(metrics.peak_rss, _memory.peak_rss)
+            metrics.peak_traced = max(metrics.peak_traced, _memory.peak_traced)
+        _metrics, _memory = previous, previous_memory
+
+
+def is_recording() -> bool:
+    return _metrics is not None
+
+
+def stage(name: str) -> ContextManager:
+    """Time a block as a stage. Stages may nest, each is timed whole."""
+    if _metrics is None:
+        return _no_stage
+    return _Stage(_metrics, name)
+
+
+def timed(name: str) -> Callable:
+    """Decorate a function to time its calls as a stage."""
+
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _metrics is None:
+                return function(*args, **kwargs)
+            with _Stage(_metrics, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1):
+    metrics = _metrics
+    if metrics is None:
+        return
+    with _lock:
+        metrics.counters[name] = metrics.counters.get(name, 0) + value
+
+
+class _MemoryFrame:
+    """The memory peaks seen by a recording or stage so far."""
+
+    def __init__(self):
+        self.peak_rss = 0
+        self.peak_traced = 0
+
+    def start(self):
+        reset_peak_rss()
+        reset_peak_traced()
+
+    def observe(self):
+        self.peak_rss = max(self.peak_rss, get_peak_rss() or 0)
+        self.peak_traced = max(self.peak_traced, get_peak_traced() or 0)
+
+    def add(self, other: "_MemoryFrame"):
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+        self.peak_traced = max(self.peak_traced, other.peak_traced)
+
+
+class _Stage:
+    def __init__(self, metrics: BundleMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.memory = None
+        self.parent = None
+
+    def __enter__(self):
+        root = _memory
+        if root is not None:
+            stack = _frames.__dict__.setdefault("stack", [])
+            # The peaks so far belong to the stage around this one.
+            self.parent = stack[-1] if stack else root
+            self.parent.observe()
+            self.memory = _MemoryFrame()
+            self.memory.start()
+            stack.append(self.memory)
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+
+    def __exit__(self, *args):
+        elapsed = StageMetrics(
+            time.perf_counter() - self.start,
+            time.thread_time() - self.cpu_start,
+            1,
+        )
+        if self.memory is not None:
+            self.memory.observe()
+            _frames.stack.pop()
+            self.parent.add(self.memory)
+            elapsed.peak_rss = self.memory.peak_rss
+            elapsed.peak_traced = self.memory.peak_traced
+        with _lock:
+            self.metrics.stages.setdefault(self.name, StageMetrics()).add(elapsed)
+            if self.metrics.events is not None:
+                self.metrics.events.append(
+                    StageEvent(
+                        self.name,
+                        self.start,
+                        elapsed.wall_seconds,
+                        os.getpid(),
+                        threading.get_ident(),
+                    )
+                )
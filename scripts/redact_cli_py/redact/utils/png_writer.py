@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+import struct
+from typing import Optional, Tuple
+import zlib
+
+from PIL import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# image mode: (bit depth, color type)
+PNG_FORMATS = {
+    "1": (1, 0),
+    "L": (8, 0),
+    "RGB": (8, 2),
+    "RGBA": (8, 6),
+}
+# Compressed data is written out in IDAT chunks of about this size.
+IDAT_CHUNK_SIZE = 64 * 1024
+
+
+class PngStreamWriter:
+    """Write a PNG image band by band.
+
+    Each band of rows is compressed as soon as it is written, so only one
+    band is held in memory, however large the image. Rows are not filtered,
+    which keeps the writer cheap in pure Python at the cost of somewhat
+    larger color images than Pillow writes.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        size: Tuple[int, int],
+        mode: str,
+        dpi: Optional[int] = None,
+        compress_level: int = 6,
+    ):
+        if mode not in PNG_FORMATS:
+            raise ValueError(f'Image mode "{mode}" is not supported.')
+        self.output_path = output_path
+        self.size = size
+        self.mode = mode
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(compress_level)
+        self.pending = b""
+
+        self.file = open(output_path, "wb")
+        bit_depth, color_type = PNG_FORMATS[mode]
+        width, height = size
+        self.file.write(PNG_SIGNATURE)
+        self.write_chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0),
+        )
+        if dpi:
+            # Pixels per meter, as Pillow writes it.
+            ppm = int(dpi / 0.0254 + 0.5)
+            self.write_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    def __enter__(self) -> "PngStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write(self, band: Image):
+        if band.mode != self.mode or band.width != self.size[0]:
+            raise ValueError("The band does not match the image mode and width.")
+        if self.rows_written + band.height > self.size[1]:
+            raise ValueError("The bands exceed the image height.")
+
+        data = band.tobytes()
+        row_size = len(data) // band.height
+        # Every row starts with its filter type, 0 (None).
+        rows = b"".join(
+            b"\x00" + data[offset : offset + row_size]
+            for offset in range(0, len(data), row_size)
+        )
+        self.pending += self.compressor.compress(rows)
+        self.rows_written += band.height
+        if len(self.pending) >= IDAT_CHUNK_SIZE:
+            self.write_chunk(b"IDAT", self.pending)
+            self.pending = b""
+
+    def close(self) -> int:
+        """Finish the image. Returns the number of bytes written."""
+        if self.file.closed:
+            return Path(self.output_path).stat().st_size
+        if self.rows_written != self.size[1]:
+            self.file.close()
+            raise ValueError(
+                f"Wrote {self.rows_written} of {self.size[1]} rows of the image."
+            )
+        self.write_chunk(b"IDAT", self.pending + self.compressor.flush())
+        self.pending = b""
+        self.write_chunk(b"IEND", b"")
+        self.file.close()
+        return Path(self.output_path).stat().st_size
+
+    def write_chunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(chunk_type + data)))
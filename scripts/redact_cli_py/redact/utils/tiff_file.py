@@ -0,0 +1,148 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import struct
+from typing import BinaryIO, Dict, List, Tuple
+
+from redact.types.tiff_directory import TiffDirectory, TiffEntry
+
+# TIFF field type: (struct format, size in bytes).
+FIELD_TYPES = {
+    1: ("B", 1),  # BYTE
+    2: ("B", 1),  # ASCII
+    3: ("H", 2),  # SHORT
+    4: ("I", 4),  # LONG
+    5: ("II", 8),  # RATIONAL
+    6: ("b", 1),  # SBYTE
+    7: ("B", 1),  # UNDEFINED
+    8: ("h", 2),  # SSHORT
+    9: ("i", 4),  # SLONG
+    10: ("ii", 8),  # SRATIONAL
+    11: ("f", 4),  # FLOAT
+    12: ("d", 8),  # DOUBLE
+    13: ("I", 4),  # IFD
+}
+INTEGER_TYPES = [1, 3, 4, 13]
+SHORT = 3
+LONG = 4
+BYTE_ORDERS = {b"II": "<", b"MM": ">"}
+
+
+def read_tiff_directories(file: BinaryIO) -> Tuple[str, List[TiffDirectory]]:
+    """Read the directories of a classic (not BigTIFF) TIFF file.
+
+    Returns:
+        Tuple[str, List[TiffDirectory]]: The struct byte order of the file,
+            and its directories in page order.
+    """
+    file.seek(0)
+    header = file.read(8)
+    if len(header) < 8 or header[:2] not in BYTE_ORDERS:
+        raise ValueError("Not a TIFF file.")
+    byte_order = BYTE_ORDERS[header[:2]]
+    magic, offset = struct.unpack(byte_order + "HI", header[2:])
+    if magic != 42:
+        raise ValueError("Only classic TIFF files are supported.")
+
+    directories = []
+    visited = set()
+    while offset != 0:
+        if offset in visited:
+            raise ValueError("The TIFF directories form a loop.")
+        visited.add(offset)
+        file.seek(offset)
+        (count,) = struct.unpack(byte_order + "H", file.read(2))
+        data = file.read(count * 12 + 4)
+        if len(data) < count * 12 + 4:
+            raise ValueError("The TIFF file is truncated.")
+
+        directory = TiffDirectory(offset=offset)
+        for index in range(count):
+            tag, field_type, value_count = struct.unpack(
+                byte_order + "HHI", data[index * 12 : index * 12 + 8]
+            )
+            value_offset = offset + 2 + index * 12 + 8
+            _, size = FIELD_TYPES.get(field_type, ("", 1))
+            if size * value_count > 4:
+                (value_offset,) = struct.unpack(
+                    byte_order + "I", data[index * 12 + 8 : index * 12 + 12]
+                )
+            directory.entries[tag] = TiffEntry(
+                tag, field_type, value_count, value_offset
+            )
+        (offset,) = struct.unpack(byte_order + "I", data[-4:])
+
+        for entry in directory.entries.values():
+            if entry.type in INTEGER_TYPES:
+                entry.values = read_values(file, byte_order, entry)
+        directories.append(directory)
+    return byte_order, directories
+
+
+def read_values(file: BinaryIO, byte_order: str, entry: TiffEntry) -> List[int]:
+    value_format, size = FIELD_TYPES[entry.type]
+    file.seek(entry.value_offset)
+    data = file.read(size * entry.count)
+    if len(data) < size * entry.count:
+        raise ValueError(f"The values of TIFF tag {entry.tag} are truncated.")
+    return list(struct.unpack(f"{byte_order}{entry.count}{value_format}", data))
+
+
+def write_value(
+    file: BinaryIO, byte_order: str, entry: TiffEntry, index: int, value: int
+):
+    """Overwrite one value of an integer entry in place."""
+    value_format, size = FIELD_TYPES[entry.type]
+    file.seek(entry.value_offset + index * size)
+    file.write(struct.pack(byte_order + value_format, value))
+    entry.values[index] = value
+
+
+def build_tiff(
+    byte_order: str, entries: Dict[int, Tuple[int, List[int]]], data: bytes
+) -> bytes:
+    """Build a single strip TIFF file in memory.
+
+    Args:
+        byte_order (str): The struct byte order of the file.
+        entries (Dict[int, Tuple[int, List[int]]]): The integer entries of
+            the image, as tag: (field type, values). The strip offsets and
+            byte counts are added.
+        data (bytes): The compressed strip.
+    """
+    entries = dict(entries)
+    entries[273] = (LONG, [0])
+    entries[279] = (LONG, [len(data)])
+    tags = sorted(entries)
+
+    directory_size = 2 + len(tags) * 12 + 4
+    values_offset = 8 + directory_size
+    values = b""
+    for tag in tags:
+        field_type, tag_values = entries[tag]
+        if FIELD_TYPES[field_type][1] * len(tag_values) > 4:
+            values += pack_values(byte_order, field_type, tag_values)
+            values += b"\x00" * (len(values) % 2)
+    entries[273] = (LONG, [values_offset + len(values)])
+
+    header = byte_order.replace("<", "II").replace(">", "MM").encode("ascii")
+    header += struct.pack(byte_order + "HI", 42, 8)
+    directory = struct.pack(byte_order + "H", len(tags))
+    offset = values_offset
+    for tag in tags:
+        field_type, tag_values = entries[tag]
+        packed = pack_values(byte_order, field_type, tag_values)
+        directory += struct.pack(byte_order + "HHI", tag, field_type, len(tag_values))
+        if len(packed) > 4:
+            directory += struct.pack(byte_order + "I", offset)
+            offset += len(packed) + len(packed) % 2
+        else:
+            directory += packed.ljust(4, b"\x00")
+    directory += struct.pack(byte_order + "I", 0)
+    return header + directory + values + data
+
+
+def pack_values(byte_order: str, field_type: int, values: List[int]) -> bytes:
+    value_format, _ = FIELD_TYPES[field_type]
+    return struct.pack(f"{byte_order}{len(values)}{value_format}", *values)
@@ -0,0 +1,116 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import json
+
+from redact.batch.batch_metrics import (
+    build_report,
+    get_percentiles,
+    write_prometheus_textfile,
+    write_report,
+)
+from redact.types.bundle_metrics import BundleMetrics, StageMetrics
+from redact.types.bundle_result import BundleResult
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle, FileType
+from redact.types.match_stats import MatchStats
+from redact.types.metrics_report import Percentiles
+
+
+def build_result(name: str, seconds: float, error: str = None) -> BundleResult:
+    return BundleResult(
+        BundleTask(
+            FileType.SINGLE_PAGE_IMAGE,
+            FileBundle(name, f"{name}.labels.json", f"{name}.ocr.json"),
+        ),
+        seconds=seconds,
+        error=error,
+        metrics=BundleMetrics(
+            stages={
+                "render": StageMetrics(
+                    seconds / 2, seconds / 4, 1, peak_rss=int(seconds * 1000)
+                )
+            },
+            counters={
+                "pages": 2,
+                "bytes_in": 100,
+                "bytes_out": 50,
+                "match_pairs": 10,
+                "match_matches": 1,
+            },
+            peak_rss=int(seconds * 2000),
+        ),
+    )
+
+
+class TestBatchMetrics:
+    def test_percentiles_are_nearest_rank(self) -> None:
+        values = [float(value) for value in range(100, 0, -1)]
+
+        assert get_percentiles(values) == Percentiles(
+            p50=50.0, p95=95.0, p99=99.0, max=100.0
+        )
+        assert get_percentiles([]) == Percentiles()
+
+    def test_build_report_sums_bundles(self) -> None:
+        results = [
+            build_result("a.jpg", 1.0),
+            build_result("b.jpg", 3.0, error="ValueError: bad"),
+            BundleResult(
+                BundleTask(
+                    FileType.SINGLE_PAGE_IMAGE,
+                    FileBundle("c.jpg", "c.jpg.labels.json", "c.jpg.ocr.json"),
+                ),
+                seconds=2.0,
+            ),
+        ]
+        batch_metrics = BundleMetrics(stages={"list": StageMetrics(0.5, 0.1, 2)})
+
+        report = build_report(results, batch_metrics, wall_seconds=2.0)
+
+        assert report.bundles == 3
+        assert report.failed == 1
+        assert report.pages == 4
+        assert report.pages_per_second == 2.0
+        assert report.bytes_in == 200
+        assert report.bytes_out == 100
+        assert report.bundle_seconds.max == 3.0
+        assert report.peak_rss == Percentiles(p50=2000, p95=6000, p99=6000, max=6000)
+        assert report.peak_traced == Percentiles()
+        assert report.matching == MatchStats(pairs=20, matches=2)
+        render = report.stages["render"]
+        assert render.wall_seconds == 2.0
+        assert render.cpu_seconds == 1.0
+        assert render.calls == 2
+        assert render.bundles == 2
+        assert render.bundle_seconds.p50 == 0.5
+        assert render.peak_rss == 3000
+        assert report.batch_stages == {"list": StageMetrics(0.5, 0.1, 2)}
+
+    def test_write_report_and_textfile(self, tmp_path) -> None:
+        report = build_report(
+            [build_result("a.jpg", 1.0)],
+            BundleMetrics(stages={"list": StageMetrics(0.5, 0.1, 2)}),
+            wall_seconds=1.0,
+        )
+        report_path = tmp_path / "metrics.json"
+        textfile_path = tmp_path / "redact.prom"
+
+        write_report(report, report_path)
+        write_prometheus_textfile(report, textfile_path)
+
+        assert json.loads(report_path.read_text())["stages"]["render"]["calls"] == 1
+        lines = textfile_path.read_text().splitlines()
+        assert "redact_batch_pages 2" in lines
+        assert "redact_batch_match_pairs 10" in lines
+        assert 'redact_batch_bundle_seconds{quantile="0.5"} 1.0' in lines
+        assert 'redact_batch_stage_seconds{stage="render"} 0.5' in lines
+        assert 'redact_batch_bundle_peak_rss_bytes{quantile="1"} 2000' in lines
+        assert 'redact_batch_stage_peak_rss_bytes{stage="render"} 1000' in lines
+        assert 'redact_batch_stage_seconds{stage="list",scope="batch"} 0.5' in lines
+        # No temporary file is left.
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "metrics.json",
+            "redact.prom",
+        ]
@@ -0,0 +1,175 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import json
+from pathlib import Path
+import shutil
+
+from PIL import Image, ImageChops
+import pytest
+
+from redact.batch.batch_scheduler import BatchScheduler
+from redact.batch.bundle_pool import BundlePool
+from redact.batch.bundle_runner import BundleRunner
+from redact.batch.cost_model import estimate_cost
+from redact.types.api_version import ApiVersion
+from redact.types.batch_options import BatchOptions
+from redact.types.file_bundle import FileBundle, FileType
+
+DOCUMENT = FileBundle("doc.tiff", "doc.tiff.labels.json", "doc.tiff.ocr.json")
+IMAGE = FileBundle("testdata.jpg", "testdata.jpg.labels.json", "testdata.jpg.ocr.json")
+
+
+def write_document(folder: Path, page_count: int):
+    """Write a TIFF bundle of testdata.jpg on every page."""
+    with Image.open("testdata/testdata.jpg") as image:
+        page = image.convert("L")
+    page.save(
+        folder / DOCUMENT.image_file_name,
+        save_all=True,
+        append_images=[page] * (page_count - 1),
+        compression="tiff_lzw",
+    )
+    label = json.loads(Path("testdata/testdata.jpg.labels.json").read_text())
+    for field in label["labels"]:
+        field["value"] = [
+            dict(value, page=number)
+            for number in range(1, page_count + 1)
+            for value in field["value"]
+        ]
+    (folder / DOCUMENT.fott_file_name).write_text(json.dumps(label))
+    ocr = json.loads(Path("testdata/testdata.jpg.ocr.json").read_text())
+    read_result = ocr["analyzeResult"]["readResults"][0]
+    ocr["analyzeResult"]["readResults"] = [
+        dict(read_result, page=number) for number in range(1, page_count + 1)
+    ]
+    ocr["analyzeResult"]["pageResults"] = []
+    (folder / DOCUMENT.ocr_file_name).write_text(json.dumps(ocr))
+
+
+def build_pool(
+    tmp_path: Path, workers: int, record_metrics: bool = False, **options
+) -> BundlePool:
+    pre_folder = tmp_path / "pre"
+    in_folder = tmp_path / "in"
+    out_folder = tmp_path / "out"
+    for folder in [pre_folder, in_folder, out_folder]:
+        folder.mkdir(parents=True)
+    write_document(pre_folder, 4)
+    for name in [IMAGE.image_file_name, IMAGE.fott_file_name, IMAGE.ocr_file_name]:
+        shutil.copy(Path("testdata", name), in_folder)
+    runner = BundleRunner(
+        BatchOptions(api_version=ApiVersion.V2_1, **options),
+        pre_folder,
+        in_folder,
+        out_folder,
+    )
+    return BundlePool(
+        runner, tmp_path / "staging", workers=workers, record_metrics=record_metrics
+    )
+
+
+def assert_same_pages(actual_path: Path, expected_path: Path):
+    with Image.open(actual_path) as actual, Image.open(expected_path) as expected:
+        assert actual.n_frames == expected.n_frames
+        for index in range(expected.n_frames):
+            actual.seek(index)
+            expected.seek(index)
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+
+BUNDLES = [
+    (FileType.SINGLE_PAGE_IMAGE, IMAGE),
+    (FileType.MULTI_PAGE, DOCUMENT),
+]
+
+
+class TestBatchScheduler:
+    def test_plan_tasks_splits_large_documents(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, workers=2)
+        cost = estimate_cost(DOCUMENT, pool.runner.pre_folder, pool.runner.options)
+        # Two pages per task.
+        scheduler = BatchScheduler(pool, split_seconds=cost.seconds / 2 + 0.001)
+
+        tasks = scheduler.plan_tasks(FileType.MULTI_PAGE, DOCUMENT)
+
+        assert [task.pages for task in tasks] == [(1, 2), (3, 4)]
+        assert sum(task.cost for task in tasks) == pytest.approx(cost.seconds)
+        assert tasks[0].plan is not None
+
+    def test_plan_tasks_keeps_small_documents(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, workers=2)
+        scheduler = BatchScheduler(pool, split_seconds=1000)
+
+        tasks = scheduler.plan_tasks(FileType.MULTI_PAGE, DOCUMENT)
+
+        assert len(tasks) == 1
+        assert tasks[0].pages is None
+        assert tasks[0].cost > 0
+
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"merge_pages": True, "keep_page_files": True}],
+    )
+    def test_split_documents_match_whole_documents(self, tmp_path, options) -> None:
+        expected_pool = build_pool(tmp_path / "expected", workers=1, **options)
+        expected = list(BatchScheduler(expected_pool).run(BUNDLES))
+        actual_pool = build_pool(tmp_path / "actual", workers=2, **options)
+        actual = list(BatchScheduler(actual_pool, split_seconds=0.001).run(BUNDLES))
+
+        assert sorted(
+            (result.bundle.image_file_name, result.image_bytes) for result in actual
+        ) == sorted(
+            (result.bundle.image_file_name, result.image_bytes) for result in expected
+        )
+        expected_folder = tmp_path / "expected" / "out"
+        actual_folder = tmp_path / "actual" / "out"
+        expected_names = sorted(path.name for path in expected_folder.iterdir())
+        assert sorted(path.name for path in actual_folder.iterdir()) == (expected_names)
+        for name in expected_names:
+            if name.endswith(".tiff"):
+                # The padding bytes of merged TIFFs may differ.
+                assert_same_pages(actual_folder / name, expected_folder / name)
+                continue
+            assert (actual_folder / name).read_bytes() == (
+                expected_folder / name
+            ).read_bytes()
+        assert list((tmp_path / "actual" / "staging").iterdir()) == []
+
+    def test_split_document_metrics_match_whole_document(self, tmp_path) -> None:
+        expected_pool = build_pool(tmp_path / "expected", 1, record_metrics=True)
+        expected = {
+            result.bundle.image_file_name: result.metrics
+            for result in BatchScheduler(expected_pool).run(BUNDLES)
+        }
+        actual_pool = build_pool(tmp_path / "actual", 2, record_metrics=True)
+        actual = {
+            result.bundle.image_file_name: result.metrics
+            for result in BatchScheduler(actual_pool, split_seconds=0.001).run(BUNDLES)
+        }
+
+        for name in [IMAGE.image_file_name, DOCUMENT.image_file_name]:
+            # All but the time spent matching.
+            del actual[name].counters["match_seconds"]
+            del expected[name].counters["match_seconds"]
+            assert actual[name].counters == expected[name].counters
+        assert actual[DOCUMENT.image_file_name].counters["pages"] == 4
+        assert actual[DOCUMENT.image_file_name].stages["image"].calls == 4
+
+    def test_failed_page_fails_document(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, workers=2)
+        scheduler = BatchScheduler(pool, split_seconds=0.001)
+        tasks = scheduler.plan_tasks(FileType.MULTI_PAGE, DOCUMENT)
+        # The label breaks after the document is planned, so every page fails.
+        label_path = tmp_path / "pre" / DOCUMENT.fott_file_name
+        label_path.write_text("{}")
+
+        results = list(pool.run(tasks))
+        document_results = [scheduler.add_document_result(result) for result in results]
+
+        assert all(result.failed for result in results)
+        assert document_results[:-1] == [None] * (len(results) - 1)
+        assert document_results[-1].failed
+        assert list((tmp_path / "out").iterdir()) == []
+        assert list((tmp_path / "staging").iterdir()) == []
@@ -0,0 +1,174 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from collections import deque
+from pathlib import Path
+import shutil
+import time
+
+import pytest
+
+from redact.batch.bundle_pool import BundlePool
+from redact.batch.bundle_runner import BundleRunner
+from redact.types.api_version import ApiVersion
+from redact.types.batch_options import BatchOptions
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle, FileType
+
+GOOD_BUNDLE = FileBundle(
+    "testdata.jpg", "testdata.jpg.labels.json", "testdata.jpg.ocr.json"
+)
+BAD_BUNDLE = FileBundle("bad.jpg", "bad.jpg.labels.json", "bad.jpg.ocr.json")
+TASKS = [
+    BundleTask(FileType.SINGLE_PAGE_IMAGE, BAD_BUNDLE),
+    BundleTask(FileType.SINGLE_PAGE_IMAGE, GOOD_BUNDLE),
+]
+
+
+class SlowRunner(BundleRunner):
+    def redact_bundle(self, fb: FileBundle, mode: FileType) -> int:
+        time.sleep(30)
+        return 0
+
+
+def build_pool(tmp_path: Path, runner_type=BundleRunner, **kwargs) -> BundlePool:
+    in_folder = tmp_path / "in"
+    in_folder.mkdir()
+    for name in [
+        GOOD_BUNDLE.image_file_name,
+        GOOD_BUNDLE.fott_file_name,
+        GOOD_BUNDLE.ocr_file_name,
+    ]:
+        shutil.copy(Path("testdata", name), in_folder)
+    # The label and OCR result are valid, so the image fails the bundle after
+    # they are written.
+    (in_folder / BAD_BUNDLE.image_file_name).write_bytes(b"not an image")
+    shutil.copy(
+        in_folder / GOOD_BUNDLE.fott_file_name, in_folder / "bad.jpg.labels.json"
+    )
+    shutil.copy(in_folder / GOOD_BUNDLE.ocr_file_name, in_folder / "bad.jpg.ocr.json")
+    out_folder = tmp_path / "out"
+    out_folder.mkdir()
+    runner = runner_type(
+        BatchOptions(api_version=ApiVersion.V2_1),
+        tmp_path / "pre",
+        in_folder,
+        out_folder,
+    )
+    return BundlePool(runner, tmp_path / "staging", **kwargs)
+
+
+class TestBundlePool:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_failed_bundle_does_not_stop_others(self, tmp_path, workers) -> None:
+        pool = build_pool(tmp_path, workers=workers)
+
+        results = {result.bundle.image_file_name: result for result in pool.run(TASKS)}
+
+        assert results["bad.jpg"].failed
+        assert results["bad.jpg"].error.startswith("PIL.UnidentifiedImageError")
+        assert not results["testdata.jpg"].failed
+        assert results["testdata.jpg"].image_bytes > 0
+        # Nothing of the failed bundle is left in the output.
+        assert sorted(path.name for path in (tmp_path / "out").iterdir()) == [
+            "redacted_testdata.jpg",
+            "redacted_testdata.jpg.labels.json",
+            "redacted_testdata.jpg.ocr.json",
+        ]
+        assert list((tmp_path / "staging").iterdir()) == []
+
+    def test_isolated_matches_in_process(self, tmp_path) -> None:
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        in_process = list(build_pool(tmp_path / "a").run(TASKS[1:]))
+        isolated = list(build_pool(tmp_path / "b", timeout=60).run(TASKS[1:]))
+
+        assert isolated[0].image_bytes == in_process[0].image_bytes
+        for path in (tmp_path / "a" / "out").iterdir():
+            assert (tmp_path / "b" / "out" / path.name).read_bytes() == (
+                path.read_bytes()
+            )
+
+    def test_timeout_kills_bundle(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, SlowRunner, timeout=0.5)
+        start = time.perf_counter()
+
+        results = list(pool.run(TASKS[1:]))
+
+        assert time.perf_counter() - start < 10
+        assert results[0].failed
+        assert results[0].timed_out
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_records_metrics_of_every_task(self, tmp_path, workers) -> None:
+        pool = build_pool(tmp_path, workers=workers, record_metrics=True)
+
+        results = {result.bundle.image_file_name: result for result in pool.run(TASKS)}
+
+        metrics = results["testdata.jpg"].metrics
+        assert {"match", "image", "label", "ocr"} <= set(metrics.stages)
+        assert metrics.counters["pages"] == 1
+        assert metrics.counters["bytes_in"] == sum(
+            path.stat().st_size
+            for path in (tmp_path / "in").iterdir()
+            if path.name.startswith("testdata.jpg")
+        )
+        assert metrics.counters["bytes_out"] == sum(
+            path.stat().st_size for path in (tmp_path / "out").iterdir()
+        )
+        # Failed tasks keep the metrics recorded until they failed.
+        assert "match" in results["bad.jpg"].metrics.stages
+
+    def test_does_not_record_metrics_by_default(self, tmp_path) -> None:
+        pool = build_pool(tmp_path)
+
+        assert all(result.metrics is None for result in pool.run(TASKS))
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_profiles_one_in_every(self, tmp_path, workers) -> None:
+        pool = build_pool(tmp_path, workers=workers, profile_every=2)
+
+        results = list(pool.run(TASKS))
+
+        # The first task is profiled, even though it fails.
+        assert results[0].bundle == BAD_BUNDLE
+        assert results[0].metrics.profile
+        # The stage failing is traced too.
+        assert [event.name for event in results[0].metrics.events] == [
+            "match",
+            "image",
+        ]
+        assert results[1].metrics is None
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_traces_memory_peaks(self, tmp_path, workers) -> None:
+        pool = build_pool(tmp_path, workers=workers, trace_memory=True)
+
+        results = {result.bundle.image_file_name: result for result in pool.run(TASKS)}
+
+        metrics = results["testdata.jpg"].metrics
+        assert metrics.peak_traced > 0
+        assert metrics.stages["image"].peak_traced > 0
+        assert metrics.peak_traced >= metrics.stages["image"].peak_traced
+
+    def test_admits_tasks_within_memory_budget(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, workers=2, memory_budget=120)
+        large = BundleTask(FileType.SINGLE_PAGE_IMAGE, GOOD_BUNDLE, memory=80)
+        small = BundleTask(FileType.SINGLE_PAGE_IMAGE, BAD_BUNDLE, memory=30)
+        pool.pending = deque([large, small])
+
+        # A task larger than the budget left is skipped for a smaller one.
+        assert pool.admit(running_memory=80, running_count=1) is small
+        assert pool.admit(running_memory=110, running_count=2) is None
+        # A task is always started when none is running.
+        assert pool.admit(running_memory=0, running_count=0) is large
+
+    def test_runs_tasks_over_memory_budget_alone(self, tmp_path) -> None:
+        pool = build_pool(tmp_path, workers=2, memory_budget=100)
+        tasks = [BundleTask(task.mode, task.bundle, memory=200) for task in TASKS]
+
+        results = {result.bundle.image_file_name: result for result in pool.run(tasks)}
+
+        assert results["bad.jpg"].failed
+        assert not results["testdata.jpg"].failed
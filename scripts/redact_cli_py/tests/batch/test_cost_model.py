@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+
+from PIL import Image
+
+from redact.batch.cost_model import (
+    count_words,
+    estimate_cost,
+    get_max_page_pixels,
+    get_page_count,
+)
+from redact.types.api_version import ApiVersion
+from redact.types.batch_options import BatchOptions
+from redact.types.file_bundle import FileBundle
+
+OPTIONS = BatchOptions(api_version=ApiVersion.V2_1)
+
+
+class TestCostModel:
+    def test_get_page_count(self, tmp_path) -> None:
+        tiff_path = tmp_path / "pages.tiff"
+        page = Image.new("L", (10, 10))
+        page.save(tiff_path, save_all=True, append_images=[page] * 2)
+
+        assert get_page_count(tiff_path) == 3
+        assert get_page_count(Path("testdata/testdata.pdf")) == 1
+        assert get_page_count(Path("testdata/testdata.jpg")) == 1
+
+    def test_count_words(self) -> None:
+        assert count_words(Path("testdata/testdata.jpg.ocr.json")) == 44
+
+    def test_pdf_costs_more_at_higher_dpi(self) -> None:
+        fb = FileBundle(
+            "testdata.pdf", "testdata.pdf.labels.json", "testdata.pdf.ocr.json"
+        )
+
+        low = estimate_cost(
+            fb, "testdata", BatchOptions(ApiVersion.V2_1, render_dpi=150)
+        )
+        high = estimate_cost(fb, "testdata", OPTIONS)
+
+        assert high.seconds > low.seconds
+        assert high.memory_bytes > low.memory_bytes
+        assert high.page_pixels > 3 * low.page_pixels
+        assert high.page_count == 1
+
+    def test_larger_image_costs_more(self) -> None:
+        small = FileBundle(
+            "DLsample.jpg", "DLsample.jpg.labels.json", "DLsample.jpg.ocr.json"
+        )
+        large = FileBundle(
+            "testdata.jpg", "testdata.jpg.labels.json", "testdata.jpg.ocr.json"
+        )
+
+        assert (
+            estimate_cost(large, "testdata", OPTIONS).seconds
+            > estimate_cost(small, "testdata", OPTIONS).seconds
+        )
+
+    def test_get_max_page_pixels(self, tmp_path) -> None:
+        tiff_path = tmp_path / "pages.tiff"
+        Image.new("L", (10, 10)).save(
+            tiff_path, save_all=True, append_images=[Image.new("L", (20, 30))]
+        )
+
+        assert get_max_page_pixels(tiff_path, OPTIONS) == 600
+        with Image.open("testdata/testdata.jpg") as image:
+            width, height = image.size
+        assert (
+            get_max_page_pixels(Path("testdata/testdata.jpg"), OPTIONS)
+            == width * height
+        )
@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import cProfile
+import json
+import pstats
+
+import pytest
+
+from redact.batch.profile_keeper import ProfileKeeper
+from redact.types.bundle_metrics import BundleMetrics, StageEvent
+from redact.types.bundle_result import BundleResult
+from redact.types.bundle_task import BundleTask
+from redact.types.file_bundle import FileBundle, FileType
+
+
+def build_profile() -> dict:
+    profiler = cProfile.Profile()
+    with profiler:
+        assert sorted(range(100))[0] == 0
+    profiler.create_stats()
+    return profiler.stats
+
+
+def build_result(name: str, seconds: float) -> BundleResult:
+    return BundleResult(
+        BundleTask(
+            FileType.SINGLE_PAGE_IMAGE,
+            FileBundle(name, f"{name}.labels.json", f"{name}.ocr.json"),
+        ),
+        seconds=seconds,
+        metrics=BundleMetrics(
+            events=[
+                StageEvent("match", 10.0, 0.5, 1, 1),
+                StageEvent("image", 10.5, 1.0, 1, 2),
+            ],
+            profile=build_profile(),
+        ),
+    )
+
+
+class TestProfileKeeper:
+    def test_keeps_slowest_bundles(self, tmp_path) -> None:
+        keeper = ProfileKeeper(tmp_path, slowest=2)
+        results = [
+            build_result(name, seconds)
+            for name, seconds in [("a.jpg", 1.0), ("b.jpg", 3.0), ("c.jpg", 2.0)]
+        ]
+
+        for result in results:
+            keeper.add(result)
+        paths = keeper.write()
+
+        assert [path.name for path in paths] == ["01-b.jpg.prof", "02-c.jpg.prof"]
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "01-b.jpg.prof",
+            "01-b.jpg.trace.json",
+            "02-c.jpg.prof",
+            "02-c.jpg.trace.json",
+        ]
+        # The profiles are taken out of the results.
+        assert all(result.metrics.profile is None for result in results)
+        stats = pstats.Stats(str(paths[0]))
+        assert stats.total_calls > 0
+
+    def test_trace_is_relative_to_first_stage(self, tmp_path) -> None:
+        keeper = ProfileKeeper(tmp_path, slowest=1)
+        keeper.add(build_result("a.jpg", 1.5))
+
+        keeper.write()
+
+        trace = json.loads((tmp_path / "01-a.jpg.trace.json").read_text())
+        assert trace["otherData"] == {"bundle": "a.jpg", "seconds": 1.5}
+        assert [
+            (event["name"], event["ts"], event["dur"], event["tid"])
+            for event in trace["traceEvents"]
+        ] == [("match", 0.0, 500000.0, 1), ("image", 500000.0, 1000000.0, 2)]
+
+    def test_skips_results_without_profile(self, tmp_path) -> None:
+        keeper = ProfileKeeper(tmp_path, slowest=1)
+        result = build_result("a.jpg", 1.0)
+        result.metrics.profile = None
+
+        keeper.add(result)
+
+        assert keeper.write() == []
+
+    def test_metrics_add_merges_profiles(self) -> None:
+        metrics = BundleMetrics()
+        profile = build_profile()
+
+        metrics.add(BundleMetrics(events=[], profile=profile))
+        metrics.add(BundleMetrics(events=[], profile=profile))
+
+        function = next(
+            function
+            for function in profile
+            if function[2] == "<built-in method builtins.sorted>"
+        )
+        assert metrics.profile[function][1] == 2 * profile[function][1]
+        assert metrics.events == []
+
+    def test_keeps_at_least_one(self, tmp_path) -> None:
+        with pytest.raises(ValueError):
+            ProfileKeeper(tmp_path, slowest=0)
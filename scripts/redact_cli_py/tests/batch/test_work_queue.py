@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pickle
+import time
+
+from redact.batch.work_queue import LeaseKeeper, WorkQueue
+from redact.types.file_bundle import FileBundle, FileType
+
+
+def build_bundle(image_file_name: str) -> FileBundle:
+    return FileBundle(
+        image_file_name,
+        image_file_name + ".labels.json",
+        image_file_name + ".ocr.json",
+    )
+
+
+BUNDLES = [
+    (FileType.MULTI_PAGE, build_bundle("a.pdf")),
+    (FileType.SINGLE_PAGE_IMAGE, build_bundle("b.jpg")),
+]
+
+
+class TestWorkQueue:
+    def test_enqueue_skips_queued_bundles(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db")
+
+        assert queue.enqueue(BUNDLES) == 2
+        assert queue.enqueue(BUNDLES) == 0
+        assert queue.counts() == {"queued": 2, "leased": 0, "done": 0, "failed": 0}
+
+    def test_lease_in_order_until_empty(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db")
+        queue.enqueue(BUNDLES)
+
+        first = queue.lease("worker-1")
+        second = queue.lease("worker-2")
+
+        assert (first.mode, first.bundle) == BUNDLES[0]
+        assert (second.mode, second.bundle) == BUNDLES[1]
+        assert first.attempts == 1
+        assert queue.lease("worker-1") is None
+
+    def test_complete(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db")
+        queue.enqueue(BUNDLES[:1])
+        item = queue.lease("worker-1")
+
+        assert not queue.complete(item, "worker-2")
+        assert queue.complete(item, "worker-1")
+        assert queue.counts()["done"] == 1
+
+    def test_fail_retries_until_max_attempts(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db", max_attempts=2)
+        queue.enqueue(BUNDLES[:1])
+
+        queue.fail(queue.lease("worker-1"), "worker-1", "first")
+        item = queue.lease("worker-2")
+        queue.fail(item, "worker-2", "second")
+
+        assert item.attempts == 2
+        assert queue.lease("worker-1") is None
+        assert queue.counts()["failed"] == 1
+        assert queue.failures() == {"a.pdf": "second"}
+
+    def test_expired_lease_is_leased_again(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db", lease_seconds=0.01)
+        queue.enqueue(BUNDLES[:1])
+        item = queue.lease("worker-1")
+        time.sleep(0.02)
+
+        again = queue.lease("worker-2")
+
+        assert again.id == item.id
+        assert again.attempts == 2
+        # The first worker lost its lease.
+        assert not queue.renew(item, "worker-1")
+        assert not queue.complete(item, "worker-1")
+        assert queue.complete(again, "worker-2")
+
+    def test_expired_lease_at_max_attempts_fails(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db", lease_seconds=0.01, max_attempts=1)
+        queue.enqueue(BUNDLES[:1])
+        queue.lease("worker-1")
+        time.sleep(0.02)
+
+        assert queue.lease("worker-2") is None
+        assert queue.failures() == {"a.pdf": "The lease expired."}
+
+    def test_lease_keeper_renews_lease(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db", lease_seconds=0.3)
+        queue.enqueue(BUNDLES[:1])
+        item = queue.lease("worker-1")
+
+        with LeaseKeeper(queue, item, "worker-1") as keeper:
+            time.sleep(0.6)
+            assert queue.lease("worker-2") is None
+
+        assert not keeper.lost
+        assert queue.complete(item, "worker-1")
+
+    def test_pickle_drops_connection(self, tmp_path) -> None:
+        queue = WorkQueue(tmp_path / "queue.db", lease_seconds=10, max_attempts=5)
+        queue.enqueue(BUNDLES)
+
+        actual = pickle.loads(pickle.dumps(queue))
+
+        assert actual.lease_seconds == 10
+        assert actual.max_attempts == 5
+        assert actual.counts()["queued"] == 2
@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pickle
+
+from redact.cache.match_cache import MatchCache
+from redact.redaction.redaction_planner import RedactionPlanner
+from redact.types.api_version import ApiVersion
+from redact.types.redaction_plan import RedactedWord
+from tests.factories.fott_label_factory import FottLabelFactory
+from tests.factories.ocr_result_factory import OcrResultFactory
+
+
+class TestMatchCache:
+    def test_get_missing(self, tmp_path) -> None:
+        cache = MatchCache(tmp_path / "cache.sqlite")
+
+        assert cache.get("missing") is None
+
+    def test_put_and_get(self, tmp_path) -> None:
+        cache = MatchCache(tmp_path / "cache.sqlite")
+        matches = [[RedactedWord(page=1, line=2, word=3)], []]
+
+        cache.put("key", matches)
+
+        assert cache.get("key") == matches
+
+    def test_build_key_depends_on_thresholds(self) -> None:
+        a = MatchCache.build_key("ocr", "label", "v2.1", (0.1, 0.98))
+        b = MatchCache.build_key("ocr", "label", "v2.1", (0.1, 0.9))
+
+        assert a != b
+
+    def test_evict_least_recently_used(self, tmp_path) -> None:
+        matches = [[RedactedWord(page=1, word=0)]]
+        cache = MatchCache(tmp_path / "cache.sqlite")
+        cache.put("size", matches)
+        entry_size = cache.connect().execute("SELECT size FROM matches").fetchone()[0]
+        cache.max_bytes = entry_size * 2
+
+        cache.put("a", matches)
+        cache.put("b", matches)
+        cache.get("a")
+        cache.put("c", matches)
+
+        assert cache.get("a") == matches
+        assert cache.get("b") is None
+        assert cache.get("c") == matches
+
+    def test_pickle_drops_connection(self, tmp_path) -> None:
+        cache = MatchCache(tmp_path / "cache.sqlite", max_bytes=1024)
+        cache.connect()
+
+        actual = pickle.loads(pickle.dumps(cache))
+
+        assert actual.path == cache.path
+        assert actual.max_bytes == 1024
+
+    def test_planner_hits_cache(self, tmp_path) -> None:
+        cache = MatchCache(tmp_path / "cache.sqlite")
+        fott_label = FottLabelFactory.build()
+        ocr_result = OcrResultFactory.build()
+        expected = RedactionPlanner(
+            fott_label, ocr_result, ApiVersion.V2_1, ["Name"]
+        ).plan()
+
+        for _ in range(2):
+            actual = RedactionPlanner(
+                fott_label,
+                ocr_result,
+                ApiVersion.V2_1,
+                ["Name"],
+                match_cache=cache,
+                content_hashes=("ocr", "label"),
+            ).plan()
+            assert actual == expected
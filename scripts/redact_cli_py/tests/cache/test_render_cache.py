@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import os
+
+from redact.cache import render_cache
+from redact.cache.render_cache import RenderCache
+
+
+class TestRenderCache:
+    def test_build_key_depends_on_dpi(self) -> None:
+        a = RenderCache.build_key("pdf", 1, 300, "flags")
+        b = RenderCache.build_key("pdf", 1, 150, "flags")
+
+        assert a != b
+
+    def test_get_missing(self, tmp_path) -> None:
+        cache = RenderCache(tmp_path / "cache")
+
+        assert not cache.get("missing", tmp_path / "out.png")
+
+    def test_put_and_get(self, tmp_path) -> None:
+        cache = RenderCache(tmp_path / "cache")
+        page = tmp_path / "page.png"
+        page.write_bytes(b"rendered")
+
+        cache.put("key", page)
+
+        assert cache.get("key", tmp_path / "out.png")
+        assert (tmp_path / "out.png").read_bytes() == b"rendered"
+
+    def test_page_count(self, tmp_path) -> None:
+        cache = RenderCache(tmp_path / "cache")
+
+        cache.put_page_count("pdf", 3)
+
+        assert cache.get_page_count("pdf") == 3
+        assert cache.get_page_count("other") is None
+
+    def test_evict_least_recently_used(self, tmp_path) -> None:
+        cache = RenderCache(tmp_path / "cache", max_bytes=20)
+        page = tmp_path / "page.png"
+        page.write_bytes(b"0123456789")
+
+        cache.put("a", page)
+        cache.put("b", page)
+        # Make "a" the most recently used entry.
+        os.utime(tmp_path / "cache" / "b.png", (0, 0))
+        cache.put("c", page)
+
+        assert cache.get("a", tmp_path / "out.png")
+        assert not cache.get("b", tmp_path / "out.png")
+        assert cache.get("c", tmp_path / "out.png")
+
+    def test_put_scans_folder_only_when_needed(self, tmp_path, monkeypatch) -> None:
+        cache = RenderCache(tmp_path / "cache", max_bytes=100)
+        page = tmp_path / "page.png"
+        page.write_bytes(b"0123456789")
+        scans = []
+        scandir = os.scandir
+
+        def counting_scandir(path):
+            scans.append(path)
+            return scandir(path)
+
+        monkeypatch.setattr(render_cache.os, "scandir", counting_scandir)
+        for index in range(40):
+            cache.put(str(index), page)
+
+        # One scan on the first put, and one per eviction of the pages of
+        # the last scan.
+        assert len(scans) < 10
+        names = sorted(path.name for path in (tmp_path / "cache").iterdir())
+        assert len(names) == 10
+        assert cache.get("39", tmp_path / "out.png")
+        assert not cache.get("0", tmp_path / "out.png")
+
+    def test_put_again_counts_the_page_once(self, tmp_path) -> None:
+        cache = RenderCache(tmp_path / "cache", max_bytes=20)
+        page = tmp_path / "page.png"
+        page.write_bytes(b"0123456789")
+
+        cache.put("a", page)
+        for _ in range(3):
+            cache.put("b", page)
+
+        assert cache.total_bytes == 20
+        assert cache.get("a", tmp_path / "out.png")
+        assert cache.get("b", tmp_path / "out.png")
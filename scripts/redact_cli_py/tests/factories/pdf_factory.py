@@ -0,0 +1,60 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import ctypes
+from typing import List, Tuple
+
+import pypdfium as pdfium
+
+from redact.preprocess.pdf_renderer import init_library, save_document
+
+
+class PdfFactory:
+    @staticmethod
+    def build_text_pdf(
+        output_path: str,
+        texts: List[Tuple[str, float, float]],
+        paths: List[List[Tuple[float, float]]] = (),
+    ):
+        """Write a born-digital letter size PDF with a text object per
+        (text, x, y), in Helvetica 12 with the baseline at (x, y) in points,
+        and a stroked path through the points of every path."""
+        init_library()
+        doc = pdfium.FPDF_CreateNewDocument()
+        page = pdfium.FPDFPage_New(doc, 0, 612, 792)
+        for points in paths:
+            path = pdfium.FPDFPageObj_CreateNewPath(*points[0])
+            for x, y in points[1:]:
+                pdfium.FPDFPath_LineTo(path, x, y)
+            pdfium.FPDFPath_SetDrawMode(path, 0, 1)
+            pdfium.FPDFPage_InsertObject(page, path)
+        for text, x, y in texts:
+            text_object = pdfium.FPDFPageObj_NewTextObj(doc, b"Helvetica", 12)
+            encoded = (text + "\0").encode("utf-16-le")
+            buffer = ctypes.create_string_buffer(encoded, len(encoded))
+            pdfium.FPDFText_SetText(
+                text_object, ctypes.cast(buffer, pdfium.FPDF_WIDESTRING)
+            )
+            pdfium.FPDFPageObj_Transform(text_object, 1, 0, 0, 1, x, y)
+            pdfium.FPDFPage_InsertObject(page, text_object)
+        pdfium.FPDFPage_GenerateContent(page)
+        pdfium.FPDF_ClosePage(page)
+        save_document(doc, output_path)
+        pdfium.FPDF_CloseDocument(doc)
+
+    @staticmethod
+    def get_text(pdf_path: str, page_number: int = 1) -> str:
+        init_library()
+        doc = pdfium.FPDF_LoadDocument(str(pdf_path), None)
+        page = pdfium.FPDF_LoadPage(doc, page_number - 1)
+        text_page = pdfium.FPDFText_LoadPage(page)
+        count = pdfium.FPDFText_CountChars(text_page)
+        buffer = ctypes.create_string_buffer((count + 1) * 2)
+        pdfium.FPDFText_GetText(
+            text_page, 0, count, ctypes.cast(buffer, ctypes.POINTER(ctypes.c_ushort))
+        )
+        pdfium.FPDFText_ClosePage(text_page)
+        pdfium.FPDF_ClosePage(page)
+        pdfium.FPDF_CloseDocument(doc)
+        return buffer.raw[: count * 2].decode("utf-16-le")
@@ -0,0 +1,31 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from redact.types.redaction_plan import (
+    RedactedLabel,
+    RedactedRegion,
+    RedactedWord,
+    RedactionPlan,
+)
+
+
+class RedactionPlanFactory:
+    @staticmethod
+    def build() -> RedactionPlan:
+        return RedactionPlan(
+            api_version="v2.1",
+            labels=[
+                RedactedLabel(label="Name", pages=[1]),
+                RedactedLabel(label="Date", pages=[1, 2]),
+            ],
+            words=[
+                RedactedWord(page=1, line=0, word=1),
+                RedactedWord(page=2, line=3, word=0),
+            ],
+            regions=[
+                RedactedRegion(page=1, field="Name", bounding_box=[0, 0, 1, 0, 1, 1]),
+                RedactedRegion(page=2, field="Date", bounding_box=[0, 0, 1, 0, 1, 1]),
+            ],
+            ocr_matched=True,
+        )
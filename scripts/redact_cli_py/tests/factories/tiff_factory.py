@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from io import BytesIO
+import math
+import struct
+
+from PIL import Image
+
+# Image mode: (photometric interpretation, bits per sample, extra samples).
+PIXEL_FORMATS = {
+    "1": (1, [1], []),
+    "L": (1, [8], []),
+    "RGB": (2, [8, 8, 8], []),
+    "RGBA": (2, [8, 8, 8, 8], [2]),
+}
+# Pillow encoder: TIFF compression.
+COMPRESSIONS = {
+    "raw": 1,
+    "group4": 4,
+    "tiff_lzw": 5,
+    "tiff_adobe_deflate": 8,
+    "packbits": 32773,
+}
+
+
+class TiffFactory:
+    @staticmethod
+    def build_tiled(
+        image: Image, path: str, tile_size: int = 64, compression: str = "raw"
+    ):
+        """Write a single page tiled TIFF, which Pillow cannot write."""
+        photometric, bits, extra_samples = PIXEL_FORMATS[image.mode]
+        across = math.ceil(image.width / tile_size)
+        down = math.ceil(image.height / tile_size)
+
+        tiles = []
+        for row in range(down):
+            for column in range(across):
+                # Edge tiles are padded beyond the image.
+                tile = Image.new(image.mode, (tile_size, tile_size))
+                tile.paste(
+                    image.crop(
+                        (
+                            column * tile_size,
+                            row * tile_size,
+                            (column + 1) * tile_size,
+                            (row + 1) * tile_size,
+                        )
+                    )
+                )
+                buffer = BytesIO()
+                tile.save(
+                    buffer,
+                    format="TIFF",
+                    compression=compression,
+                    strip_size=len(tile.tobytes()) + 1,
+                )
+                with Image.open(buffer) as encoded:
+                    offset = encoded.tag_v2[273][0]
+                    byte_count = encoded.tag_v2[279][0]
+                tiles.append(buffer.getvalue()[offset : offset + byte_count])
+
+        data = b"".join(tile + b"\x00" * (len(tile) % 2) for tile in tiles)
+        offsets, offset = [], 8
+        for tile in tiles:
+            offsets.append(offset)
+            offset += len(tile) + len(tile) % 2
+
+        values = b""
+        # tag: (type, values)
+        entries = {
+            256: (4, [image.width]),
+            257: (4, [image.height]),
+            258: (3, bits),
+            259: (3, [COMPRESSIONS[compression]]),
+            262: (3, [photometric]),
+            277: (3, [len(bits)]),
+            322: (3, [tile_size]),
+            323: (3, [tile_size]),
+            324: (4, offsets),
+            325: (4, [len(tile) for tile in tiles]),
+        }
+        if extra_samples:
+            entries[338] = (3, extra_samples)
+
+        values_offset = offset
+        directory = b""
+        for tag, (field_type, tag_values) in sorted(entries.items()):
+            packed = struct.pack(
+                f"<{len(tag_values)}{'H' if field_type == 3 else 'I'}", *tag_values
+            )
+            directory += struct.pack("<HHI", tag, field_type, len(tag_values))
+            if len(packed) > 4:
+                directory += struct.pack("<I", values_offset + len(values))
+                values += packed
+            else:
+                directory += packed.ljust(4, b"\x00")
+
+        directory_offset = values_offset + len(values)
+        with open(path, "wb") as file:
+            file.write(b"II" + struct.pack("<HI", 42, directory_offset))
+            file.write(data)
+            file.write(values)
+            file.write(struct.pack("<H", len(entries)))
+            file.write(directory)
+            file.write(struct.pack("<I", 0))
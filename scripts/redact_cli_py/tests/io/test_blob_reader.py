@@ -0,0 +1,67 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from types import SimpleNamespace
+
+from azure.storage.blob import ContainerClient
+
+from redact.io.blob_reader import LARGE_BLOB_BYTES, BlobReader
+from redact.types.file_bundle import FileBundle, FileType
+
+
+class FakeDownloader:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def readinto(self, stream) -> int:
+        stream.write(self.data)
+        return len(self.data)
+
+
+class FakeContainerClient:
+    def __init__(self, blobs: dict):
+        self.blobs = blobs
+        # (blob name, max_concurrency) of every download.
+        self.downloads = []
+
+    def list_blobs(self, name_starts_with: str):
+        return [
+            SimpleNamespace(name=name, size=size)
+            for name, (size, _) in self.blobs.items()
+            if name.startswith(name_starts_with)
+        ]
+
+    def download_blob(self, blob: str, max_concurrency: int = 1) -> FakeDownloader:
+        self.downloads.append((blob, max_concurrency))
+        return FakeDownloader(self.blobs[blob][1])
+
+
+class TestBlobReader:
+    def test_download_bundles_parallelizes_large_blobs(
+        self, tmp_path, monkeypatch
+    ) -> None:
+        client = FakeContainerClient(
+            {
+                "in/a.pdf": (LARGE_BLOB_BYTES + 1, b"pdf"),
+                "in/a.pdf.labels.json": (10, b"labels"),
+                "in/a.pdf.ocr.json": (10, b"ocr"),
+            }
+        )
+        monkeypatch.setattr(
+            ContainerClient,
+            "from_container_url",
+            lambda *args, **kwargs: client,
+        )
+        reader = BlobReader("https://account/container", "in/", max_concurrency=8)
+
+        bundles = reader.download_bundles(tmp_path, FileType.MULTI_PAGE)
+
+        assert bundles == [FileBundle("a.pdf", "a.pdf.labels.json", "a.pdf.ocr.json")]
+        assert client.downloads == [
+            ("in/a.pdf", 8),
+            ("in/a.pdf.labels.json", 1),
+            ("in/a.pdf.ocr.json", 1),
+        ]
+        assert (tmp_path / "a.pdf").read_bytes() == b"pdf"
+        assert (tmp_path / "a.pdf.ocr.json").read_bytes() == b"ocr"
@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from redact.io.local_reader import LocalReader
+from redact.types.file_bundle import FileBundle, FileType
+
+
+class TestLocalReader:
+    def test_copy_bundles_lists_input_once(self, tmp_path, monkeypatch) -> None:
+        input_folder = tmp_path / "input"
+        (input_folder / "nested").mkdir(parents=True)
+        for name in ["a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json", "b.pdf"]:
+            (input_folder / name).write_text(name)
+        for name in ["b.pdf.labels.json", "b.pdf.ocr.json"]:
+            (input_folder / "nested" / name).write_text(name)
+        output_folder = tmp_path / "output"
+        output_folder.mkdir()
+        reader = LocalReader(input_folder)
+
+        multi_page_bundles = reader.copy_bundles(output_folder, FileType.MULTI_PAGE)
+        # The second pass reuses the listing of the first one.
+        monkeypatch.setattr(reader, "list_names", None)
+        single_page_bundles = reader.copy_bundles(output_folder)
+
+        assert multi_page_bundles == [
+            FileBundle("b.pdf", "b.pdf.labels.json", "b.pdf.ocr.json")
+        ]
+        assert single_page_bundles == [
+            FileBundle("a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json")
+        ]
+        assert sorted(path.name for path in output_folder.iterdir()) == [
+            "a.jpg",
+            "a.jpg.labels.json",
+            "a.jpg.ocr.json",
+            "b.pdf",
+            "b.pdf.labels.json",
+            "b.pdf.ocr.json",
+        ]
+        assert (output_folder / "b.pdf.ocr.json").read_text() == "b.pdf.ocr.json"
+
+    def test_copy_bundles_links_files(self, tmp_path) -> None:
+        input_folder = tmp_path / "input"
+        input_folder.mkdir()
+        for name in ["a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json"]:
+            (input_folder / name).write_text(name)
+        output_folder = tmp_path / "output"
+        output_folder.mkdir()
+
+        LocalReader(input_folder, link=True).copy_bundles(output_folder)
+
+        for name in ["a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json"]:
+            assert (output_folder / name).samefile(input_folder / name)
+
+    def test_copy_all_bundles_copies_while_listing(self, tmp_path) -> None:
+        input_folder = tmp_path / "input"
+        input_folder.mkdir()
+        names = [
+            "b.pdf",
+            "b.pdf.labels.json",
+            "b.pdf.ocr.json",
+            "a.jpg",
+            "a.jpg.labels.json",
+            "a.jpg.ocr.json",
+        ]
+        for name in names:
+            (input_folder / name).write_text(name)
+        pre_folder = tmp_path / "pre"
+        pre_folder.mkdir()
+        output_folder = tmp_path / "output"
+        output_folder.mkdir()
+        reader = LocalReader(input_folder)
+        # Files copied when each name is listed.
+        copied = []
+
+        def list_names():
+            for name in names:
+                copied.append(len(list(pre_folder.iterdir())))
+                yield name
+
+        reader.list_names = list_names
+        bundles = reader.copy_all_bundles(
+            {
+                FileType.MULTI_PAGE: pre_folder,
+                FileType.SINGLE_PAGE_IMAGE: output_folder,
+            }
+        )
+
+        assert bundles == {
+            FileType.MULTI_PAGE: [
+                FileBundle("b.pdf", "b.pdf.labels.json", "b.pdf.ocr.json")
+            ],
+            FileType.SINGLE_PAGE_IMAGE: [
+                FileBundle("a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json")
+            ],
+        }
+        # The document is copied as soon as it is paired, before the image
+        # is listed.
+        assert copied == [0, 0, 0, 3, 3, 3]
+        assert len(list(output_folder.iterdir())) == 3
+
+    def test_list_names_does_not_follow_folder_links(self, tmp_path) -> None:
+        input_folder = tmp_path / "input"
+        (input_folder / "nested").mkdir(parents=True)
+        (input_folder / "a.jpg").write_text("a.jpg")
+        (input_folder / "nested" / "loop").symlink_to(input_folder)
+
+        assert list(LocalReader(input_folder).list_names()) == ["a.jpg"]
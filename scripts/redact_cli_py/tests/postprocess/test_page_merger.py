@@ -0,0 +1,103 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pytest
+from PIL import Image, ImageChops
+
+from redact.postprocess import merge_multi_page_bundle
+from redact.postprocess.page_merger import merge_page_images
+from redact.preprocess.pdf_renderer import PdfDocument, PdfPage
+from redact.types.file_bundle import FileBundle
+from tests.factories.image_factory import ImageFactory
+
+
+def write_pages(folder, count: int, dpi: int = 300):
+    paths = []
+    for index in range(count):
+        path = folder / f"page.{index + 1:03d}.png"
+        ImageFactory.build().convert("L").save(path, dpi=(dpi, dpi))
+        paths.append(path)
+    return paths
+
+
+class TestPageMerger:
+    def test_merge_tiff_keeps_source_compression(self, tmp_path) -> None:
+        page_paths = write_pages(tmp_path, 2)
+        source_path = tmp_path / "source.tiff"
+        Image.new("L", (10, 10)).save(source_path, compression="tiff_adobe_deflate")
+        output_path = tmp_path / "out.tiff"
+
+        actual_bytes = merge_page_images(
+            page_paths, output_path, source_path=source_path
+        )
+
+        assert actual_bytes == output_path.stat().st_size
+        with Image.open(output_path) as actual:
+            assert actual.n_frames == 2
+            for index, page_path in enumerate(page_paths):
+                actual.seek(index)
+                assert actual.info["compression"] == "tiff_adobe_deflate"
+                with Image.open(page_path) as expected:
+                    assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_merge_tiff_of_jpeg_source_is_lossless(self, tmp_path) -> None:
+        page_paths = write_pages(tmp_path, 2)
+        source_path = tmp_path / "source.tiff"
+        Image.new("L", (16, 16)).save(source_path, compression="jpeg")
+        output_path = tmp_path / "out.tiff"
+
+        merge_page_images(page_paths, output_path, source_path=source_path)
+
+        with Image.open(output_path) as actual:
+            for index, page_path in enumerate(page_paths):
+                actual.seek(index)
+                assert actual.info["compression"] == "tiff_adobe_deflate"
+                with Image.open(page_path) as expected:
+                    assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_merge_pdf_sizes_pages_by_dpi(self, tmp_path) -> None:
+        page_paths = write_pages(tmp_path, 3, dpi=300)
+        output_path = tmp_path / "out.pdf"
+
+        merge_page_images(page_paths, output_path)
+
+        with PdfDocument(output_path) as document:
+            assert document.get_page_count() == 3
+            with PdfPage(document, 300, page_number=3) as page:
+                # testdata.jpg is 2481 x 3509 pixels.
+                assert page.size == pytest.approx((2481, 3509), abs=2)
+
+    def test_merge_unsupported_format(self, tmp_path) -> None:
+        page_paths = write_pages(tmp_path, 1)
+
+        with pytest.raises(ValueError):
+            merge_page_images(page_paths, tmp_path / "out.png")
+
+    def test_merge_multi_page_bundle_removes_pages(self, tmp_path) -> None:
+        fb = FileBundle("doc.tiff", "doc.tiff.labels.json", "doc.tiff.ocr.json")
+        pre_folder = tmp_path / "pre"
+        out_folder = tmp_path / "out"
+        pre_folder.mkdir()
+        out_folder.mkdir()
+        ImageFactory.build_mode_1().save(pre_folder / fb.image_file_name)
+        page_bundles = [
+            FileBundle(
+                f"doc.tiff.{page:03d}.rendered.png",
+                f"doc.tiff.{page:03d}.rendered.png.labels.json",
+                f"doc.tiff.{page:03d}.rendered.png.ocr.json",
+            )
+            for page in [1, 2]
+        ]
+        for page_fb in page_bundles:
+            ImageFactory.build_mode_1().save(
+                out_folder / f"redacted_{page_fb.image_file_name}"
+            )
+            (out_folder / f"redacted_{page_fb.fott_file_name}").write_text("{}")
+            (out_folder / f"redacted_{page_fb.ocr_file_name}").write_text("{}")
+
+        merge_multi_page_bundle(fb, page_bundles, pre_folder, out_folder)
+
+        assert sorted(path.name for path in out_folder.iterdir()) == [
+            "redacted_doc.tiff"
+        ]
@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from PIL import Image, ImageChops
+
+from redact.preprocess.pdf_renderer import PdfRenderer
+from redact.redaction.banded_page_redaction import (
+    BandedPageRedaction,
+    get_band_annotations,
+)
+from redact.redaction.image_redaction import ImageRedaction
+from redact.types.annotation import Annotation
+from redact.types.render_mode import RenderMode
+from tests.factories.redaction_plan_factory import RedactionPlanFactory
+
+
+class TestBandedPageRedaction:
+    def test_redact_matches_full_page(self, tmp_path) -> None:
+        plan = RedactionPlanFactory.build()
+        renderer = PdfRenderer()
+        expected = renderer.render_pdf(
+            "testdata/testdata.pdf", 100, render_mode=RenderMode.GRAY
+        )
+        ImageRedaction(expected, plan.to_annotations(1, expected.size)).redact()
+
+        redaction = BandedPageRedaction(plan, tmp_path, 0, band_height=100)
+        with renderer.open_page(
+            "testdata/testdata.pdf", 100, render_mode=RenderMode.GRAY
+        ) as page:
+            assert redaction.accepts(page)
+            actual_bytes = redaction.redact(page, 1, "page.png")
+
+        output_path = tmp_path / "redacted_page.png"
+        assert redaction.redacted_images == {"page.png": actual_bytes}
+        with Image.open(output_path) as actual:
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_accepts_large_pages_only(self) -> None:
+        plan = RedactionPlanFactory.build()
+        redaction = BandedPageRedaction(plan, ".", 2000 * 2000)
+
+        with PdfRenderer().open_page("testdata/testdata.pdf", 72) as page:
+            assert not redaction.accepts(page)
+
+    def test_get_band_annotations(self) -> None:
+        annotations = [
+            Annotation(bounding_box=[0, 10, 5, 10, 5, 20], page=1, field="A", text=""),
+            Annotation(bounding_box=[0, 50, 5, 50, 5, 60], page=1, field="B", text=""),
+        ]
+
+        actual = get_band_annotations(annotations, 15, 10)
+
+        assert [a.field for a in actual] == ["A"]
+        assert actual[0].bounding_box == [0, -5, 5, -5, 5, 5]
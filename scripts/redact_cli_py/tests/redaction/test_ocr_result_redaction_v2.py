@@ -3,6 +3,7 @@
 # root for license information.
 
 from redact.redaction.ocr_result_redaction_v2 import OcrResultRedactionV2
+from redact.types.match_stats import MatchStats
 from tests.factories.ocr_result_factory import OcrResultFactory
 from tests.factories.annotation_factory import AnnotationFactory
 
@@ -43,3 +44,20 @@ class TestOcrResultRedactionV2:
 
         actual = ocr_result_redaction.ocr_result
         assert actual == expected
+
+    def test_redact_with_stats(self) -> None:
+        ocr_result = OcrResultFactory.build()
+        expected = OcrResultFactory.build_redacted()
+        annotations = AnnotationFactory.build_annotations()
+        stats = MatchStats()
+
+        ocr_result_redaction = OcrResultRedactionV2(
+            ocr_result, annotations, stats=stats
+        )
+        ocr_result_redaction.redact()
+
+        assert ocr_result_redaction.ocr_result == expected
+        assert stats.matches > 0
+        assert stats.pairs == stats.prefilter_rejections + stats.intersections
+        assert stats.intersections >= stats.matches
+        assert stats.seconds > 0
@@ -3,6 +3,7 @@
 # root for license information.
 
 from redact.redaction.ocr_result_redaction_v3 import OcrResultRedactionV3
+from redact.types.match_stats import MatchStats
 from tests.factories.ocr_result_factory import OcrResultFactory
 from tests.factories.annotation_factory import AnnotationFactory
 
@@ -28,3 +29,20 @@ class TestOcrResultRedactionV3:
 
         actual = ocr_result_redaction.ocr_result
         assert actual == expected
+
+    def test_redact_with_stats(self) -> None:
+        ocr_result = OcrResultFactory.build_2021_09_30_preview()
+        expected = OcrResultFactory.build_redacted_2021_09_30_preview()
+        annotations = AnnotationFactory.build_annotations()
+        stats = MatchStats()
+
+        ocr_result_redaction = OcrResultRedactionV3(
+            ocr_result, annotations, stats=stats
+        )
+        ocr_result_redaction.redact()
+
+        assert ocr_result_redaction.ocr_result == expected
+        assert stats.matches > 0
+        assert stats.pairs == stats.prefilter_rejections + stats.intersections
+        assert stats.intersections >= stats.matches
+        assert stats.seconds > 0
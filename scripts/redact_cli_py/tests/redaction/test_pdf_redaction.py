@@ -0,0 +1,126 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import re
+import zlib
+
+from redact.preprocess.pdf_renderer import PdfDocument, PdfRenderer
+from redact.redaction.pdf_redaction import PdfRedaction
+from redact.types.redaction_plan import RedactedRegion, RedactionPlan
+from tests.factories.pdf_factory import PdfFactory
+
+
+def build_plan(bounding_box) -> RedactionPlan:
+    return RedactionPlan(
+        api_version="v2.1",
+        labels=[],
+        words=[],
+        regions=[RedactedRegion(page=1, field="Name", bounding_box=bounding_box)],
+    )
+
+
+def read_streams(pdf_path) -> bytes:
+    """The content of all streams of a PDF file, inflated."""
+    data = pdf_path.read_bytes()
+    streams = re.findall(rb"stream\r?\n(.*?)endstream", data, re.S)
+    return b"".join(zlib.decompress(stream) for stream in streams)
+
+
+# Around "SECRETNAME" at (72, 700) on a letter size page, normalized.
+SECRET_BOX = [0.11, 0.10, 0.27, 0.10, 0.27, 0.12, 0.11, 0.12]
+
+
+class TestPdfRedaction:
+    def test_redact_text_objects(self, tmp_path) -> None:
+        input_path = tmp_path / "in.pdf"
+        output_path = tmp_path / "out.pdf"
+        PdfFactory.build_text_pdf(
+            input_path, [("SECRETNAME", 72, 700), ("PUBLICWORD", 300, 700)]
+        )
+
+        with PdfDocument(input_path) as document:
+            rasterized_pages = PdfRedaction(document, build_plan(SECRET_BOX)).redact()
+            document.save_pages(output_path)
+
+        assert rasterized_pages == []
+        actual_text = PdfFactory.get_text(output_path)
+        assert "PUBLICWORD" in actual_text
+        assert "SECRETNAME" not in actual_text
+        # The text is not left anywhere in the file, e.g. in an old content stream.
+        streams = read_streams(output_path)
+        assert b"PUBLICWORD".hex().upper().encode() in streams
+        assert b"SECRETNAME".hex().upper().encode() not in streams
+
+    def test_rasterize_text_beyond_region(self, tmp_path) -> None:
+        input_path = tmp_path / "in.pdf"
+        output_path = tmp_path / "out.pdf"
+        PdfFactory.build_text_pdf(input_path, [("SECRETNAME PUBLICWORD", 72, 700)])
+
+        with PdfDocument(input_path) as document:
+            rasterized_pages = PdfRedaction(
+                document, build_plan(SECRET_BOX), render_target_dpi=72
+            ).redact()
+            document.save_pages(output_path)
+
+        assert rasterized_pages == [1]
+        assert PdfFactory.get_text(output_path) == ""
+
+    def test_keep_borders_partly_under_region(self, tmp_path) -> None:
+        input_path = tmp_path / "in.pdf"
+        output_path = tmp_path / "out.pdf"
+        PdfFactory.build_text_pdf(
+            input_path,
+            [("SECRETNAME", 72, 700), ("PUBLICWORD", 300, 700)],
+            paths=[
+                [(50, 696), (500, 696)],
+                [(60, 690), (400, 690), (400, 720), (60, 720), (60, 690)],
+            ],
+        )
+
+        with PdfDocument(input_path) as document:
+            rasterized_pages = PdfRedaction(document, build_plan(SECRET_BOX)).redact()
+            document.save_pages(output_path)
+
+        assert rasterized_pages == []
+        assert b"500 696 l" in read_streams(output_path)
+
+    def test_rasterize_drawing_partly_under_region(self, tmp_path) -> None:
+        input_path = tmp_path / "in.pdf"
+        output_path = tmp_path / "out.pdf"
+        # A signature drawn from within the region to beyond it.
+        signature = [(80, 700), (120, 706), (140, 698), (200, 704), (260, 680)]
+        PdfFactory.build_text_pdf(
+            input_path,
+            [("SECRETNAME", 72, 700), ("PUBLICWORD", 300, 700)],
+            paths=[signature],
+        )
+
+        with PdfDocument(input_path) as document:
+            rasterized_pages = PdfRedaction(
+                document, build_plan(SECRET_BOX), render_target_dpi=72
+            ).redact()
+            document.save_pages(output_path)
+
+        assert rasterized_pages == [1]
+        assert PdfFactory.get_text(output_path) == ""
+        assert b"120 706 l" not in read_streams(output_path)
+
+    def test_rasterize_scanned_page(self, tmp_path) -> None:
+        output_path = tmp_path / "out.pdf"
+
+        with PdfDocument("testdata/testdata.pdf") as document:
+            rasterized_pages = PdfRedaction(
+                document, build_plan(SECRET_BOX), render_target_dpi=72
+            ).redact()
+            document.save_pages(output_path)
+
+        assert rasterized_pages == [1]
+        image = PdfRenderer().render_pdf(output_path, 72)
+        # The region is painted white.
+        assert image.getpixel((int(0.2 * image.width), int(0.11 * image.height))) == (
+            255,
+            255,
+            255,
+            255,
+        )
@@ -0,0 +1,155 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import shutil
+
+import pytest
+
+from redact import (
+    plan_redaction,
+    redact_file_bundle,
+    redact_fott_label,
+    redact_image,
+    redact_ocr_result,
+)
+from redact.types.api_version import ApiVersion
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.file_bundle import FileBundle
+
+FILE_BUNDLE = FileBundle(
+    "testdata.jpg", "testdata.jpg.labels.json", "testdata.jpg.ocr.json"
+)
+
+
+def copy_bundle(fb: FileBundle, folder: Path):
+    for name in [fb.image_file_name, fb.fott_file_name, fb.ocr_file_name]:
+        shutil.copy(Path("testdata", name), folder)
+
+
+class TestRedactFileBundle:
+    def test_executor_writes_the_same_outputs(self, tmp_path) -> None:
+        in_folder = tmp_path / "in"
+        in_folder.mkdir()
+        copy_bundle(FILE_BUNDLE, in_folder)
+        sequential_folder = tmp_path / "sequential"
+        sequential_folder.mkdir()
+        concurrent_folder = tmp_path / "concurrent"
+        concurrent_folder.mkdir()
+
+        expected_bytes = redact_file_bundle(
+            FILE_BUNDLE, in_folder, sequential_folder, ApiVersion.V2_1
+        )
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            actual_bytes = redact_file_bundle(
+                FILE_BUNDLE,
+                in_folder,
+                concurrent_folder,
+                ApiVersion.V2_1,
+                executor=executor,
+            )
+
+        assert actual_bytes == expected_bytes
+        expected_names = sorted(path.name for path in sequential_folder.iterdir())
+        assert sorted(path.name for path in concurrent_folder.iterdir()) == (
+            expected_names
+        )
+        for name in expected_names:
+            assert (concurrent_folder / name).read_bytes() == (
+                sequential_folder / name
+            ).read_bytes()
+
+    def test_executor_raises_step_error_after_all_steps(self, tmp_path) -> None:
+        in_folder = tmp_path / "in"
+        in_folder.mkdir()
+        copy_bundle(FILE_BUNDLE, in_folder)
+        out_folder = tmp_path / "out"
+        out_folder.mkdir()
+        # The plan is computed from the label and OCR result, so the image is
+        # the step failing.
+        (in_folder / FILE_BUNDLE.image_file_name).write_bytes(b"not an image")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            with pytest.raises(OSError):
+                redact_file_bundle(
+                    FILE_BUNDLE,
+                    in_folder,
+                    out_folder,
+                    ApiVersion.V2_1,
+                    executor=executor,
+                )
+
+        # The label and OCR result steps ran to completion.
+        assert (out_folder / "redacted_testdata.jpg.labels.json").exists()
+        assert (out_folder / "redacted_testdata.jpg.ocr.json").exists()
+
+
+class TestRedactOcrResult:
+    def test_plan_without_ocr_result_is_matched_again(self, tmp_path) -> None:
+        copy_bundle(FILE_BUNDLE, tmp_path)
+        ocr_path = tmp_path / FILE_BUNDLE.ocr_file_name
+        fott_path = tmp_path / FILE_BUNDLE.fott_file_name
+        # The plan of the image only, without OCR words.
+        image_plan = plan_redaction(fott_path)
+        assert len(image_plan.regions) > 0
+        assert not image_plan.ocr_matched
+        expected_path = tmp_path / "expected.json"
+        actual_path = tmp_path / "actual.json"
+
+        redact_ocr_result(ocr_path, fott_path, expected_path, ApiVersion.V2_1)
+        redact_ocr_result(
+            ocr_path, fott_path, actual_path, ApiVersion.V2_1, plan=image_plan
+        )
+
+        assert actual_path.read_bytes() == expected_path.read_bytes()
+        assert actual_path.read_bytes() != ocr_path.read_bytes()
+
+
+def get_keys(data) -> list:
+    """The keys of all objects in JSON data, in order."""
+    if isinstance(data, dict):
+        return [(key, get_keys(value)) for key, value in data.items()]
+    if isinstance(data, list):
+        return [get_keys(value) for value in data]
+    return []
+
+
+class TestRedactFottLabel:
+    def test_redacted_label_keeps_the_shape_of_the_input(self, tmp_path) -> None:
+        input_path = tmp_path / "label.json"
+        input_path.write_bytes(
+            codecs.BOM_UTF8 + Path("testdata", FILE_BUNDLE.fott_file_name).read_bytes()
+        )
+        passed_path = tmp_path / "passed.json"
+        redacted_path = tmp_path / "redacted.json"
+
+        redact_fott_label(input_path, passed_path, labels_to_redact=["Missing"])
+        redact_fott_label(input_path, redacted_path, labels_to_redact=["Name"])
+
+        assert passed_path.read_bytes() == input_path.read_bytes()
+        assert redacted_path.read_bytes().startswith(codecs.BOM_UTF8)
+        passed = json.loads(passed_path.read_text(encoding="utf-8-sig"))
+        redacted = json.loads(redacted_path.read_text(encoding="utf-8-sig"))
+        assert "$schema" in redacted and "document" in redacted
+        assert get_keys(redacted) == get_keys(passed)
+        assert redacted != passed
+
+
+class TestRedactImage:
+    def test_unredacted_image_is_re_encoded_with_the_profile(self, tmp_path) -> None:
+        image_path = Path("testdata", FILE_BUNDLE.image_file_name)
+        label_path = Path("testdata", FILE_BUNDLE.fott_file_name)
+        passed_path = tmp_path / "passed.jpg"
+        encoded_path = tmp_path / "encoded.jpg"
+
+        redact_image(image_path, label_path, passed_path, ["Missing"])
+        redact_image(
+            image_path, label_path, encoded_path, ["Missing"], EncoderProfile.SMALL
+        )
+
+        assert passed_path.read_bytes() == image_path.read_bytes()
+        assert encoded_path.read_bytes() != image_path.read_bytes()
@@ -0,0 +1,73 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from redact.redaction.ocr_result_redaction import OcrResultRedaction
+from redact.redaction.redaction_planner import RedactionPlanner
+from redact.types.api_version import ApiVersion
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.match_stats import MatchStats
+from redact.utils.metrics import recording
+from tests.factories.fott_label_factory import FottLabelFactory
+from tests.factories.ocr_result_factory import OcrResultFactory
+
+
+class TestRedactionPlanner:
+    def test_plan_without_ocr_result(self) -> None:
+        fott_label = FottLabelFactory.build()
+
+        actual = RedactionPlanner(fott_label, labels_to_redact=["Name"]).plan()
+
+        assert actual.label_names() == ["Name"]
+        assert [region.field for region in actual.regions] == ["Name"]
+        assert actual.words == []
+        assert not actual.ocr_matched
+
+    def test_apply_plan_v2(self) -> None:
+        fott_label = FottLabelFactory.build()
+        ocr_result = OcrResultFactory.build()
+        expected = OcrResultFactory.build_redacted()
+
+        plan = RedactionPlanner(fott_label, ocr_result, ApiVersion.V2_1).plan()
+        redaction = OcrResultRedaction(ocr_result, [], ApiVersion.V2_1)
+        redaction.redact_mapped_words(plan.words)
+
+        assert plan.ocr_matched
+        assert redaction.ocr_result == expected
+
+    def test_apply_plan_v3(self) -> None:
+        fott_label = FottLabelFactory.build()
+        ocr_result = OcrResultFactory.build_2021_09_30_preview()
+        expected = OcrResultFactory.build_redacted_2021_09_30_preview()
+
+        plan = RedactionPlanner(fott_label, ocr_result, ApiVersion.V3_0).plan()
+        redaction = OcrResultRedaction(ocr_result, [], ApiVersion.V3_0)
+        redaction.redact_mapped_words(plan.words)
+
+        assert redaction.ocr_result == expected
+
+    def test_apply_plan_partial(self) -> None:
+        fott_label = FottLabelFactory.build_partial()
+        ocr_result = OcrResultFactory.build_partial()
+        expected = OcrResultFactory.build_redacted_partial()
+
+        plan = RedactionPlanner(
+            fott_label, ocr_result, ApiVersion.V2_1, ["Name", "Date"]
+        ).plan()
+        redaction = OcrResultRedaction(ocr_result, [], ApiVersion.V2_1)
+        redaction.redact_mapped_words(plan.words)
+
+        assert redaction.ocr_result == expected
+
+    def test_plan_counts_match_stats_when_recording(self) -> None:
+        fott_label = FottLabelFactory.build()
+        ocr_result = OcrResultFactory.build()
+        metrics = BundleMetrics()
+
+        with recording(metrics):
+            plan = RedactionPlanner(fott_label, ocr_result, ApiVersion.V2_1).plan()
+
+        stats = MatchStats.from_counters(metrics.counters)
+        # Lines similar to a region are matches too, before their words are.
+        assert stats.matches >= len(plan.words) > 0
+        assert stats.pairs == stats.prefilter_rejections + stats.intersections
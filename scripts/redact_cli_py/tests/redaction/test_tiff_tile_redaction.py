@@ -0,0 +1,247 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from PIL import Image, ImageChops
+import pytest
+
+from redact import redact_image
+from redact.redaction.image_redaction import ImageRedaction
+from redact.redaction.tiff_tile_redaction import (
+    TiffTileRedaction,
+    get_chunk_boxes,
+    get_chunk_entries,
+)
+from redact.types.encoder_profile import EncoderProfile
+from redact.types.redaction_plan import RedactedRegion, RedactionPlan
+from redact.utils.tiff_file import read_tiff_directories
+from tests.factories.image_factory import ImageFactory
+from tests.factories.tiff_factory import TiffFactory
+
+
+def build_plan() -> RedactionPlan:
+    return RedactionPlan(
+        api_version="v2.1",
+        regions=[
+            RedactedRegion(
+                page=1,
+                field="Name",
+                bounding_box=[0.1, 0.1, 0.33, 0.12, 0.31, 0.3, 0.12, 0.28],
+            )
+        ],
+    )
+
+
+def redact_full_image(image: Image, plan: RedactionPlan) -> Image:
+    image = image.copy()
+    ImageRedaction(image, plan.to_annotations(1, image.size)).redact()
+    return image
+
+
+def read_chunks(path) -> list:
+    with open(path, "rb") as file:
+        _, directories = read_tiff_directories(file)
+        offsets, byte_counts = get_chunk_entries(directories[0])
+        chunks = []
+        for offset, byte_count in zip(offsets.values, byte_counts.values):
+            file.seek(offset)
+            chunks.append(file.read(byte_count))
+        return chunks
+
+
+class TestTiffTileRedaction:
+    @pytest.mark.parametrize(
+        "mode, compression",
+        [
+            ("1", "group4"),
+            ("L", "tiff_lzw"),
+            ("RGB", "tiff_adobe_deflate"),
+            ("RGBA", "packbits"),
+        ],
+    )
+    def test_redact_tiled_matches_full_image(
+        self, tmp_path, mode: str, compression: str
+    ) -> None:
+        plan = build_plan()
+        with ImageFactory.build() as source:
+            image = source.convert(mode)
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        TiffFactory.build_tiled(image, input_path, 128, compression)
+
+        redaction = TiffTileRedaction(input_path, plan)
+        assert redaction.is_supported()
+        actual_bytes = redaction.redact(output_path)
+
+        assert actual_bytes == output_path.stat().st_size
+        with Image.open(output_path) as actual:
+            expected = redact_full_image(image, plan)
+            assert actual.mode == mode
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_redact_striped_matches_full_image(self, tmp_path) -> None:
+        plan = build_plan()
+        with ImageFactory.build_mode_1() as source:
+            image = source.copy()
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        image.save(input_path, compression="tiff_lzw", strip_size=1024)
+
+        TiffTileRedaction(input_path, plan).redact(output_path)
+
+        with Image.open(output_path) as actual:
+            assert actual.info["compression"] == "tiff_lzw"
+            expected = redact_full_image(image, plan)
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_redact_copies_untouched_tiles(self, tmp_path) -> None:
+        plan = build_plan()
+        with ImageFactory.build() as source:
+            image = source.convert("L")
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        TiffFactory.build_tiled(image, input_path, 256, "tiff_lzw")
+
+        TiffTileRedaction(input_path, plan).redact(output_path)
+
+        before = read_chunks(input_path)
+        after = read_chunks(output_path)
+        changed = [
+            index for index in range(len(before)) if before[index] != after[index]
+        ]
+        # The region spans about 3 by 3 of the 10 by 14 tiles.
+        assert 0 < len(changed) <= 12
+        assert input_path.stat().st_size == output_path.stat().st_size
+
+    def test_redact_zeroes_replaced_tiles(self, tmp_path) -> None:
+        plan = build_plan()
+        # Black tiles compress to less than tiles with a white polygon in
+        # them, so redacted tiles are appended to the file.
+        image = Image.new("L", (256, 256))
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        TiffFactory.build_tiled(image, input_path, 64, "tiff_adobe_deflate")
+        with open(input_path, "rb") as file:
+            _, directories = read_tiff_directories(file)
+        offsets, byte_counts = get_chunk_entries(directories[0])
+
+        TiffTileRedaction(input_path, plan).redact(output_path)
+
+        assert output_path.stat().st_size > input_path.stat().st_size
+        with open(output_path, "rb") as file:
+            _, directories = read_tiff_directories(file)
+            new_offsets, _ = get_chunk_entries(directories[0])
+            file.seek(0)
+            content = file.read()
+        moved = [
+            index
+            for index, offset in enumerate(offsets.values)
+            if new_offsets.values[index] != offset
+        ]
+        assert len(moved) > 0
+        for index in moved:
+            offset, byte_count = offsets.values[index], byte_counts.values[index]
+            assert content[offset : offset + byte_count] == bytes(byte_count)
+        with Image.open(output_path) as actual:
+            expected = redact_full_image(image, plan)
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_jpeg_compression_is_not_supported(self, tmp_path) -> None:
+        input_path = tmp_path / "input.tiff"
+        with ImageFactory.build() as source:
+            source.save(input_path, compression="jpeg")
+
+        assert not TiffTileRedaction(input_path, build_plan()).is_supported()
+
+    def test_chunk_boxes_of_tiles_cover_edges(self, tmp_path) -> None:
+        input_path = tmp_path / "input.tiff"
+        TiffFactory.build_tiled(Image.new("L", (100, 70)), input_path, 64)
+        with open(input_path, "rb") as file:
+            _, directories = read_tiff_directories(file)
+
+        assert get_chunk_boxes(directories[0]) == [
+            (0, 0, 64, 64),
+            (64, 0, 128, 64),
+            (0, 64, 64, 128),
+            (64, 64, 128, 128),
+        ]
+
+    def test_redact_image_keeps_tiff_compression(self, tmp_path) -> None:
+        plan = build_plan()
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        with ImageFactory.build_mode_1() as source:
+            source.save(input_path, compression="group4")
+
+        redact_image(input_path, None, output_path, plan=plan)
+
+        with Image.open(output_path) as actual:
+            assert actual.info["compression"] == "group4"
+
+    def test_archival_profile_compresses_with_lzw(self, tmp_path) -> None:
+        plan = build_plan()
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        with ImageFactory.build_mode_1() as source:
+            source.save(input_path, compression="group4")
+
+        redact_image(
+            input_path,
+            None,
+            output_path,
+            encoder_profile=EncoderProfile.ARCHIVAL,
+            plan=plan,
+        )
+
+        with Image.open(output_path) as actual:
+            assert actual.info["compression"] == "tiff_lzw"
+
+    @pytest.mark.parametrize(
+        "tag",
+        [
+            270,  # ImageDescription
+            315,  # Artist
+            700,  # XMP
+        ],
+    )
+    def test_metadata_is_not_kept(self, tmp_path, tag: int) -> None:
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        with ImageFactory.build_mode_1() as source:
+            source.save(
+                input_path,
+                compression="group4",
+                tiffinfo={tag: "Patient: SECRET JOHN DOE"},
+            )
+
+        assert not TiffTileRedaction(input_path, build_plan()).is_supported()
+        redact_image(input_path, None, output_path, plan=build_plan())
+
+        assert b"SECRET" in input_path.read_bytes()
+        assert b"SECRET" not in output_path.read_bytes()
+
+    def test_reduced_resolution_images_are_not_supported(self, tmp_path) -> None:
+        input_path = tmp_path / "input.tiff"
+        with ImageFactory.build_mode_1() as source:
+            # NewSubfileType: a reduced-resolution image, e.g. a thumbnail.
+            source.save(input_path, compression="group4", tiffinfo={254: 1})
+
+        assert not TiffTileRedaction(input_path, build_plan()).is_supported()
+
+    def test_redact_zeroes_unused_bytes(self, tmp_path) -> None:
+        plan = build_plan()
+        with ImageFactory.build() as source:
+            image = source.convert("L")
+        input_path = tmp_path / "input.tiff"
+        output_path = tmp_path / "output.tiff"
+        TiffFactory.build_tiled(image, input_path, 128, "tiff_lzw")
+        # Bytes no directory refers to, e.g. left by an earlier edit.
+        with open(input_path, "ab") as file:
+            file.write(b"Patient: SECRET JOHN DOE")
+
+        TiffTileRedaction(input_path, plan).redact(output_path)
+
+        assert b"SECRET" not in output_path.read_bytes()
+        with Image.open(output_path) as actual:
+            expected = redact_full_image(image, plan)
+            assert ImageChops.difference(actual, expected).getbbox() is None
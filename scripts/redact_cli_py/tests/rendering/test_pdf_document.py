@@ -0,0 +1,38 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from pathlib import Path
+
+import pytest
+from PIL import ImageChops
+
+from redact.preprocess.pdf_renderer import PdfDocument, PdfRenderer
+
+
+class TestPdfDocument:
+    def test_load_from_path(self) -> None:
+        with PdfDocument("testdata/testdata.pdf") as document:
+            assert document.doc is None
+            assert document.get_page_count() == 1
+            assert document.mmap is not None
+
+        assert document.doc is None
+        assert document.mmap is None
+
+    @pytest.mark.parametrize("content_type", [bytes, bytearray])
+    def test_render_from_content(self, content_type) -> None:
+        renderer = PdfRenderer()
+        content = content_type(Path("testdata/testdata.pdf").read_bytes())
+        expected = renderer.render_pdf("testdata/testdata.pdf", 72)
+
+        with PdfDocument(content) as document:
+            actual = renderer.render_pdf(document, 72)
+            # The document stays open for other pages.
+            assert document.doc is not None
+
+        assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_load_invalid_content(self) -> None:
+        with pytest.raises(ValueError):
+            PdfDocument(b"not a pdf").load()
@@ -2,11 +2,24 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
-from PIL import ImageChops, ImageStat
+from pathlib import Path
+import shutil
 
-from redact.preprocess.pdf_renderer import PdfRenderer
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+from redact.preprocess import preprocess_multi_page_bundle
+from redact.preprocess.pdf_renderer import PdfRenderer, fit_render_dpi
+from redact.types.bundle_metrics import BundleMetrics
+from redact.types.file_bundle import FileBundle
+from redact.types.render_mode import RenderMode
+from redact.utils.metrics import recording
 from tests.factories.image_factory import ImageFactory
 
+FILE_BUNDLE = FileBundle(
+    "testdata.pdf", "testdata.pdf.labels.json", "testdata.pdf.ocr.json"
+)
+
 
 class TestPdfRendering:
     def test_rendering(self) -> None:
@@ -22,3 +35,86 @@ class TestPdfRendering:
         # stat.mean is a 3-tuple representing the mean value of [r, g, b].
         for channel in stat.mean:
             assert channel < epsilon
+
+    @pytest.mark.parametrize(
+        "render_mode, expected_mode, epsilon",
+        [
+            (RenderMode.RGB, "RGB", 0.1),
+            (RenderMode.GRAY, "L", 0.1),
+            # Thresholding loses the anti-aliased edges.
+            (RenderMode.BILEVEL, "1", 1.0),
+        ],
+    )
+    def test_rendering_mode(self, render_mode, expected_mode, epsilon) -> None:
+        renderer = PdfRenderer()
+
+        expected_image = ImageFactory.build_rendered_pdf()
+        actual_image = renderer.render_pdf(
+            "testdata/testdata.pdf", 300, render_mode=render_mode
+        )
+
+        assert actual_image.mode == expected_mode
+        assert actual_image.size == expected_image.size
+        diff = ImageChops.difference(
+            actual_image.convert("L"), expected_image.convert("L")
+        )
+        assert ImageStat.Stat(diff).mean[0] < epsilon
+
+    def test_rendering_pixel_budget(self) -> None:
+        renderer = PdfRenderer()
+
+        expected_image = renderer.render_pdf("testdata/testdata.pdf", 150)
+        width, height = expected_image.size
+        actual_image = renderer.render_pdf(
+            "testdata/testdata.pdf", 300, max_pixels=width * height
+        )
+
+        assert actual_image.info["dpi"] == (150, 150)
+        assert actual_image.size == expected_image.size
+
+    @pytest.mark.parametrize(
+        "max_pixels, min_dpi, expected",
+        [
+            (None, 72, 300),
+            # A letter page at 300 DPI takes 2550 * 3300 pixels.
+            (2550 * 3300, 72, 300),
+            (2550 * 3300 // 4, 72, 150),
+            (1000, 72, 72),
+            (1000, 400, 300),
+        ],
+    )
+    def test_fit_render_dpi(self, max_pixels, min_dpi, expected) -> None:
+        actual = fit_render_dpi(612, 792, 300, max_pixels, min_dpi)
+
+        assert actual == expected
+
+    def test_rendering_owns_buffer(self) -> None:
+        renderer = PdfRenderer()
+        with renderer.open_page("testdata/testdata.pdf", 72) as page:
+            actual_image = page.render()
+            expected_image = actual_image.copy()
+
+        # The pixels are mapped from the render buffer, and outlive the page.
+        assert actual_image.readonly
+        ImageDraw.Draw(actual_image).rectangle((0, 0, 10, 10), fill="#000000FF")
+        assert actual_image.getpixel((0, 0)) == (0, 0, 0, 255)
+        assert actual_image.getpixel((20, 20)) == expected_image.getpixel((20, 20))
+
+    def test_preprocess_counts_downscaled_pages(self, tmp_path, capsys) -> None:
+        for name in [
+            FILE_BUNDLE.image_file_name,
+            FILE_BUNDLE.fott_file_name,
+            FILE_BUNDLE.ocr_file_name,
+        ]:
+            shutil.copy(Path("testdata", name), tmp_path)
+        metrics = BundleMetrics()
+
+        with recording(metrics):
+            page_bundles = preprocess_multi_page_bundle(
+                FILE_BUNDLE, tmp_path, tmp_path, 300, max_page_pixels=1_000_000
+            )
+
+        assert metrics.counters["pages_downscaled"] == 1
+        with Image.open(tmp_path / page_bundles[0].image_file_name) as image:
+            assert round(image.info["dpi"][0]) < 300
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,56 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pytest
+
+from redact.types.batch_manifest import BatchManifest, BatchSummary
+from redact.types.file_bundle import FileBundle
+
+
+def build_manifest(shard: str, image_file_name: str) -> BatchManifest:
+    return BatchManifest(
+        shards=[shard],
+        bundles=[
+            FileBundle(
+                image_file_name,
+                image_file_name + ".labels.json",
+                image_file_name + ".ocr.json",
+            )
+        ],
+        summary=BatchSummary(document_count=1, image_count=2, image_bytes=100),
+    )
+
+
+class TestBatchManifest:
+    def test_merge(self) -> None:
+        manifests = [build_manifest("3/3", "c.pdf"), build_manifest("1/3", "a.pdf")]
+
+        merged = BatchManifest.merge(manifests)
+
+        assert merged.shards == ["1/3", "3/3"]
+        assert [bundle.image_file_name for bundle in merged.bundles] == [
+            "a.pdf",
+            "c.pdf",
+        ]
+        assert merged.summary == BatchSummary(
+            document_count=2, image_count=4, image_bytes=200
+        )
+        assert merged.missing_shards() == ["2/3"]
+
+    def test_merge_rejects_overlapping_shards(self) -> None:
+        with pytest.raises(ValueError):
+            BatchManifest.merge(
+                [build_manifest("1/3", "a.pdf"), build_manifest("1/3", "b.pdf")]
+            )
+
+    def test_merge_rejects_different_shard_counts(self) -> None:
+        with pytest.raises(ValueError):
+            BatchManifest.merge(
+                [build_manifest("1/3", "a.pdf"), build_manifest("2/4", "b.pdf")]
+            )
+
+    def test_round_trip(self) -> None:
+        manifest = build_manifest("1/3", "a.pdf")
+
+        assert BatchManifest.from_dict(manifest.to_dict()) == manifest
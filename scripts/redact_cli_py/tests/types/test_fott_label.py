@@ -31,3 +31,10 @@ class TestFottLabel:
         )
 
         assert actual == annotations
+
+    def test_has_entities(self) -> None:
+        fott_label = FottLabelFactory.build()
+
+        assert fott_label.has_entities()
+        assert fott_label.has_entities(["Name"])
+        assert not fott_label.has_entities(["NotALabel"])
@@ -0,0 +1,33 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from redact.types.redaction_plan import RedactedWord, RedactionPlan
+from tests.factories.redaction_plan_factory import RedactionPlanFactory
+
+
+class TestRedactionPlan:
+    def test_for_page(self) -> None:
+        plan = RedactionPlanFactory.build()
+
+        actual = plan.for_page(2)
+
+        assert actual.label_names() == ["Date"]
+        assert actual.words == [RedactedWord(page=1, line=3, word=0)]
+        assert [region.page for region in actual.regions] == [1]
+
+    def test_to_annotations(self) -> None:
+        plan = RedactionPlanFactory.build()
+
+        actual = plan.to_annotations(1, (100, 200))
+
+        assert len(actual) == 1
+        assert actual[0].field == "Name"
+        assert actual[0].bounding_box == [0, 0, 100, 0, 100, 200]
+
+    def test_dict_round_trip(self) -> None:
+        plan = RedactionPlanFactory.build()
+
+        actual = RedactionPlan.from_dict(plan.to_dict())
+
+        assert actual == plan
@@ -0,0 +1,36 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pytest
+
+from redact.types.shard import Shard
+
+
+class TestShard:
+    def test_parse(self) -> None:
+        assert Shard.parse("2/8") == Shard(index=2, count=8)
+        assert str(Shard.parse("2/8")) == "2/8"
+
+    @pytest.mark.parametrize("value", ["0/4", "5/4", "1/0", "1", "a/b", "1/2/3"])
+    def test_parse_invalid(self, value: str) -> None:
+        with pytest.raises(ValueError):
+            Shard.parse(value)
+
+    def test_shards_partition_names(self) -> None:
+        names = [f"document-{index}.pdf" for index in range(1000)]
+        shards = [Shard(index, 4) for index in range(1, 5)]
+
+        assignments = [
+            [shard for shard in shards if shard.includes(name)] for name in names
+        ]
+
+        assert all(len(assigned) == 1 for assigned in assignments)
+        # Every shard gets a fair part of the names.
+        for shard in shards:
+            assert 200 < sum(shard.includes(name) for name in names) < 300
+
+    def test_includes_is_stable(self) -> None:
+        # Assignments must not change across runs, nodes and Python versions.
+        assert Shard(2, 3).includes("a.jpg")
+        assert Shard(3, 3).includes("testdata.pdf")
@@ -2,6 +2,7 @@
 # Licensed under the MIT License. See License.txt in the project
 # root for license information.
 
+from redact.types.match_stats import MatchStats
 from redact.utils.bounding_box_mapping import similar
 
 
@@ -15,3 +16,18 @@ class TestBoundingBoxMapping:
         a = [1.0, 1.0, 2.0, 1.0, 2.0, 2.0, 1.0, 2.0]
         b = [2.0, 1.0, 3.0, 1.0, 3.0, 2.0, 2.0, 2.0]
         assert not similar(a, b)
+
+    def test_similar_counts_into_stats(self) -> None:
+        a = [1.0, 1.0, 2.0, 1.0, 2.0, 2.0, 1.0, 2.0]
+        overlapping = [1.5, 1.0, 2.5, 1.0, 2.5, 2.0, 1.5, 2.0]
+        # Only touching a, so rejected by their envelopes.
+        touching = [2.0, 1.0, 3.0, 1.0, 3.0, 2.0, 2.0, 2.0]
+        stats = MatchStats()
+
+        assert similar(a, a, stats=stats)
+        assert not similar(a, overlapping, stats=stats)
+        assert not similar(a, touching, stats=stats)
+
+        assert stats == MatchStats(
+            pairs=3, prefilter_rejections=1, intersections=2, matches=1
+        )
@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from redact.types.file_bundle import FileBundle, FileType
+from redact.utils.bundle_pairer import BundlePairer
+
+
+class TestBundlePairer:
+    def test_pair_emits_bundle_on_its_last_file(self) -> None:
+        pairer = BundlePairer()
+
+        assert pairer.add("a.jpg.ocr.json") is None
+        assert pairer.add("a.jpg") is None
+        assert pairer.add("a.jpg.labels.json") == (
+            FileType.SINGLE_PAGE_IMAGE,
+            FileBundle("a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json"),
+        )
+        assert pairer.pending == {}
+
+    def test_pair_sorts_bundles_by_type(self) -> None:
+        names = [
+            "a.pdf",
+            "a.pdf.labels.json",
+            "dummy_file.jpg",
+            "a.jpg",
+            "a.jpg.labels.json",
+            "dummy_file.pdf",
+            "a.pdf.ocr.json",
+            "a.jpg.ocr.json",
+        ]
+
+        actual = list(BundlePairer().pair(names))
+
+        assert actual == [
+            (
+                FileType.MULTI_PAGE,
+                FileBundle("a.pdf", "a.pdf.labels.json", "a.pdf.ocr.json"),
+            ),
+            (
+                FileType.SINGLE_PAGE_IMAGE,
+                FileBundle("a.jpg", "a.jpg.labels.json", "a.jpg.ocr.json"),
+            ),
+        ]
+
+    def test_pair_ignores_other_files_and_duplicates(self) -> None:
+        pairer = BundlePairer(modes=[FileType.SINGLE_PAGE_IMAGE])
+        names = [
+            "a.txt",
+            "a.txt.labels.json",
+            "a.txt.ocr.json",
+            "b.pdf",
+            "b.pdf.labels.json",
+            "b.pdf.ocr.json",
+            "c.png",
+            "c.png.labels.json",
+            "c.png.ocr.json",
+            "c.png",
+        ]
+
+        actual = list(pairer.pair(names))
+
+        assert actual == [
+            (
+                FileType.SINGLE_PAGE_IMAGE,
+                FileBundle("c.png", "c.png.labels.json", "c.png.ocr.json"),
+            )
+        ]
+        assert pairer.pending == {}
@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from PIL import Image, JpegImagePlugin
+
+from redact.types.encoder_profile import EncoderProfile
+from redact.utils.image_encoder import can_pass_through, encoder_params, save_image
+from tests.factories.image_factory import ImageFactory
+
+
+class TestImageEncoder:
+    def test_default_profile_has_no_params(self) -> None:
+        image = ImageFactory.build()
+
+        actual = encoder_params(image, "JPEG", EncoderProfile.DEFAULT, image)
+
+        assert actual == {}
+
+    def test_save_image_reports_bytes_written(self, tmp_path) -> None:
+        image = ImageFactory.build_mode_1()
+        output_path = tmp_path / "out.png"
+
+        actual = save_image(image, output_path, EncoderProfile.FAST)
+
+        assert actual == output_path.stat().st_size
+
+    def test_fast_jpeg_keeps_source_subsampling(self, tmp_path) -> None:
+        source = ImageFactory.build()
+        output_path = tmp_path / "out.jpg"
+
+        save_image(source.copy(), output_path, EncoderProfile.FAST, source=source)
+
+        with Image.open(output_path) as actual:
+            assert JpegImagePlugin.get_sampling(actual) == JpegImagePlugin.get_sampling(
+                source
+            )
+
+    def test_small_bilevel_tiff_uses_group4(self, tmp_path) -> None:
+        image = ImageFactory.build_mode_1()
+        output_path = tmp_path / "out.tiff"
+
+        save_image(image, output_path, EncoderProfile.SMALL)
+
+        with Image.open(output_path) as actual:
+            assert actual.info["compression"] == "group4"
+
+    def test_save_image_keeps_source_dpi(self, tmp_path) -> None:
+        source = ImageFactory.build_mode_1()
+        source.info["dpi"] = (150, 150)
+        output_path = tmp_path / "out.png"
+
+        save_image(source.copy(), output_path, source=source)
+
+        with Image.open(output_path) as actual:
+            assert tuple(round(dpi) for dpi in actual.info["dpi"]) == (150, 150)
+
+    def test_can_pass_through(self) -> None:
+        source = ImageFactory.build()
+
+        assert can_pass_through(source, "out.jpg")
+        assert not can_pass_through(source, "out.png")
+
+    def test_can_pass_through_only_with_default_profile(self) -> None:
+        source = ImageFactory.build()
+
+        assert can_pass_through(source, "out.jpg", EncoderProfile.DEFAULT)
+        assert not can_pass_through(source, "out.jpg", EncoderProfile.FAST)
+        assert not can_pass_through(source, "out.jpg", EncoderProfile.SMALL)
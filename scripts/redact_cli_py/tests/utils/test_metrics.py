@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+from concurrent.futures import ThreadPoolExecutor
+import tracemalloc
+
+from redact.types.bundle_metrics import BundleMetrics
+from redact.utils.memory import get_peak_rss
+from redact.utils.metrics import count, recording, stage, timed
+
+LARGE_BYTES = 64 * 1024 * 1024
+
+
+@timed("work")
+def work(value: int) -> int:
+    count("items")
+    return value * 2
+
+
+class TestMetrics:
+    def test_records_stages_and_counters(self) -> None:
+        metrics = BundleMetrics()
+
+        with recording(metrics):
+            assert work(2) == 4
+            with stage("other"):
+                count("bytes", 10)
+                work(3)
+
+        assert metrics.stages["work"].calls == 2
+        assert metrics.stages["other"].calls == 1
+        assert metrics.stages["other"].wall_seconds >= 0
+        assert metrics.counters == {"items": 2, "bytes": 10}
+
+    def test_records_nothing_outside_of_recording(self) -> None:
+        metrics = BundleMetrics()
+        with recording(metrics):
+            pass
+
+        assert work(2) == 4
+        with stage("other"):
+            count("bytes")
+
+        assert metrics == BundleMetrics()
+
+    def test_nested_recording_restores_outer_one(self) -> None:
+        outer, inner = BundleMetrics(), BundleMetrics()
+
+        with recording(outer):
+            work(1)
+            with recording(inner):
+                work(1)
+            work(1)
+
+        assert outer.stages["work"].calls == 2
+        assert inner.stages["work"].calls == 1
+
+    def test_records_from_other_threads(self) -> None:
+        metrics = BundleMetrics()
+
+        with recording(metrics):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(work, range(100)))
+
+        assert metrics.stages["work"].calls == 100
+        assert metrics.counters["items"] == 100
+
+    def test_records_memory_peaks_of_stages(self) -> None:
+        metrics = BundleMetrics()
+        tracemalloc.start()
+        try:
+            with recording(metrics, memory=True):
+                with stage("large"):
+                    # Filled with ones, so its pages are resident.
+                    data = b"\x01" * LARGE_BYTES
+                    del data
+                with stage("small"):
+                    assert len(bytes(1024)) == 1024
+        finally:
+            tracemalloc.stop()
+
+        assert metrics.stages["large"].peak_traced >= LARGE_BYTES
+        assert metrics.stages["small"].peak_traced < LARGE_BYTES
+        assert metrics.peak_traced >= LARGE_BYTES
+        if get_peak_rss() is not None:
+            assert metrics.stages["large"].peak_rss >= LARGE_BYTES
+            assert metrics.peak_rss >= metrics.stages["large"].peak_rss
+
+    def test_records_no_memory_by_default(self) -> None:
+        metrics = BundleMetrics()
+        with recording(metrics):
+            with stage("other"):
+                pass
+
+        assert metrics.peak_rss == 0
+        assert metrics.stages["other"].peak_rss == 0
@@ -0,0 +1,36 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project
+# root for license information.
+
+import pytest
+from PIL import Image, ImageChops
+
+from redact.utils.png_writer import PngStreamWriter
+from tests.factories.image_factory import ImageFactory
+
+
+class TestPngWriter:
+    @pytest.mark.parametrize("mode", ["1", "L", "RGB", "RGBA"])
+    def test_write_bands(self, tmp_path, mode) -> None:
+        expected = ImageFactory.build().convert(mode)
+        width, height = expected.size
+        output_path = tmp_path / "out.png"
+
+        with PngStreamWriter(output_path, expected.size, mode, dpi=300) as writer:
+            for top in range(0, height, 500):
+                writer.write(expected.crop((0, top, width, min(top + 500, height))))
+        actual_bytes = writer.close()
+
+        assert actual_bytes == output_path.stat().st_size
+        with Image.open(output_path) as actual:
+            assert actual.mode == mode
+            assert round(actual.info["dpi"][0]) == 300
+            assert ImageChops.difference(actual, expected).getbbox() is None
+
+    def test_missing_rows(self, tmp_path) -> None:
+        image = Image.new("L", (10, 10))
+
+        with pytest.raises(ValueError):
+            with PngStreamWriter(tmp_path / "out.png", (10, 20), "L") as writer:
+                writer.write(image)
+            writer.close()